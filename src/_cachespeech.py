@@ -8,6 +8,7 @@ Created on Aug 17, 2024
 
 import sys
 from my.text2speech import phrase_audio
+from my.tools.synthesis.scheduler import write_atomically
 
 if __name__ == '__main__':
     if len(sys.argv) != 4:
@@ -15,6 +16,5 @@ if __name__ == '__main__':
         sys.exit(1)
     the_voice, the_text, outfile = sys.argv[1:4]
     audio_data = phrase_audio(the_voice, the_text, suffix='mp3')
-    with open(outfile, 'wb') as f:
-        f.write(audio_data)
+    write_atomically(outfile, audio_data)
     sys.exit(0)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Executable to compare the old and new ways of finding the silence at either end of a clip.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+trim_my_audio() used to call detect_leading_silence() twice: once on the
+clip, and once on a reversed copy of it. Now, it calls
+detect_silence_at_both_ends(), which does the same job with NumPy in one
+pass. This script times both, at each silence threshold, and checks that
+they agree.
+
+Usage:
+    python3 benchmark_trim.py [audio file] [audio file] ...
+
+If no audio file is named, I make some up: tones of various lengths, with
+silence before and after.
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import sys
+import time
+
+from pydub.audio_segment import AudioSegment
+from pydub.generators import Sine
+
+from my.globals import DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD, LAZY_SILENCE_THRESHOLD
+from my.tools.sound.trim import detect_leading_silence, detect_silence_at_both_ends
+
+
+def made_up_clips() -> list:
+    """Tones of 0.2 to 10 seconds, with a little quiet before and after, like ElevenLabs's clips."""
+    return [AudioSegment.silent(250, frame_rate=44100)
+            + Sine(440, sample_rate=44100).to_audio_segment(ms, volume=-12.0)
+            + Sine(440, sample_rate=44100).to_audio_segment(150, volume=-58.0)
+            + AudioSegment.silent(400, frame_rate=44100) for ms in (200, 1000, 3000, 10000)]
+
+
+def time_this(func, repeats:int) -> float:
+    """Return how long func() takes, in milliseconds, at best."""
+    best = None
+    for _ in range(repeats):
+        t = time.perf_counter()
+        func()
+        best = time.perf_counter() - t if best is None else min(best, time.perf_counter() - t)
+    return best * 1000.0
+
+
+if __name__ == '__main__':
+    clips = [(f, AudioSegment.from_file(f)) for f in sys.argv[1:]] if len(sys.argv) > 1 \
+        else [('%dms tone' % len(c), c) for c in made_up_clips()]
+    disagreements = 0
+    print("%-40s %8s %10s %10s %8s" % ('clip', 'dB', 'old (ms)', 'new (ms)', 'speedup'))
+    for name, clip in clips:
+        for threshold in (LAZY_SILENCE_THRESHOLD, DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD):
+            old = (detect_leading_silence(clip, threshold), detect_leading_silence(clip.reverse(), threshold))
+            new = detect_silence_at_both_ends(clip, threshold)
+            if old != new:
+                print("DISAGREEMENT - %s at %0.1f dB: old says %s; new says %s" % (name, threshold, str(old), str(new)))
+                disagreements += 1
+            old_ms = time_this(lambda: (detect_leading_silence(clip, threshold), detect_leading_silence(clip.reverse(), threshold)), 5)
+            new_ms = time_this(lambda: detect_silence_at_both_ends(clip, threshold), 5)
+            print("%-40s %8.1f %10.2f %10.2f %7.1fx" % (name[-40:], threshold, old_ms, new_ms, old_ms / new_ms))
+    sys.exit(1 if disagreements else 0)
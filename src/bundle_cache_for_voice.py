@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Executable to pack a voice's audio cache into a single bundle file.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This code takes the cached audio files in ./sounds/cache/{voice name}/ and
+packs them into ./sounds/cache/{voice name}.bundle, which the app mmap()s
+and serves phrases from. The cache is tidied first (see
+my.tools.cache.janitor). The loose files are left where they are.
+
+Usage:
+    python3 bundle_cache_for_voice.py [voice name] [voice name] ...
+
+If no voice is named, every voice in the cache is bundled.
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import sys
+from os import listdir
+from os.path import isdir, join
+
+from my.globals import SOUNDS_CACHE_PATH
+from my.tools.cache.bundle import build_bundle, bundle_of_directory
+from my.tools.cache.janitor import sweep_cache
+
+if __name__ == '__main__':
+    the_voices_i_care_about = sys.argv[1:] if len(sys.argv) > 1 else sorted([f for f in listdir(SOUNDS_CACHE_PATH) if isdir(join(SOUNDS_CACHE_PATH, f)) and not f.startswith('.')])
+    sweep_cache(voices=the_voices_i_care_about)  # Don't pack the junk
+    for my_voice in the_voices_i_care_about:
+        path = join(SOUNDS_CACHE_PATH, my_voice)
+        print("Bundling", path)
+        bundle_fname = build_bundle(path)
+        print("Wrote %d files to %s" % (len(bundle_of_directory(path)), bundle_fname))
+    sys.exit(0)
@@ -29,6 +29,7 @@ it again will hide the configuration tools.
 
 import os
 import sys
+from threading import Thread
 
 from my.classes.exceptions import MissingFromCacheError
 from PyQt5 import uic
@@ -39,7 +40,7 @@ from my.globals import PATHNAMES_OF_CLOCKFACES, TOUCHSCREEN_SIZE_X, TOUCHSCREEN_
     TRIMMED_ALARMS_PATH
 from os.path import join, isdir, isfile
 from os import listdir
-from my.text2speech import fart_and_apologize, get_random_fart_fname, speak_this_smart_sentence, postsnooze_alrm_msgs_lst
+from my.text2speech import fart_and_apologize, get_random_fart_fname, keep_cache_within_budget, speak_this_smart_sentence, postsnooze_alrm_msgs_lst
 from my.text2speech import Text2SpeechSingleton as tts
 
 from my.consts import OWNER_NAME, motivational_comments_lst, wannasnooze_msgs_lst, hello_owner_lst, alarm_messages_lst
@@ -50,10 +51,11 @@ from PyQt5.QtGui import QFont
 from my.classes.stolenslider import StolenSlider
 from my.gui.tenkey import TenkeyDialog
 from my.stringutils import is_time_string_valid, is_date_string_valid
-from datetime import datetime
+from datetime import datetime, timedelta
 from my.classes import ShuffledPlaylist
+from my.classes.prerenderedalarmclass import PrerenderedAlarm
 
-ALL_VOICES_PLS = ShuffledPlaylist([f for f in listdir(SOUNDS_CACHE_PATH) if isdir(join(SOUNDS_CACHE_PATH, f))])
+ALL_VOICES_PLS = ShuffledPlaylist([f for f in listdir(SOUNDS_CACHE_PATH) if isdir(join(SOUNDS_CACHE_PATH, f)) and not f.startswith('.')])
 VOICE_NAME = ALL_VOICES_PLS.next
 ALARMTONES_PLS = ShuffledPlaylist([f for f in listdir(SOUNDS_ALARMS_PATH) if isfile(join(SOUNDS_ALARMS_PATH, f)) and f.endswith('.ogg')])
 ALARMTONE_NAME = ALARMTONES_PLS.next
@@ -67,10 +69,13 @@ CLOCKFACES_PLS = ShuffledPlaylist(PATHNAMES_OF_CLOCKFACES)
 MY_CLOCKFACE = CLOCKFACES_PLS.next
 BRIGHTNESS = 100
 VOLUME = 8
+SNOOZE_MINUTES = 5
+SNOOZE_TIME = None  # HH:MM, when the snoozed alarm will go off again (or None, if it isn't snoozed)
+PRERENDERED_ALARM = PrerenderedAlarm(OWNER_NAME)
 SNOOZE_TIMER = QTimer()
 SNOOZE_TIMER.timeout.connect(lambda x=True: Yo.triggerAlarm.emit(x))
 # try:
-from my.tools.sound import stop_sounds, play_audiofile, queue_oggfile, clear_ogg_queue
+from my.tools.sound import stop_sounds, play_audiofile, queue_oggfile, clear_ogg_queue, queue_sound
 # except PygameStartupError as e:
 #     popup_message(str(type(e)), "GET A FRICKIN' LOUDSPEAKER")
 #     sys.exit(0)
@@ -131,19 +136,33 @@ def set_the_system_clock(year, month, day, hour, minute):
         raise PermissionError("Unable to set time/date")
 
 
+def prerender_the_alarm(alarm_time, snoozed=False):
+    """Render, in the background, what VOICE_NAME will say when the alarm goes off at alarm_time (HH:MM)."""
+    if alarm_time is None:
+        PRERENDERED_ALARM.invalidate()
+    else:
+        PRERENDERED_ALARM.prepare(VOICE_NAME, alarm_time, POSTSNOOZE_ALARM_MSGS_PLS.next if snoozed else ALARM_MSGS_PLS.next, snoozed)
+
+
 def trigger_alarm(snoozed):
-#    global SNOOZE_TIMER
+    global SNOOZE_TIME
     SNOOZE_TIMER.stop()
     print("ALARM IS GOING OFF")
     set_vdu_brightness(100)
     the_date = datetime.now()
     timestring = '%02d:%02d' % (the_date.hour, the_date.minute)
+    if snoozed and SNOOZE_TIME is not None:
+        timestring = SNOOZE_TIME  # ...which is what was pre-rendered, even if the timer fired a moment into the next minute
+    SNOOZE_TIME = None
     wannasnooze, ok = WakeupDialog.getOutput(timestring=timestring, snoozed=snoozed)
     if not ok:
         print("Somehow, you canceled the wakeup dialog")
     elif wannasnooze:
         print("QQQ WE ARE SNOOZING.")
-        SNOOZE_TIMER.start(5 * 60 * 1000)  # Five minutes = 5 * 60 * 1000
+        # The dialog may have been up for a while: the snooze starts now, when the button was pressed, not when the alarm went off.
+        SNOOZE_TIME = (datetime.now() + timedelta(minutes=SNOOZE_MINUTES)).strftime('%H:%M')
+        SNOOZE_TIMER.start(SNOOZE_MINUTES * 60 * 1000)  # Five minutes = 5 * 60 * 1000
+        prerender_the_alarm(SNOOZE_TIME, snoozed=True)
         speak_this_smart_sentence(owner=OWNER_NAME, voice=VOICE_NAME, message_template=WANNASNOOZE_MSGS_PLS.next)
     else:
         print("So, I'm awake, then. Yay.")
@@ -167,7 +186,11 @@ class WakeupDialog(QDialog):
         self.awake_button.clicked.connect(self.you_pushed_yesiamawake)
         if timestring is not None:
             self.time_label.setText('GET UP' if timestring is None else timestring)
-        speak_this_smart_sentence(OWNER_NAME, VOICE_NAME, POSTSNOOZE_ALARM_MSGS_PLS.next if snoozed else ALARM_MSGS_PLS.next)
+        prerendered_sound = PRERENDERED_ALARM.take(VOICE_NAME, timestring, bool(snoozed))
+        if prerendered_sound is not None:
+            queue_sound(prerendered_sound)
+        else:
+            speak_this_smart_sentence(OWNER_NAME, VOICE_NAME, POSTSNOOZE_ALARM_MSGS_PLS.next if snoozed else ALARM_MSGS_PLS.next)
         for _ in range(0, 64):
             queue_oggfile('%s/%s' % (SOUNDS_ALARMS_PATH, ALARMTONE_NAME))
 
@@ -417,6 +440,7 @@ class AlarmsWindow(QMainWindow):
             popup_message("Bad Time", "You specified a dodgy time.")
         else:
             ALARM_TIME = output
+        prerender_the_alarm(ALARM_TIME)
         self.update_alarmtime_button_text()
 
     def setVisible(self, onoroff):
@@ -485,6 +509,11 @@ class VoicesWindow(QMainWindow):
     def new_voice_chosen(self, voice):
         global VOICE_NAME
         VOICE_NAME = voice
+        Thread(target=keep_cache_within_budget, args=(VOICE_NAME, OWNER_NAME), daemon=True).start()  # ...pinning the new voice's essentials
+        if ALARM_TIME is not None:  # The pre-rendered alarm is in the old voice. Re-render it.
+            prerender_the_alarm(ALARM_TIME)
+        if SNOOZE_TIME is not None:  # ...and so is the snoozed one
+            prerender_the_alarm(SNOOZE_TIME, snoozed=True)
         play_audiofile("""{cache}/{voice}/{owner}.mp3""".format(
                                             cache=SOUNDS_CACHE_PATH, voice=VOICE_NAME, owner=OWNER_NAME.lower()),
                        nowait=True)
@@ -722,6 +751,7 @@ if __name__ == '__main__':
     if tts is not None:  # This means we're connected to the Internet. In that case, we're probably running on a Mac Mini (not a PALPAC unit)
         os.system("rm %s/*.png" % os.path.dirname(face_snapshot_fname("foo")))
     os.environ["QV4_JIT_CALL_THRESHOLD"] = "1"
+    Thread(target=keep_cache_within_budget, args=(VOICE_NAME, OWNER_NAME), daemon=True).start()
     app = QApplication(sys.argv)
     mainwin = MainWindow()
     mainwin.show()
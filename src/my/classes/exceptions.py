@@ -23,6 +23,7 @@ Error
         ElevenLabsMissingKeyError
         VoiceNotFoundError
             NoProfessionalVoicesError
+        SynthesisWorkerError
     WebAPIError
         WebAPIOutputError
         WebAPITimeoutError
@@ -244,3 +245,10 @@ class NoProfessionalVoicesError(VoiceNotFoundError):
 
         super().__init__(message)
 
+
+class SynthesisWorkerError(Text2SpeechError):
+    """If the synthesis worker process (see my.tools.synthesis.worker) can't be started, or dies"""
+
+    def __init__(self, message):  # pylint: disable=useless-parent-delegation
+
+        super().__init__(message)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""my.classes.phraseindexclass
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This module contains the _PhraseIndexClass class, which remembers which
+files live in which directory of the audio cache. Without it, every word
+window of every sentence costs an os.path.exists() call against the SD card.
+With it, each directory is listed once and every lookup after that is a
+set membership test. For each directory and suffix, I also keep a
+PhraseTrie of the cached phrases, so that sentences can be segmented
+without building any pathnames at all.
+
+Example:
+    Here is how to use it::
+
+        $ python3
+        >>> from my.phraseindex import PhraseIndexSingleton as phrase_index
+        >>> phrase_index.exists('sounds/cache/Freya/good_morning.ogg')
+        True
+
+Attributes:
+    none
+
+"""
+
+import os
+
+from my.classes import singleton, ReadWriteLock
+from my.classes.phrasetrie import PhraseTrie
+from my.tools.cache.bundle import bundle_of_directory
+
+
+def words_of_filename(filename:str, suffix:str) -> tuple:
+    """Turn 'good_morning^.ogg' into ('good', 'morning^'), if the suffix matches; else, None."""
+    if not filename.endswith('.' + suffix):
+        return None
+    stem = filename[:-len(suffix) - 1]
+    return None if stem == '' else tuple(stem.split('_'))
+
+
+@singleton
+class _PhraseIndexClass:
+    """Class that indexes the audio cache, one directory at a time.
+
+    The first time that a directory is queried, I list its contents and
+    store the filenames in a set. Subsequent queries are answered from that
+    set. Whoever adds a file to (or removes a file from) the cache should
+    tell me, via add() or discard(), so that I stay current.
+
+    Attributes:
+        directories (list[str]): The directories that have been indexed so far.
+
+    """
+
+    def __init__(self):
+        self.__filenames_lock = ReadWriteLock()
+        self.__filenames = {}
+        self.__tries = {}
+        super().__init__()
+
+    @property
+    def directories(self) -> list:
+        self.__filenames_lock.acquire_read()
+        try:
+            retval = list(self.__filenames.keys())
+            return retval
+        finally:
+            self.__filenames_lock.release_read()
+
+    def filenames(self, path:str) -> set:
+        """Return the set of filenames in the specified directory.
+
+        If I have not indexed this directory yet, I list it now. If the
+        directory has a bundle (see my.tools.cache.bundle), its contents are
+        included. If the directory does not exist, I index it as empty (or
+        as its bundle); add() will populate it later, as files are written.
+
+        Args:
+            path: The directory, e.g. sounds/cache/Freya
+
+        Returns:
+            set: A copy of the basenames of the files in that directory.
+
+        """
+        path = os.path.normpath(path)
+        self.__filenames_lock.acquire_read()
+        try:
+            retval = self.__filenames.get(path)
+            retval = None if retval is None else set(retval)
+        finally:
+            self.__filenames_lock.release_read()
+        if retval is None:
+            retval = set(self.rebuild(path))
+        return retval
+
+    def rebuild(self, path:str) -> set:
+        """(Re)list the specified directory and replace its index entry."""
+        path = os.path.normpath(path)
+        bundle = bundle_of_directory(path)
+        found = set() if bundle is None else bundle.filenames()
+        try:
+            found |= set(f for f in os.listdir(path) if not f.startswith('.'))
+        except FileNotFoundError:
+            pass
+        self.__filenames_lock.acquire_write()
+        try:
+            self.__filenames[path] = found
+            for k in [k for k in self.__tries if k[0] == path]:
+                del self.__tries[k]
+        finally:
+            self.__filenames_lock.release_write()
+        return found
+
+    def forget(self, path:str=None):
+        """Forget the index of one directory (or of all of them, if path is None)."""
+        self.__filenames_lock.acquire_write()
+        try:
+            if path is None:
+                self.__filenames = {}
+                self.__tries = {}
+            else:
+                path = os.path.normpath(path)
+                self.__filenames.pop(path, None)
+                for k in [k for k in self.__tries if k[0] == path]:
+                    del self.__tries[k]
+        finally:
+            self.__filenames_lock.release_write()
+
+    def exists(self, pathname:str) -> bool:
+        """Does this file exist? Ask the index, not the filesystem."""
+        path = os.path.normpath(os.path.dirname(pathname))
+        self.__filenames_lock.acquire_read()
+        try:
+            found = self.__filenames.get(path)
+            if found is not None:
+                return os.path.basename(pathname) in found
+        finally:
+            self.__filenames_lock.release_read()
+        return os.path.basename(pathname) in self.rebuild(path)
+
+    def add(self, pathname:str):
+        """Tell the index that this file has just been written."""
+        path = os.path.normpath(os.path.dirname(pathname))
+        if path not in self.directories:
+            self.rebuild(path)
+        self.__filenames_lock.acquire_write()
+        try:
+            self.__filenames.setdefault(path, set()).add(os.path.basename(pathname))
+            for (trie_path, suffix), trie in self.__tries.items():
+                words = words_of_filename(os.path.basename(pathname), suffix) if trie_path == path else None
+                if words is not None:
+                    trie.add(words)
+        finally:
+            self.__filenames_lock.release_write()
+
+    def discard(self, pathname:str):
+        """Tell the index that this file has just been deleted."""
+        path = os.path.normpath(os.path.dirname(pathname))
+        self.__filenames_lock.acquire_write()
+        try:
+            if path in self.__filenames:
+                self.__filenames[path].discard(os.path.basename(pathname))
+            for (trie_path, suffix), trie in self.__tries.items():
+                words = words_of_filename(os.path.basename(pathname), suffix) if trie_path == path else None
+                if words is not None:
+                    trie.discard(words)
+        finally:
+            self.__filenames_lock.release_write()
+
+    def rename(self, src:str, dst:str):
+        """Tell the index that this file has just been renamed."""
+        self.discard(src)
+        self.add(dst)
+
+    def trie(self, path:str, suffix:str='ogg') -> PhraseTrie:
+        """Return the PhraseTrie of the files in this directory that end in .suffix
+
+        The words of each phrase are the underscore-separated pieces of its
+        filename, e.g. good_morning^.ogg is ('good', 'morning^'). Use
+        my.stringutils.phrase_audio_stem() to turn the words of a sentence
+        into the same form.
+
+        Args:
+            path: The directory, e.g. sounds/cache/Freya
+            suffix: ogg or mp3
+
+        Returns:
+            PhraseTrie: The trie. It is kept current by add() and discard().
+
+        """
+        path = os.path.normpath(path)
+        self.__filenames_lock.acquire_read()
+        try:
+            retval = self.__tries.get((path, suffix))
+        finally:
+            self.__filenames_lock.release_read()
+        if retval is None:
+            retval = PhraseTrie([w for w in (words_of_filename(f, suffix) for f in self.filenames(path)) if w is not None])
+            self.__filenames_lock.acquire_write()
+            try:
+                self.__tries[(path, suffix)] = retval
+            finally:
+                self.__filenames_lock.release_write()
+        return retval
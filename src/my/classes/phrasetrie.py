@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""my.classes.phrasetrie
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This module contains the PhraseTrie class, a word-level trie of the phrases
+that we have cached for a voice. It lets us chop a sentence into cached
+phrases in (roughly) linear time, instead of rebuilding and stat()ing every
+possible window of words.
+
+Example:
+    Here is how to use it::
+
+        $ python3
+        >>> from my.classes.phrasetrie import PhraseTrie
+        >>> t = PhraseTrie([('good', 'morning'), ('good',), ('morning', 'charlie')])
+        >>> t.segment(['good', 'morning', 'charlie'])
+        [(0, 2, True), (2, 3, False)]
+        >>> t.segment(['good', 'morning', 'charlie'], fewest_clips=True)
+        [(0, 1, True), (1, 3, True)]
+
+Attributes:
+    none
+
+"""
+
+
+class PhraseTrie:
+    """Word-level trie of cached phrases.
+
+    Each phrase is a sequence of words (tokens). Each node of the trie is a
+    dictionary of word -> child node. A node that ends a phrase contains the
+    key None.
+
+    Attributes:
+        size (int): How many phrases are in the trie.
+
+    """
+
+    def __init__(self, phrases=None):
+        self._root = {}
+        self.size = 0
+        if phrases is not None:
+            for words in phrases:
+                self.add(words)
+
+    def add(self, words):
+        """Add a phrase (a sequence of words) to the trie."""
+        if len(words) == 0:
+            raise ValueError("I cannot add an empty phrase to the trie.")
+        node = self._root
+        for w in words:
+            node = node.setdefault(w, {})
+        if None not in node:
+            node[None] = True
+            self.size += 1
+
+    def discard(self, words):
+        """Remove a phrase (a sequence of words) from the trie, if it is there."""
+        path = [self._root]
+        for w in words:
+            if w not in path[-1]:
+                return
+            path.append(path[-1][w])
+        if None not in path[-1]:
+            return
+        del path[-1][None]
+        self.size -= 1
+        for i in range(len(words), 0, -1):
+            if len(path[i]) > 0:
+                break
+            del path[i - 1][words[i - 1]]
+
+    def __contains__(self, words) -> bool:
+        node = self._root
+        for w in words:
+            node = node.get(w)
+            if node is None:
+                return False
+        return None in node
+
+    def __len__(self) -> int:
+        return self.size
+
+    def matches(self, words, start:int=0) -> list:
+        """List every phrase that begins at words[start].
+
+        Args:
+            words: The sentence, as a list of words.
+            start: Where, in the sentence, the phrase must begin.
+
+        Returns:
+            list[int]: For each matching phrase, the index just past its
+                last word. Shortest first.
+
+        """
+        ends = []
+        node = self._root
+        for i in range(start, len(words)):
+            node = node.get(words[i])
+            if node is None:
+                break
+            if None in node:
+                ends.append(i + 1)
+        return ends
+
+    def segment(self, words, fewest_clips:bool=False, span_of_unmatched=None, keys=None) -> list:
+        """Chop a sentence into phrases from the trie.
+
+        In the default (greedy) mode, I take the longest phrase that starts
+        at the current word, then carry on from the end of it. That is what
+        smart_phrase_filenames() always did. If fewest_clips is True, I use
+        dynamic programming to find the segmentation with the fewest pieces:
+        fewer pieces means fewer audible joins.
+
+        Whenever no phrase starts at a given word, that word becomes an
+        unmatched piece. If span_of_unmatched is supplied, it decides how
+        many words the unmatched piece swallows (e.g. a time, plus its
+        A.M./P.M.). It's given the words, not the keys.
+
+        Args:
+            words: The sentence, as a list of words.
+            fewest_clips: If True, minimize the number of pieces.
+            span_of_unmatched (optional): func(words, i) -> end, where
+                end > i.
+            keys (optional): What to look each word up in the trie by, e.g.
+                the stems of the words' filenames. Default: the words.
+
+        Returns:
+            list[tuple]: (start, end, matched) for each piece, in order.
+
+        """
+        n = len(words)
+        keys = words if keys is None else keys
+
+        def unmatched_end(i):
+            return i + 1 if span_of_unmatched is None else max(i + 1, min(n, span_of_unmatched(words, i)))
+
+        if not fewest_clips:
+            pieces = []
+            i = 0
+            while i < n:
+                ends = self.matches(keys, i)
+                if ends:
+                    pieces.append((i, ends[-1], True))
+                    i = ends[-1]
+                else:
+                    end = unmatched_end(i)
+                    pieces.append((i, end, False))
+                    i = end
+            return pieces
+        cost = [0] * (n + 1)
+        choice = [None] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            ends = self.matches(keys, i)
+            if ends:
+                best = None
+                for end in reversed(ends):  # On a tie, the longer phrase wins.
+                    if best is None or 1 + cost[end] < cost[i]:
+                        best = end
+                        cost[i] = 1 + cost[end]
+                choice[i] = (best, True)
+            else:
+                end = unmatched_end(i)
+                cost[i] = 1 + cost[end]
+                choice[i] = (end, False)
+        pieces = []
+        i = 0
+        while i < n:
+            end, matched = choice[i]
+            pieces.append((i, end, matched))
+            i = end
+        return pieces
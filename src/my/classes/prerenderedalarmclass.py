@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""my.classes.prerenderedalarmclass
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This module contains the PrerenderedAlarm class. When the user sets the
+alarm, we know the time, the voice and (once we've picked them) the messages
+that will be spoken when it goes off. So, we render them then, in the
+background, instead of at the very moment when latency matters most.
+
+Example:
+    Here is how to use it::
+
+        $ python3
+        >>> from my.classes.prerenderedalarmclass import PrerenderedAlarm
+        >>> p = PrerenderedAlarm('Charlie')
+        >>> p.prepare('Freya', '07:30', "It's ${shorttime}. Get up.")
+        >>> sound = p.take('Freya', '07:30')   # None, if it isn't ready (or doesn't match)
+
+Attributes:
+    none
+
+"""
+
+from threading import Thread, Lock
+
+
+class PrerenderedAlarm:
+    """Pre-rendered alarm messages, keyed by (voice, alarm time, snoozed).
+
+    Each call to prepare() starts a background thread that renders one
+    message into a pygame.mixer.Sound. Preparing a message for a different
+    voice or time throws away whatever was rendered before, so a stale
+    message is never played.
+
+    Attributes:
+        owner (str): The owner of the alarm clock, e.g. Charlie.
+
+    """
+
+    def __init__(self, owner:str):
+        self.owner = owner
+        self._lock = Lock()
+        self._sounds = {}  # (voice, alarm_time, snoozed) => pygame.mixer.Sound (or None, while rendering)
+
+    def prepare(self, voice:str, alarm_time:str, message_template:str, snoozed:bool=False):
+        """Render this message, for this voice and alarm time (HH:MM), in the background."""
+        key = (voice, alarm_time, snoozed)
+        with self._lock:
+            for k in [k for k in self._sounds if k[2] == snoozed and k != key]:
+                del self._sounds[k]
+            self._sounds[key] = None
+        Thread(target=self._render, args=(key, message_template), daemon=True).start()
+
+    def _render(self, key:tuple, message_template:str):
+        from my.text2speech import render_this_smart_sentence
+        voice, alarm_time, _ = key
+        try:
+            sound = render_this_smart_sentence(self.owner, voice, message_template,
+                                               time_24h=int(alarm_time[:2]), time_minute=int(alarm_time[3:]))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print("Unable to pre-render the alarm message for %s at %s: %s" % (voice, alarm_time, str(e)))
+            return
+        with self._lock:
+            if key in self._sounds:  # ...unless it was invalidated while we were rendering it
+                self._sounds[key] = sound
+
+    def take(self, voice:str, alarm_time:str, snoozed:bool=False):
+        """Return the pre-rendered message for this voice and alarm time (HH:MM); or None, if it isn't ready."""
+        with self._lock:
+            return self._sounds.get((voice, alarm_time, snoozed))
+
+    def invalidate(self):
+        """Forget every pre-rendered message, e.g. because the alarm was canceled."""
+        with self._lock:
+            self._sounds = {}
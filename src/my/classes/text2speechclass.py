@@ -45,7 +45,8 @@ trimmed_sound = sound[start_trim:duration-end_trim]
 
 """
 from random import choice
-import os
+import io
+import subprocess
 
 from elevenlabs.client import ElevenLabs, Voice
 from elevenlabs.core.api_error import ApiError
@@ -53,17 +54,34 @@ from elevenlabs.core.api_error import ApiError
 from my.classes import singleton, ReadWriteLock
 from my.classes.exceptions import ElevenLabsMissingKeyError, ElevenLabsAPIError, ElevenLabsDownError
 from my.globals import ELEVENLABS_KEY_FILENAME
-from my.stringutils import flatten, generate_random_string
-from my.tools.sound.trim import convert_audio_recordings_list_into_an_mp3_file
+from my.stringutils import flatten
+from my.tools.webclient import shared_httpx_client
+from my.tools.sound.trim import convert_audio_recordings_list_into_one_audio_recording
 
 
 # import random
+def read_elevenlabs_key(key_filename:str) -> str:
+    """Read the Eleven Labs API key from the named file.
+
+    Raises:
+        ElevenLabsMissingKeyError: The specified file, which should contain
+            the API key, does not exist.
+
+    """
+    try:
+        return open(key_filename, 'r', encoding="utf-8").read().strip(' \n')
+    except FileNotFoundError as e:
+        raise ElevenLabsMissingKeyError ("Please save the Eleven Labs API key to {key_filename} and try again.".format(key_filename=key_filename)) from e
+
+
 def get_elevenlabs_clientclass(key_filename:str) -> ElevenLabs:
     """Retrieve the API class instance for interacting with the API.
 
     Using the key from the named filename, contact the Eleven Labs
     API and ask for the client class instance. This is how we
-    communicate with the API.
+    communicate with the API. Its connections are
+    my.tools.webclient's shared httpx client's: pooled, kept alive,
+    and HTTP/2 if h2 is installed.
 
     Arguments:
         key_filename: The pathname of the API key filename.
@@ -77,12 +95,10 @@ def get_elevenlabs_clientclass(key_filename:str) -> ElevenLabs:
             the API key, does not exist.
 
     """
-    try:
-        api_key = open(key_filename, 'r', encoding="utf-8").read().strip(' \n')
-    except FileNotFoundError as e:
-        raise ElevenLabsMissingKeyError ("Please save the Eleven Labs API key to {key_filename} and try again.".format(key_filename=key_filename)) from e
+    api_key = read_elevenlabs_key(key_filename)
     client = ElevenLabs(
-        api_key=api_key)
+        api_key=api_key,
+        httpx_client=shared_httpx_client())
     return client
 
 
@@ -98,6 +114,8 @@ class _Text2SpeechClass:
     in the property's getter method.
 
     Attributes:
+        api_key (str): The Eleven Labs API key, e.g. for
+            my.tools.synthesis.scheduler, which calls the API directly.
         api_models (list[str]): Human-readable list of available speech
             synthesis models. Some are better suited to English or American
             accents; some, to Indian- or Chinese-language voices, for
@@ -125,6 +143,7 @@ class _Text2SpeechClass:
 
     def __init__(self):
         self.key_filename = ELEVENLABS_KEY_FILENAME
+        self.api_key = read_elevenlabs_key(self.key_filename)
         self.client = get_elevenlabs_clientclass(self.key_filename)
         self.__api_models_lock = ReadWriteLock()
         self.__api_voices_lock = ReadWriteLock()
@@ -336,6 +355,18 @@ class _Text2SpeechClass:
     def boost(self):
         del self.__boost
 
+    @property
+    def synthesis_settings(self) -> dict:
+        """The model and voice settings that audio() would use for the current voice, e.g. for the cache catalog.
+
+        If the current voice doesn't use the advanced settings, ElevenLabs
+        uses its own defaults; so, they're all None.
+
+        """
+        if self.advanced is False:
+            return {'model': None, 'stability': None, 'similarity': None, 'style': None, 'boost': None}
+        return {'model': self.model, 'stability': self.stability, 'similarity': self.similarity, 'style': self.style, 'boost': self.boost}
+
     @property
     def all_voices(self) -> list:
         return [r.name for r in self.api_voices]
@@ -429,11 +460,9 @@ class _Text2SpeechClass:
             raise ValueError("Please supply audio data, not a string, when calling me.")
         if type(data) not in (list, tuple):
             data = [data]
-        if force_mpv is True:
-            exportfile = '/tmp/tts{rnd}'.format(rnd=generate_random_string(32))
-            convert_audio_recordings_list_into_an_mp3_file(data, exportfile, trim_level=trim_level)
-            os.system('mpv {exportfile}'.format(exportfile=exportfile))
-            os.unlink(exportfile)
+        if force_mpv is True:  # Pipe it to mpv as a WAV, which pydub writes without a temporary file
+            sounds = convert_audio_recordings_list_into_one_audio_recording(data=data, trim_level=trim_level, suffix='mp3')
+            subprocess.run(['mpv', '-'], input=sounds.export(io.BytesIO(), format='wav').getvalue(), check=False)
         else:
             from elevenlabs import play
             for d in data:
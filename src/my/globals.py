@@ -24,6 +24,18 @@ import os
 #         raise FileNotFoundError(e)
 
 ELEVENLABS_KEY_FILENAME = '%s%s%s' % (os.path.expanduser('~'), os.sep, '.eleven_api_key')  # e.g. /home/foo/.eleven_api_key
+ELEVENLABS_API_URL = 'https://api.elevenlabs.io'
+ELEVENLABS_DEFAULT_MODEL = 'eleven_multilingual_v2'
+SYNTHESIS_CONCURRENCY = 4  # requests in flight at once. ElevenLabs allows 2-15, depending on the subscription.
+SYNTHESIS_RATE_LIMIT = 4.0  # requests started per second
+HTTP_CONNECT_TIMEOUT = 5.0  # seconds. See my.tools.webclient.
+HTTP_READ_TIMEOUT = 60.0  # seconds, per read
+HTTP_POOL_SIZE = 16  # kept-alive connections per host
+HTTP_HOST_CONCURRENCY = {'api.elevenlabs.io': 15, 'zenquotes.io': 1}  # requests in flight per host, at most
+HTTP_DEFAULT_HOST_CONCURRENCY = 8  # ...for any other host
+SYNTHESIS_CHARACTERS_PER_RUN = None  # characters sent to ElevenLabs per regen run. If None, no limit.
+SYNTHESIS_CHARACTERS_PER_MONTH = None  # characters per calendar month, e.g. your subscription's quota. If None, no limit.
+REGEN_SKIPPED_VOICES = ('Brian',)  # ...unless named on regen_cache_for_voice.py's command line
 SOUNDS_CACHE_PATH = 'sounds/cache'
 SOUNDS_ALARMS_PATH = 'sounds/alarms'
 TRIMMED_ALARMS_PATH = 'sounds/trimmedalarms'
@@ -31,6 +43,8 @@ SOUNDS_FARTS_PATH = 'sounds/farts'
 LAZY_SILENCE_THRESHOLD = -65.0
 DEFAULT_SILENCE_THRESHOLD = -50.0
 SNIPPY_SILENCE_THRESHOLD = -30.0
+SOUNDS_CACHE_BUDGET = None  # bytes. If None, SOUNDS_CACHE_BUDGET_FRACTION of the partition that the cache is on.
+SOUNDS_CACHE_BUDGET_FRACTION = 0.5
 _faces_dct = {  # 'neon 1':'ui/clocks/neon-clock-css-jquery/dist/index.html',
 #             'neon 2':'ui/clocks/this-neon/dist/index.html',
              'braun':'ui/clocks/braun-clock/dist/index.html',
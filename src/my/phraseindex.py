@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Creates singleton for _PhraseIndexClass
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Attributes:
+    PhraseIndexSingleton
+        .exists(pathname)       is this file in the cache?
+        .add(pathname)          a file was just written
+        .discard(pathname)      a file was just deleted
+        .filenames(path)        everything in that directory
+
+Notes:
+    Each directory is listed once, the first time it is queried. After
+    that, lookups never touch the filesystem.
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+from my.classes.phraseindexclass import _PhraseIndexClass
+
+PhraseIndexSingleton = _PhraseIndexClass()
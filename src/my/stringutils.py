@@ -27,7 +27,7 @@ import requests
 
 from my.classes.exceptions import WebAPITimeoutError, WebAPIOutputError
 from my.consts import alarm_messages_lst, postsnooze_alrm_msgs_lst
-from my.tools import logit
+from my.tools import logit, webclient
 from my.globals import SOUNDS_CACHE_PATH
 
 MAX_RANDGENSTR_LEN = 99999  # used by generate_random_string()
@@ -96,7 +96,8 @@ def get_random_zenquote(timeout:int=10) -> str:
     """Return an uplifting quote.
 
     Using the API at https://zenquotes.io, I retrieve a random quote --
-    something uplifting -- and return it as a string.
+    something uplifting -- and return it as a string. The connection is
+    my.tools.webclient's, so that it's kept alive between refreshes.
 
     Args:
         timeout (optional): Timeout before returning string (or failing).
@@ -109,11 +110,11 @@ def get_random_zenquote(timeout:int=10) -> str:
         WebAPIOutputError: Website's output was incomprehensible.
 
     """
-    response = requests.get('https://zenquotes.io/api/random', timeout=timeout)
     try:
+        response = webclient.request('GET', 'https://zenquotes.io/api/random', timeout=timeout)
         data = response.json()[0]
         quote = data['q'] + ' - ' + data['a']
-    except (TimeoutError, ConnectionError) as e:
+    except (TimeoutError, ConnectionError, requests.Timeout, requests.ConnectionError) as e:
         raise WebAPITimeoutError("The ZenQuotes website timed out") from e
     except (KeyError, IndexError) as e:
         raise WebAPIOutputError("The output from the ZenQuotes website was incomprehensible") from e
@@ -356,11 +357,44 @@ def pathname_of_phrase_audio(voice:str, text:str=None, suffix:str='ogg') -> str:
     elif suffix not in ('mp3', 'ogg'):
         raise ValueError('suffix must be ogg or mp3')
     else:
-        text = text.strip(' ')
-        return '{cache}/{voice}/{text}.{suffix}'.format(suffix=suffix,
+        return '{cache}/{voice}/{stem}.{suffix}'.format(suffix=suffix,
                                                     cache=SOUNDS_CACHE_PATH,
                                                     voice=voice,
-                                                    text=text.lower().replace(' ', '_').replace('.', '^')).replace('!', '&').replace('"', "'")
+                                                    stem=phrase_audio_stem(text))
+
+
+def phrase_audio_stem(text:str) -> str:
+    """Convert a phrase into the stem of the filename of its cached audio.
+
+    Example:
+        >>> phrase_audio_stem("Good morning, Charlie!")
+        'good_morning,_charlie&'
+
+    Args:
+        text: The phrase (or a single word of it).
+
+    Returns:
+        str: The filename, minus directory and suffix.
+
+    """
+    return text.strip(' ').lower().replace(' ', '_').replace('.', '^').replace('!', '&').replace('"', "'")
+
+
+def span_of_time_words(all_words:list, wordno:int) -> int:
+    """Where an uncached time, such as '7:45', that starts at all_words[wordno] ends: after the 'a.m.' or 'p.m.' that follows it, if any.
+
+    Args:
+        all_words: The sentence's words, as spoken (not their filename stems).
+        wordno: Where the time starts.
+
+    Returns:
+        int: The index of the first word after it.
+
+    """
+    if ':' in all_words[wordno] and len(all_words[wordno]) >= 4 \
+    and wordno + 1 < len(all_words) and all_words[wordno + 1][:4] in ('a.m.', 'p.m.'):
+        return wordno + 2
+    return wordno + 1
 
 
 def list_files_in_dir(path, endswith_str=None):
@@ -36,18 +36,35 @@ from random import choice
 from datetime import datetime
 from os import listdir
 from os.path import isfile, join
+from threading import Lock
 
 from pydub.exceptions import CouldntDecodeError
 
-from my.classes.exceptions import NoProfessionalVoicesError, MissingFromCacheError
+from my.classes.exceptions import NoProfessionalVoicesError, MissingFromCacheError, ElevenLabsMissingKeyError
 from my.consts import hours_lst, minutes_lst, farting_msgs_lst, OWNER_NAME, hello_owner_lst, wannasnooze_msgs_lst, \
     postsnooze_alrm_msgs_lst, alarm_messages_lst, motivational_comments_lst
-from my.stringutils import generate_detokenized_message, pathname_of_phrase_audio
+from my.stringutils import generate_detokenized_message, pathname_of_phrase_audio, phrase_audio_stem, span_of_time_words
 from my.tools.sound.trim import convert_audio_recordings_list_into_one_audio_recording
 from pydub.audio_segment import AudioSegment
-from my.globals import ELEVENLABS_KEY_FILENAME, SOUNDS_FARTS_PATH
+from my.globals import ELEVENLABS_KEY_FILENAME, SOUNDS_FARTS_PATH, SYNTHESIS_CONCURRENCY, SYNTHESIS_RATE_LIMIT
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.budget import bare_stem, enforce_budget, note_played
+from my.tools.cache.bundle import bundle_of_directory, drop_bundle
+from my.tools.cache.janitor import sweep_cache
+from my.tools.cache.catalog import catalog_of_clip, catalog_of_root, forget_clip, record_clip, rename_clip
+from my.tools.cache.store import intern_clip, synthesis_key
+from my.tools.cache.sniff import sniff_audio_format
+from my.tools.cache.trims import TRIMS_SAVE_EVERY, save_trims, trim_offsets
+from my.tools.synthesis.batch import BatchSynthesizer
+from my.tools.synthesis.planner import SynthesisPlan, plan_synthesis
+from my.tools.synthesis.progress import RegenProgress, clip_bytes
+from my.tools.synthesis.quota import CharacterBudget, priority_key
+from my.tools.synthesis.scheduler import SynthesisJob, SynthesisScheduler, write_atomically
+from my.tools.synthesis.worker import synthesize_in_worker
 import time
 from my.tools.sound import play_audiofile, queue_oggfile, convert_one_mp3_to_ogg_file
+from my.tools.sound.transcode import save_manifest
+from my.tools.sound.pcm import audiosegment_to_sound, pydub_format_of_mixer
 import pygame
 
 print("my.text2speech -- importing/creating text2speech singleton")
@@ -97,8 +114,8 @@ def get_first_prof_name(tts:Text2SpeechSingleton) -> str:
 
 
 def look_for_dupes():
-    if 0 == os.system("""ls sounds/cache/*/*\\ * 2> /dev/null"""):
-        os.system("""rm sounds/cache/*/*\\ *""")  #        raise SystemError("Somehow, I ended up with spare files for audio cache")
+    """Tidy up the whole speech cache. Expensive: call it once per regen run, not per phrase."""
+    sweep_cache()
 
 # def speak_random_alarm(owner_name:str, time_24h:int, time_minutes:int, voice:str=None, tts=Text2SpeechSingleton):
 #     """Speak an alarm warning.
@@ -180,48 +197,182 @@ def phrase_audio(voice:str, text:str, suffix, raise_exception_if_not_cached:bool
     if len(text) == 0:
 #        print("An empty phrase HAS no audio file associated with it.")
         return None
-    elif not os.path.exists(outfile):
+    elif not phrase_index.exists(outfile):
         if raise_exception_if_not_cached:
             raise MissingFromCacheError("'{text}' (for {voice}) should have been cached not hasn't been.".format(text=text, voice=voice))
 #        print(voice, '==>', text)
         print("Generating speech audio (spoken by {voice}) for '{text}'".format(voice=voice, text=text))
         vers = sys.version_info
-        look_for_dupes()
         major_ver, minor_ver = vers[:2]
-        if major_ver < 3 or minor_ver < 11:  # Some versions of Python can't handle Eleven Labs. Therefore, we call the bash script, will calls the correct version. Or something.
-            os.system('''./_cachespeech.sh "{voice}" "{text}" "{outfile}"'''.format(voice=voice, text=text, outfile=outfile))
+        print("Writing >>>%s<<<" % (outfile[:-4] + '.mp3'))
+        os.system('mkdir -p "{mydir}"'.format(mydir=os.path.dirname(outfile)))
+        try:
+            assert(text[0] not in ('?!;:,. (){}'))
+        except AssertionError as e:
+            raise ValueError(">>>%s<<< is invalid. Its starting character sucks ass." % text) from e
+        try:
+            os.unlink(outfile[:-4] + '.mp3')
+        except FileNotFoundError:
+            pass
+        if major_ver < 3 or minor_ver < 11:  # Some versions of Python can't handle Eleven Labs. So, a worker process, on a version that can, does the talking.
+            data, settings = synthesize_in_worker(voice, text)
         else:
-            print("Writing >>>%s<<<" % (outfile[:-4] + '.mp3'))
             old_v = Text2SpeechSingleton.voice
             Text2SpeechSingleton.voice = voice
-            look_for_dupes()
-            os.system('mkdir -p "{mydir}"'.format(mydir=os.path.dirname(outfile)))
-            try:
-                assert(text[0] not in ('?!;:,. (){}'))
-            except AssertionError as e:
-                raise ValueError(">>>%s<<< is invalid. Its starting character sucks ass." % text) from e
-            try:
-                os.unlink(outfile[:-4] + '.mp3')
-            except FileNotFoundError:
-                pass
-            with open(outfile[:-4] + '.mp3', 'wb') as f:
-                f.write(Text2SpeechSingleton.audio(text))
+            data = Text2SpeechSingleton.audio(text)
+            settings = Text2SpeechSingleton.synthesis_settings
             Text2SpeechSingleton.voice = old_v
-            look_for_dupes()
-            print("Saved audio data to", outfile[:-4] + '.mp3')
-            print("Converting", outfile[:-4] + '.mp3', "to", outfile[:-4] + '.ogg')
-            convert_one_mp3_to_ogg_file(outfile[:-4] + '.mp3', outfile[:-4] + '.ogg')
-            assert(os.path.exists(outfile[:-4] + '.mp3'))
-            assert(os.path.exists(outfile[:-4] + '.ogg'))
-            look_for_dupes()
-            print("phrase_audio() output is  >>>%s<<< (and we just created it)" % outfile)
+        write_atomically(outfile[:-4] + '.mp3', data)  # ...so that a crash never leaves half a clip
+        print("Saved audio data to", outfile[:-4] + '.mp3')
+        add_synthesized_clip_to_cache(voice, text, outfile[:-4] + '.mp3', settings)
+        assert(os.path.exists(outfile[:-4] + '.mp3'))
+        assert(os.path.exists(outfile[:-4] + '.ogg'))
+        print("phrase_audio() output is  >>>%s<<< (and we just created it)" % outfile)
+        with open(outfile, 'rb') as f:
+            return f.read()  # ...not the bundle's copy, which predates it
 #    else:
 #        print("phrase_audio() output is  >>>%s<<< (and it already exists)" % outfile)
-    look_for_dupes()
+    bundle = bundle_of_directory(os.path.dirname(outfile))
+    if bundle is not None and os.path.basename(outfile) in bundle:
+        return bundle.read(os.path.basename(outfile))
     with open(outfile, 'rb') as f:
         return f.read()
 
 
+def add_synthesized_clip_to_cache(voice:str, text:str, mp3fname:str, settings:dict, save:bool=True):
+    """This mp3 has just come from ElevenLabs. Index it, catalog it, make its ogg, and store both by their contents.
+
+    If save is False, the directory's trims file and transcode manifest aren't written; the caller does that, once for many clips.
+    """
+    phrase_index.add(mp3fname)
+    record_clip(mp3fname, phrase=text, settings=settings, synthesis_key=synthesis_key(voice, text, settings))
+    print("Converting", mp3fname, "to", mp3fname[:-4] + '.ogg')
+    convert_one_mp3_to_ogg_file(mp3fname, mp3fname[:-4] + '.ogg', save=save)
+    phrase_index.add(mp3fname[:-4] + '.ogg')
+    intern_clip(mp3fname)  # If we've heard these exact bytes before, store them once
+    intern_clip(mp3fname[:-4] + '.ogg')
+
+
+def synthesis_settings_of_voice(voice:str) -> dict:
+    """The settings (see _Text2SpeechClass.synthesis_settings) that phrase_audio() would use for this voice."""
+    old_v = Text2SpeechSingleton.voice
+    Text2SpeechSingleton.voice = voice  # ...which decides whether the advanced settings apply
+    try:
+        return Text2SpeechSingleton.synthesis_settings
+    finally:
+        Text2SpeechSingleton.voice = old_v
+
+
+def synthesis_job(voice:str, text:str, settings:dict=None) -> SynthesisJob:
+    """A job (see my.tools.synthesis.scheduler) that would make the same mp3 that phrase_audio() would make."""
+    mp3fname = pathname_of_phrase_audio(voice, text, suffix='mp3')
+    text = text.lower().strip(' ')
+    while len(text) > 1 and text[0] in ' !?;:.,':
+        text = text[1:]
+    return SynthesisJob(voice=voice, voice_id=Text2SpeechSingleton.id_of_a_name(voice), text=text,
+                        settings=synthesis_settings_of_voice(voice) if settings is None else settings, outfile=mp3fname)
+
+
+def plan_synthesis_for_voice(voice:str, phrases:list) -> SynthesisPlan:
+    """Check each of these phrases against this voice's cache, once, and say which need synthesizing. See my.tools.synthesis.planner."""
+    settings = None if Text2SpeechSingleton is None else synthesis_settings_of_voice(voice)
+    keys = {} if settings is None else catalog_of_root().synthesis_keys(voice)
+
+    def is_cached(phrase):  # The phrase index, not the catalog: it's what is on disk (or in the bundle), whatever the catalog was told
+        return phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix='mp3')) \
+            and phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix='ogg'))
+
+    def is_stale(phrase):
+        key = keys.get(os.path.basename(pathname_of_phrase_audio(voice, phrase, suffix='mp3')))
+        return key is not None and key != synthesis_key(voice, phrase, settings)
+
+    return plan_synthesis(voice, phrases, is_cached, is_stale, settings)
+
+
+def synthesize_plan(plan:SynthesisPlan, concurrency:int=SYNTHESIS_CONCURRENCY, rate_limit:float=SYNTHESIS_RATE_LIMIT, on_done=None,
+                    budget:CharacterBudget=None, batch:bool=False, progress:RegenProgress=None) -> list:
+    """Synthesize everything in this plan, several phrases at once. Stale phrases are deleted first.
+
+    If on_done is given, on_done(job) is called after each job's clips are
+    cached (e.g. to journal it; see my.tools.cache.journal). If budget is
+    given, whatever of the plan it can't afford is deferred (see
+    SynthesisPlan.defer_beyond()), and each request is charged to it. If batch
+    is True, short phrases are sent several to a request (see
+    my.tools.synthesis.batch). If progress is given, each request, each
+    conversion and each phrase done is reported to it (see
+    my.tools.synthesis.progress).
+
+    Returns:
+        list[SynthesisJob]: The jobs that failed. See job.error.
+
+    """
+    if budget is not None and budget.remaining() is not None:
+        plan.defer_beyond(budget.remaining())
+    if len(plan) == 0:
+        return []
+    if Text2SpeechSingleton is None:
+        raise ElevenLabsMissingKeyError("I can't synthesize anything without ElevenLabs.")
+    for phrase in plan.stale:
+        forget_phrase(plan.voice, phrase)
+    jobs = [synthesis_job(plan.voice, phrase, plan.settings) for phrase in plan.work]
+    print("Synthesizing %d of %s's phrases (%d characters), %d at a time" % (len(jobs), plan.voice, plan.characters, concurrency))
+    path = pathname_of_phrase_audio(plan.voice)
+    unsaved = [0]  # clips whose trims haven't been written yet
+    unsaved_lock = Lock()
+
+    def save_voice_trims():
+        save_trims(path)
+        save_manifest(path)
+
+    def cache_it(job):
+        if budget is not None:
+            budget.spend(len(job.text))
+        if progress is None:
+            add_synthesized_clip_to_cache(job.voice, job.text, job.outfile, job.settings, save=False)
+        else:
+            with progress.transcoding(job.voice):
+                add_synthesized_clip_to_cache(job.voice, job.text, job.outfile, job.settings, save=False)
+            progress.phrase_done(job.voice, len(job.text), clip_bytes(job.outfile))
+        with unsaved_lock:
+            unsaved[0] += 1
+            due = unsaved[0] >= TRIMS_SAVE_EVERY
+            if due:
+                unsaved[0] = 0
+        if due:  # ...every so often, rather than every clip, so that a crash loses little
+            save_voice_trims()
+        if on_done is not None:
+            on_done(job)
+
+    scheduler_kwargs = dict(api_key=Text2SpeechSingleton.api_key, concurrency=concurrency, rate_limit=rate_limit, on_done=cache_it,
+                            on_latency=None if progress is None else lambda seconds: progress.request_done(plan.voice, seconds))
+    if batch:  # A batch's separators (and any batch that's done again, one phrase at a time) are charged too.
+        scheduler = BatchSynthesizer(on_overhead=None if budget is None else budget.spend, **scheduler_kwargs)
+    else:
+        scheduler = SynthesisScheduler(**scheduler_kwargs)
+    try:
+        failures = [job for job in scheduler.run(jobs) if not job.done]
+    finally:
+        save_voice_trims()
+    if progress is not None and failures != []:
+        progress.failed(plan.voice, len(failures))
+    for job in failures:
+        print("Failed to synthesize %s's >>>%s<<<: %s" % (job.voice, job.text, str(job.error)))
+    return failures
+
+
+def synthesize_phrases(voice:str, phrases:list, concurrency:int=SYNTHESIS_CONCURRENCY, rate_limit:float=SYNTHESIS_RATE_LIMIT) -> list:
+    """Cache every one of these phrases that this voice lacks (or that is stale), several at once.
+
+    This does, in bulk and in parallel, what cache_one_phrase() does for
+    one phrase at a time. Phrases that are cached already are skipped.
+
+    Returns:
+        list[SynthesisJob]: The jobs that failed. See job.error.
+
+    """
+    return synthesize_plan(plan_synthesis_for_voice(voice, sorted(set(phrases))), concurrency, rate_limit)
+
+
 def list_phrases_to_handle(smart_phrase):
     # FIXME WRITE DOX
     phrases_to_handle = []
@@ -278,9 +429,53 @@ def deliberately_cache_a_smart_sentence(voice:str, smart_phrase:str):
                     os.unlink(pathname_of_phrase_audio(voice, phrase, suffix=suffix))
                 except FileNotFoundError:
                     pass
+                phrase_index.discard(pathname_of_phrase_audio(voice, phrase, suffix=suffix))
+                forget_clip(pathname_of_phrase_audio(voice, phrase, suffix=suffix))
             deliberately_cache_a_smart_sentence(voice, phrase)
 
 
+def current_synthesis_key(voice:str, text:str) -> str:
+    """The synthesis key (see my.tools.cache.store) that this voice saying this text would have, if we synthesized it now."""
+    return synthesis_key(voice, text, synthesis_settings_of_voice(voice))
+
+
+def forget_phrase(voice:str, phrase:str):
+    """Delete this phrase's mp3, ogg and pcm from this voice's cache, and forget them.
+
+    If the voice's bundle (see my.tools.cache.bundle) holds any of them, the
+    bundle goes too; else, it would go on serving the old clip.
+    """
+    mp3fname = pathname_of_phrase_audio(voice, phrase, suffix='mp3')
+    fnames = (mp3fname, mp3fname[:-4] + '.ogg', mp3fname[:-4] + '.pcm')
+    for fname in fnames:
+        try:
+            os.unlink(fname)
+        except FileNotFoundError:
+            pass
+        phrase_index.discard(fname)
+        forget_clip(fname)
+    bundle = bundle_of_directory(os.path.dirname(mp3fname))
+    if bundle is not None and any(os.path.basename(fname) in bundle for fname in fnames):
+        drop_bundle(os.path.dirname(mp3fname))
+        phrase_index.forget(os.path.dirname(mp3fname))  # ...which was listing the bundle's contents
+
+
+def forget_stale_phrase(voice:str, phrase:str) -> bool:
+    """If the cached audio of this phrase was synthesized with other settings than today's, delete it, so that it's made again.
+
+    Returns:
+        bool: True if it was stale.
+
+    """
+    mp3path = pathname_of_phrase_audio(voice, phrase, suffix='mp3')
+    catalog = catalog_of_clip(mp3path)
+    if Text2SpeechSingleton is None or catalog is None or not phrase_index.exists(mp3path) or not catalog.is_stale(mp3path, current_synthesis_key(voice, phrase)):
+        return False
+    print("%s's >>>%s<<< was synthesized with other settings. I'll make it again." % (voice, phrase))
+    forget_phrase(voice, phrase)
+    return True
+
+
 def cache_one_phrase(voice:str, phrase:str):
     print("Does %s's >>>%s<<< have a cached audio file?" % (voice, phrase))
     if len(phrase) == 0:
@@ -292,49 +487,65 @@ def cache_one_phrase(voice:str, phrase:str):
     if 0 == sum(c.isdigit() for c in phrase) + sum(c.isalpha() for c in phrase):
         raise ValueError("Rejecting >>>%s<<< because it has no letters or numbers in it & is therefore unpronounceable." % phrase)
     phrase_path = pathname_of_phrase_audio(voice, phrase)
-    if 0 == os.system('file "%s" | grep Ogg' % pathname_of_phrase_audio(voice, phrase, suffix='mp3')):
+    forget_stale_phrase(voice, phrase)
+    if sniff_audio_format(pathname_of_phrase_audio(voice, phrase, suffix='mp3')) == 'ogg':
         print("This mp3 file is actually ogg. So, I'm renaming it.")
         os.rename(pathname_of_phrase_audio(voice, phrase, suffix='mp3'),
                   pathname_of_phrase_audio(voice, phrase, suffix='ogg'))
-    if 0 == os.system('file "%s" | grep MPEG' % pathname_of_phrase_audio(voice, phrase, suffix='ogg')):
+        phrase_index.rename(pathname_of_phrase_audio(voice, phrase, suffix='mp3'),
+                            pathname_of_phrase_audio(voice, phrase, suffix='ogg'))
+        rename_clip(pathname_of_phrase_audio(voice, phrase, suffix='mp3'),
+                    pathname_of_phrase_audio(voice, phrase, suffix='ogg'))
+    if sniff_audio_format(pathname_of_phrase_audio(voice, phrase, suffix='ogg')) == 'mp3':
         print("This ogg file is actually mp3. So, I'm renaming it.")
         os.rename(pathname_of_phrase_audio(voice, phrase, suffix='ogg'),
                   pathname_of_phrase_audio(voice, phrase, suffix='mp3'))
-    if 0 == os.system('file "%s" | fgrep ": empty"' % phrase_path) and os.path.exists(phrase_path):
+        phrase_index.rename(pathname_of_phrase_audio(voice, phrase, suffix='ogg'),
+                            pathname_of_phrase_audio(voice, phrase, suffix='mp3'))
+        rename_clip(pathname_of_phrase_audio(voice, phrase, suffix='ogg'),
+                    pathname_of_phrase_audio(voice, phrase, suffix='mp3'))
+    if sniff_audio_format(phrase_path) == 'empty':
         print("FYI, >>>%s<<< was empty. I'll delete it now." % phrase_path)
         os.unlink(phrase_path)
-    if os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
-    and not os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
+        phrase_index.discard(phrase_path)
+        forget_clip(phrase_path)
+    if phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
+    and not phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
         print("Does %s's >>>%s<<< have a cached audio file? Yes, MP3; no, OGG. Let's convert MP3 to OGG, just in case." % (voice, phrase))
         try:
             convert_one_mp3_to_ogg_file(phrase_path[:-4] + '.mp3', phrase_path[:-4] + '.ogg')
-            assert(os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")))
-            assert(os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")))
+            phrase_index.add(phrase_path[:-4] + '.ogg')
+            assert(phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")))
+            assert(phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")))
         except CouldntDecodeError:
             print("Oh, dear. The source file sucks. I'll delete it and its ogg counterpart ==>", phrase_path[:-4] + '.mp3')
             os.unlink(phrase_path[:-4] + '.mp3')
+            phrase_index.discard(phrase_path[:-4] + '.mp3')
             try:
                 os.unlink(phrase_path[:-4] + '.ogg')
             except FileNotFoundError:
                 pass
+            phrase_index.discard(phrase_path[:-4] + '.ogg')
     assert(pathname_of_phrase_audio(voice, phrase, suffix="mp3") == phrase_path[:-4] + '.mp3')
     assert(pathname_of_phrase_audio(voice, phrase, suffix="ogg") == phrase_path[:-4] + '.ogg')
-    if os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
-    and os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
+    if phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
+    and phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
         print("Does {voice}'s >>>{phrase}<<< have a cached audio file? YES (mp3+ogg)".format(voice=voice, phrase=phrase))
     else:
         print("Does {voice}'s >>>{phrase}<<< have a cached audio file? NO. So, I'll create a pair (mp3+ogg).".format(voice=voice, phrase=phrase))
-        if not os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
-        and os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
+        if not phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="mp3")) \
+        and phrase_index.exists(pathname_of_phrase_audio(voice, phrase, suffix="ogg")):
             print("We have the OGG but not the MP3. That is surprising. Still, we can cope.")
         try:
             os.unlink(pathname_of_phrase_audio(voice, phrase, suffix="ogg"))
         except FileNotFoundError as _:
             pass
+        phrase_index.discard(pathname_of_phrase_audio(voice, phrase, suffix="ogg"))
         _ = phrase_audio(voice, phrase, suffix='mp3')
         assert(os.path.exists(pathname_of_phrase_audio(voice, phrase, suffix='mp3')))
         try:
             convert_one_mp3_to_ogg_file(phrase_path[:-4] + '.mp3', phrase_path[:-4] + '.ogg')
+            phrase_index.add(phrase_path[:-4] + '.ogg')
         except Exception as e:
             errstr = "Failed to convert", phrase_path[:-4] + '.mp3', "to", phrase_path[:-4] + '.ogg', "and now I have to figure out why"
             raise SystemError(errstr) from e
@@ -344,125 +555,118 @@ def cache_one_phrase(voice:str, phrase:str):
 
 
 def check_that_files_are_mp3_and_ogg(voice, phrase):
-    if 0 != os.system('file "%s" | grep MPEG > /dev/null' % pathname_of_phrase_audio(voice, phrase, suffix='mp3')):
+    if sniff_audio_format(pathname_of_phrase_audio(voice, phrase, suffix='mp3')) != 'mp3':
         raise SystemError(">>>%s<<< should be an MP3 but it's not." % pathname_of_phrase_audio(voice, phrase, suffix='mp3'))
-    if 0 != os.system('file "%s" | grep Ogg > /dev/null' % pathname_of_phrase_audio(voice, phrase, suffix='ogg')):
+    if sniff_audio_format(pathname_of_phrase_audio(voice, phrase, suffix='ogg')) != 'ogg':
         raise SystemError(">>>%s<<< should be an OGG but it's not." % pathname_of_phrase_audio(voice, phrase, suffix='ogg'))
 
 
-def smart_phrase_audio(voice:str, smart_phrase:str, owner:str, time_24h:int=None, time_minutes:int=None, trim_level:int=1, suffix='ogg') -> AudioSegment:
-    assert(suffix in ('mp3', 'ogg'))
-    assert(owner == OWNER_NAME)  #     assert(owner not in (None, '', 'mp3', 'ogg'))
-    # FIXME This is a badly written subroutine. Clean it up. Document it. Thank you.
-    smart_phrase = smart_phrase.replace('${owner}', owner)  # This way, 'Hello ${owner}' is stored as 'Hello, Charlie' or whatever.
-    look_for_dupes()
+def detokenized_smart_phrase(smart_phrase:str, owner:str=None, time_24h:int=None, time_minutes:int=None) -> str:
+    """Turn a smart phrase into the lowercase sentence that we will actually speak.
+
+    If owner, hour and minute are all supplied, the ${...} tokens are filled
+    in. Otherwise, they are dropped.
+
+    """
     if owner is not None and time_24h is not None and time_minutes is not None:
         detokenized_phrase = generate_detokenized_message(owner, time_24h, time_minutes, smart_phrase)
         detokenized_phrase = detokenized_phrase.replace('12 newn', '12:00 P.M.').replace('12 midnight', '12:00 A.M.')
     else:
         detokenized_phrase = ''.join(r + ' ' for r in list_phrases_to_handle(smart_phrase)).strip(' ')
-    detokenized_phrase = detokenized_phrase.lower()
+    return detokenized_phrase.lower().replace('..', '.!')  # e.g. a.m.., p.m..
+
+
+def smart_phrase_segments(voice:str, detokenized_phrase:str, suffix:str='ogg', fewest_clips:bool=False) -> list:
+    """Chop a sentence into the phrases that are in our cache.
+
+    The sentence is split into words and segmented with the voice's
+    PhraseTrie. By default, I take the longest cached phrase at each point
+    (greedy); if fewest_clips is True, I pick the segmentation that needs
+    the fewest clips, so that there are fewer audible joins. A time such as
+    '7:45 a.m.' that isn't cached as-is is spoken as its hour, minute and
+    A.M./P.M. Words without letters or digits are ignored.
+
+    Args:
+        voice: The name of the voice.
+        detokenized_phrase: The sentence, e.g. from detokenized_smart_phrase().
+        suffix: mp3 or ogg
+        fewest_clips: If True, minimize the number of clips.
+
+    Returns:
+        list[tuple]: (text, pathname) for each clip, in order. If the clip
+            is missing from the cache, pathname is None.
+
+    """
+    all_words = [r for r in detokenized_phrase.lower().split(' ') if r != '']
+    stems = [phrase_audio_stem(r) for r in all_words]
+    trie = phrase_index.trie(pathname_of_phrase_audio(voice), suffix)
+    segments = []
+    for (start, end, matched) in trie.segment(all_words, fewest_clips=fewest_clips, span_of_unmatched=span_of_time_words, keys=stems):
+        text = ' '.join(all_words[start:end])
+        if matched:
+            segments.append((text, pathname_of_phrase_audio(voice, text, suffix=suffix)))
+        elif ':' in all_words[start] and len(all_words[start]) >= 4:
+            print("TIME <=", text)
+            for s in generate_timedate_phrases_list(text):
+                outfile = pathname_of_phrase_audio(voice, s, suffix=suffix)
+                segments.append((s, outfile if phrase_index.exists(outfile) else None))
+        elif sum(c.isdigit() for c in text) + sum(c.isalpha() for c in text) == 0:
+            print("Ignoring >>>%s<<<" % text)
+        else:
+            segments.append((text, None))
+    return segments
+
+
+def smart_phrase_audio(voice:str, smart_phrase:str, owner:str, time_24h:int=None, time_minutes:int=None, trim_level:int=1, suffix='ogg', fewest_clips:bool=False) -> AudioSegment:
+    """Render a smart phrase, using snippets from our cache, as one AudioSegment.
+
+    Raises:
+        MissingFromCacheError: A snippet that we need has not been cached.
+
+    """
+    assert(suffix in ('mp3', 'ogg'))
+    assert(owner == OWNER_NAME)  #     assert(owner not in (None, '', 'mp3', 'ogg'))
+    smart_phrase = smart_phrase.replace('${owner}', owner)  # This way, 'Hello ${owner}' is stored as 'Hello, Charlie' or whatever.
+    detokenized_phrase = detokenized_smart_phrase(smart_phrase, owner, time_24h, time_minutes)
     data = []
-    all_words = [r.lower().strip(' ') for r in detokenized_phrase.split(' ')]
-    firstwordno = 0
-    while firstwordno < len(all_words):
-        lastwordno = len(all_words)
-        while lastwordno > firstwordno:
-            searchforthis = ''.join([r + ' ' for r in all_words[firstwordno:lastwordno]]).strip()
-            if not os.path.exists(pathname_of_phrase_audio(voice, searchforthis)):
-                lastwordno -= 1
-            elif len(searchforthis) == 0:
-                break
-            else:
-                firstwordno = lastwordno - 1
-                look_for_dupes()
-                the_new_audio_data = phrase_audio(voice, searchforthis, suffix=suffix)
-                if the_new_audio_data is not None:
-                    data.append(the_new_audio_data)
-                break
-        if lastwordno == firstwordno:
-            if searchforthis == '':
-                print('Ignoring', searchforthis)
-            elif ':' in searchforthis and len(searchforthis) >= 4:
-                if lastwordno + 1 < len(all_words) and all_words[lastwordno + 1].lower()[:4] in ('a.m.', 'p.m.'):
-                    lastwordno += 1
-                    searchforthis = ''.join([r + ' ' for r in all_words[firstwordno:lastwordno + 1]]).strip()
-                print("TIME <=", searchforthis)
-                for s in generate_timedate_phrases_list(searchforthis):
-                    look_for_dupes()
-                    outfile = pathname_of_phrase_audio(voice, s)
-                    if not os.path.exists(outfile):
-                        raise MissingFromCacheError("{voice} => {s} <= {outfile} => (time thingy) is missing from the cache".format(s=s, voice=voice, outfile=outfile))
-                    the_new_audio_data = phrase_audio(voice, s, suffix=suffix)
-                    if the_new_audio_data is not None:
-                        data.append(the_new_audio_data)
-                    look_for_dupes()
-                firstwordno = lastwordno
-            elif sum(c.isdigit() for c in searchforthis) + sum(c.isalpha() for c in searchforthis) == 0:
-                print("Ignoring", searchforthis)
-            else:
-                outfile = pathname_of_phrase_audio(voice, searchforthis)
-                if searchforthis in ('', ',', '.', ';', ':', '?', '!', " "):
-                    print("Warning -- searchforthis was %s; weird" % searchforthis)
-                else:
-                    raise MissingFromCacheError("{voice} => {searchforthis} <= {outfile} => is missing from the cache".format(searchforthis=searchforthis, voice=voice, outfile=outfile))
-        firstwordno += 1
-    return convert_audio_recordings_list_into_one_audio_recording(data=data, trim_level=trim_level, suffix=suffix)
+    silences = []
+    for text, outfile in smart_phrase_segments(voice, detokenized_phrase, suffix=suffix, fewest_clips=fewest_clips):
+        if outfile is None:
+            raise MissingFromCacheError("{voice} => {text} <= is missing from the cache".format(text=text, voice=voice))
+        the_new_audio_data = phrase_audio(voice, text, suffix=suffix)
+        if the_new_audio_data is not None:
+            data.append(the_new_audio_data)
+            silences.append(trim_offsets(outfile, trim_level))  # measured when the clip was cached
+    return convert_audio_recordings_list_into_one_audio_recording(data=data, trim_level=trim_level, suffix=suffix, silences=silences)
 
 
-def smart_phrase_filenames(voice:str, smart_phrase:str, owner:str=None, time_24h:int=None, time_minutes:int=None, suffix:str='ogg', fail_quietly=True) -> list:
-    # FIXME WRITE DOX
-    # FIXME This is a badly written subroutine. Clean it up. Document it. Thank you.
-    if owner is not None and time_24h is not None and time_minutes is not None:
-        detokenized_phrase = generate_detokenized_message(owner, time_24h, time_minutes, smart_phrase)
-        detokenized_phrase = detokenized_phrase.replace('12 newn', '12:00 P.M.').replace('12 midnight', '12:00 A.M.')
-    else:
-        detokenized_phrase = ''.join(r + ' ' for r in list_phrases_to_handle(smart_phrase)).strip(' ')
-    detokenized_phrase = detokenized_phrase.lower().replace('..', '.!')  # e.g. a.m.., p.m..
+def smart_phrase_filenames(voice:str, smart_phrase:str, owner:str=None, time_24h:int=None, time_minutes:int=None, suffix:str='ogg', fail_quietly=True, fewest_clips:bool=False) -> list:
+    """List the cached audio files that, played in order, speak this smart phrase.
+
+    Args:
+        voice: The name of the voice.
+        smart_phrase: The smart phrase (or plain sentence).
+        owner, time_24h, time_minutes (optional): Used to fill in its ${...} tokens.
+        suffix: mp3 or ogg
+        fail_quietly: If a snippet is missing, print a warning (True) or
+            raise MissingFromCacheError (False)?
+        fewest_clips: If True, use as few snippets as possible.
+
+    Returns:
+        list[str]: The pathnames of the audio files.
+
+    """
     audiofilenames = []
-    all_words = [r.lower().strip(' ') for r in detokenized_phrase.split(' ')]
-    firstwordno = 0
-    while firstwordno < len(all_words):
-        lastwordno = len(all_words)
-        while lastwordno > firstwordno:
-            searchforthis = ''.join([r + ' ' for r in all_words[firstwordno:lastwordno]]).strip()
-            outfile = pathname_of_phrase_audio(voice, searchforthis)
-            if not os.path.exists(outfile):
-                lastwordno -= 1
-            elif len(searchforthis) == 0:
-                break
-            else:
-                firstwordno = lastwordno - 1
-                audiofilenames.append(outfile)
-                break
-        if lastwordno == firstwordno:
-            if searchforthis == '':
-                print('Ignoring', searchforthis)
-            elif ':' in searchforthis and len(searchforthis) >= 4:
-                if lastwordno + 1 < len(all_words) and all_words[lastwordno + 1].lower()[:4] in ('a.m.', 'p.m.'):
-                    lastwordno += 1
-                    searchforthis = ''.join([r + ' ' for r in all_words[firstwordno:lastwordno + 1]]).strip()
-                print("TIME <=", searchforthis)
-                for s in generate_timedate_phrases_list(searchforthis):
-                    outfile = pathname_of_phrase_audio(voice, s)
-                    if not os.path.exists(outfile):
-                        errstr = "{voice} => {s} <= {outfile} => (time thingy) is missing from the cache".format(s=s, voice=voice, outfile=outfile)
-                        if fail_quietly:
-                            print(errstr)
-                        else:
-                            raise MissingFromCacheError(errstr)
-                    audiofilenames.append(outfile)
-                firstwordno = lastwordno
-            elif searchforthis in ('?', ':', '!', '.'):
-                print("Ignoring >>>%s<<<" % searchforthis)
+    detokenized_phrase = detokenized_smart_phrase(smart_phrase, owner, time_24h, time_minutes)
+    for text, outfile in smart_phrase_segments(voice, detokenized_phrase, suffix=suffix, fewest_clips=fewest_clips):
+        if outfile is not None:
+            audiofilenames.append(outfile)
+        else:
+            errstr = "{voice} => {text} <= is missing from the cache".format(text=text, voice=voice)
+            if fail_quietly:
+                print(errstr)
             else:
-                outfile = pathname_of_phrase_audio(voice, searchforthis, suffix=suffix)
-                errstr = "{voice} => {searchforthis} <= {outfile} => is missing from the cache".format(searchforthis=searchforthis, voice=voice, outfile=outfile)
-                if fail_quietly:
-                    print(errstr)
-                else:
-                    raise MissingFromCacheError(errstr)
-        firstwordno += 1
+                raise MissingFromCacheError(errstr)
     return audiofilenames
 
 
@@ -514,11 +718,39 @@ def speak_this_smart_sentence(owner, voice, message_template, fail_quietly=True,
         time_minute = t.minute
     message = generate_detokenized_message(owner=owner, time_24h=time_24h, time_minutes=time_minute, message_template=message_template)
     fnames = smart_phrase_filenames(voice, message, fail_quietly=fail_quietly)
+    note_played(fnames)
     for f in fnames:
         print("Playing", f)
         queue_oggfile(f)
 
 
+def render_this_smart_sentence(owner, voice, message_template, time_24h, time_minute, fail_quietly=True):
+    """Render a smart sentence, using snippets from our cache, into one ready-to-play pygame.mixer.Sound.
+
+    This does all the work that speak_this_smart_sentence() does -- and the
+    decoding that the playback thread would do -- ahead of time.
+
+    """
+    message = generate_detokenized_message(owner=owner, time_24h=time_24h, time_minutes=time_minute, message_template=message_template)
+    data = []
+    silences = []
+    fnames = []
+    for text, outfile in smart_phrase_segments(voice, detokenized_smart_phrase(message)):
+        if outfile is not None:
+            data.append(phrase_audio(voice, text, suffix='ogg'))
+            silences.append(trim_offsets(outfile, trim_level=0))
+            fnames.append(outfile)
+        elif fail_quietly:
+            print("{voice} => {text} <= is missing from the cache".format(text=text, voice=voice))
+        else:
+            raise MissingFromCacheError("{voice} => {text} <= is missing from the cache".format(text=text, voice=voice))
+    if data == []:
+        raise MissingFromCacheError("{voice} has none of >>>{message}<<< in the cache".format(voice=voice, message=message))
+    note_played(fnames)
+    return audiosegment_to_sound(convert_audio_recordings_list_into_one_audio_recording(data=data, trim_level=0, suffix='ogg',
+                                                                                        the_format=pydub_format_of_mixer(), silences=silences))
+
+
 def speak_a_random_alarm_message(owner, voice, alarm_time=None, snoozed=False, fail_quietly=True):
     if alarm_time is None:
         t = datetime.now()
@@ -544,6 +776,42 @@ def speak_a_random_wannasnooze_message(owner, voice, fail_quietly=True):
     speak_a_randomly_chosen_smart_sentence(owner, voice, wannasnooze_msgs_lst, fail_quietly)
 
 
+def pinned_vocabulary(owner:str=OWNER_NAME) -> list:
+    """The phrases that the clock can't do without -- hours, minutes, A.M./P.M. and greetings -- which a voice's cache must always keep."""
+    phrases = hours_lst + minutes_lst + ["o'clock", 'a.m.', 'p.m.', 'twelve newn', 'twelve midnight', owner]
+    for time_24h in (8, 14, 20):  # morning, afternoon, evening
+        for message_template in hello_owner_lst:
+            phrases += list_phrases_to_handle(generate_detokenized_message(owner=owner, time_24h=time_24h, time_minutes=0, message_template=message_template))
+    return sorted(set(p.lower() for p in phrases))
+
+
+def synthesis_priority(owner:str=OWNER_NAME):
+    """A sort key for phrases (see my.tools.synthesis.quota.priority_key()): the clock's essentials, then the most played, first.
+
+    The essentials are compared by their bare stems, as keep_cache_within_budget() pins them, so that every punctuated variant
+    that the clock speaks -- 'seven?', 'forty-five?', 'a.m,' -- counts.
+    """
+    return priority_key(set(bare_stem(phrase_audio_stem(p)) for p in pinned_vocabulary(owner)), catalog_of_root().plays(),
+                        normalize=lambda phrase: bare_stem(phrase_audio_stem(phrase)))
+
+
+def keep_cache_within_budget(voice:str, owner:str=OWNER_NAME, budget:int=None, policy:str='lru', dry_run:bool=False,
+                             made:dict=None, sync:bool=False) -> tuple:
+    """Evict phrases from the cache until it fits its budget, never touching this (the active) voice's essentials.
+
+    See my.tools.cache.budget.enforce_budget(). If made ({voice: [phrase, ...]}, e.g. what this run has just synthesized) is given,
+    none of those phrases is evicted either. If sync is True, the catalog is brought into line with the cache first (slow: the regen
+    tool does it; the clock doesn't).
+
+    Returns:
+        tuple: (how many phrases were evicted, how many bytes that freed)
+
+    """
+    pinned = set(bare_stem(phrase_audio_stem(p)) for p in pinned_vocabulary(owner))
+    exempt = set((v, phrase_audio_stem(p)) for v, phrases in (made or {}).items() for p in phrases)
+    return enforce_budget(budget=budget, active_voice=voice, pinned=pinned, policy=policy, dry_run=dry_run, exempt=exempt, sync=sync)
+
+
 def get_random_fart_fname():
     path = SOUNDS_FARTS_PATH
     fartfiles = [f for f in listdir(path) if isfile(join(path, f)) and f.endswith('.ogg')]
@@ -557,6 +825,7 @@ def fart_and_apologize(voice:str, fart_vol=0.5):
     fart_duration = pygame.mixer.Sound(fart_fname).get_length()
     play_audiofile(fart_fname, vol=fart_vol, nowait=True)
     time.sleep(min(1.0, fart_duration * 2. / 3.))
+    note_played(phrases_fnames)
     for f in phrases_fnames:
         queue_oggfile(f)
 
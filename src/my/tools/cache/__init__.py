@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""my.tools.cache
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This package contains tools for storing, checking and maintaining the
+cache of spoken phrases (./sounds/cache/{voice name}/).
+
+Modules:
+    bundle      one packed, mmap'd file per voice
+    janitor     find and fix junk in the cache, in one pass
+    sniff       tell mp3, ogg and pcm files apart by their magic bytes
+    catalog     a SQLite catalog of every clip: phrase, codec, size, hash, etc.
+    trims       how much silence there is at either end of each clip
+    store       store each distinct clip once, keyed by its contents
+    budget      keep the cache within a byte budget, evicting the least-played phrases
+
+.. _Style Guide:
+   https://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+
+"""
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Keep the speech cache within a byte budget.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+The regen tool caches every phrase, for every voice, in mp3 and ogg; and,
+until now, nothing ever left the cache. A PALPAC unit's SD card isn't that
+big. So, the cache has a budget -- SOUNDS_CACHE_BUDGET bytes or, by default,
+SOUNDS_CACHE_BUDGET_FRACTION of the partition that it's on -- and
+enforce_budget() evicts phrases until it fits.
+
+What goes first:
+    1. Phrases of voices other than the active one, before any of its own.
+    2. Among those, the least recently played (policy='lru') or the least
+       often played (policy='lfu'). Phrases that have never been played
+       go first of all.
+    A phrase's mp3, ogg and pcm are evicted together. The active voice's
+    essentials -- hours, minutes, greetings, with any punctuation; see
+    pinned -- are never evicted.
+
+Play counts are kept in the catalog (see my.tools.cache.catalog). The
+playback path calls note_played(), which merely counts, in memory; the
+counts reach the catalog in batches (see flush_plays()).
+
+Note:
+    The clips are those in the catalog; their sizes are taken from disk. A
+    payload that several clips share, by hard links into the content store
+    (see my.tools.cache.store), is counted once; and it's freed only when
+    the last of those clips is evicted, whereupon its blob is deleted too.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.budget import enforce_budget
+    >>> enforce_budget(budget=2 * 1024 ** 3, active_voice='Freya', dry_run=True)
+    (1422, 98240512)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import atexit
+import os
+import shutil
+import time
+from collections import Counter
+from os import listdir
+from os.path import isdir, isfile, join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_BUDGET, SOUNDS_CACHE_BUDGET_FRACTION, SOUNDS_CACHE_PATH
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.bundle import drop_bundle, pathname_of_bundle
+from my.tools.cache.catalog import catalog_of_clip, catalog_of_root, forget_clip
+from my.tools.cache.store import blob_of_file, collect_blob
+from my.tools.cache.trims import forget_trim_offsets, save_trims
+
+EVICTION_POLICIES = ('lru', 'lfu')
+FLUSH_PLAYS_EVERY = 32  # plays
+_STEM_PUNCTUATION = "^&?,;:"  # what phrase_audio_stem() leaves of the punctuation at the end of a phrase
+_plays = {}  # pathname => [how many times it was played, when it was last played], since the last flush
+_plays_lock = Lock()
+_enforce_lock = Lock()  # One eviction at a time, e.g. when the voice is changed twice in quick succession
+
+
+def note_played(fnames:list):
+    """These clips are being played. Cheap: it just counts. Every FLUSH_PLAYS_EVERY plays, the counts are written to the catalog."""
+    now = time.time()
+    with _plays_lock:
+        for fname in fnames:
+            entry = _plays.setdefault(fname, [0, now])
+            entry[0] += 1
+            entry[1] = now
+        pending = sum(n for n, _ in _plays.values())
+    if pending >= FLUSH_PLAYS_EVERY:
+        flush_plays()
+
+
+def flush_plays():
+    """Write the play counts that note_played() has been keeping to the catalog(s)."""
+    with _plays_lock:
+        plays = dict(_plays)
+        _plays.clear()
+    by_catalog = {}
+    for fname, (n, when) in plays.items():
+        catalog = catalog_of_clip(fname)
+        if catalog is not None:
+            by_catalog.setdefault(catalog, {})[fname] = (n, when)
+    for catalog, some_plays in by_catalog.items():
+        catalog.record_plays(some_plays)
+
+
+atexit.register(flush_plays)
+
+
+def cache_budget(root:str=SOUNDS_CACHE_PATH) -> int:
+    """How many bytes the cache may use: SOUNDS_CACHE_BUDGET, or SOUNDS_CACHE_BUDGET_FRACTION of its partition."""
+    if SOUNDS_CACHE_BUDGET is not None:
+        return SOUNDS_CACHE_BUDGET
+    return int(shutil.disk_usage(root).total * SOUNDS_CACHE_BUDGET_FRACTION)
+
+
+def bare_stem(filename:str) -> str:
+    """good_morning,_charlie&.ogg => 'good_morning,_charlie'. Every punctuated variant of a phrase has the same bare stem."""
+    return filename.rsplit('.', 1)[0].rstrip(_STEM_PUNCTUATION)
+
+
+def _phrases_by_use(usage:list, active_voice:str, pinned:set, policy:str, exempt:set=frozenset()) -> list:
+    """Group the clips into phrases -- [(voice, [filenames])] -- in the order in which they should be evicted."""
+    phrases = {}
+    for r in usage:
+        key = (r['voice'], r['filename'].rsplit('.', 1)[0])
+        entry = phrases.setdefault(key, {'filenames': [], 'plays': 0, 'last_played': 0.0})
+        entry['filenames'].append(r['filename'])
+        entry['plays'] += r['plays'] or 0
+        entry['last_played'] = max(entry['last_played'], r['last_played'] or 0.0)
+    candidates = [(voice, e) for (voice, stem), e in phrases.items()
+                  if not (voice == active_voice and bare_stem(e['filenames'][0]) in pinned) and (voice, stem) not in exempt]
+    if policy == 'lru':
+        candidates.sort(key=lambda c: (c[0] == active_voice, c[1]['last_played'], c[1]['plays']))
+    else:
+        candidates.sort(key=lambda c: (c[0] == active_voice, c[1]['plays'], c[1]['last_played']))
+    return [(voice, e['filenames']) for voice, e in candidates]
+
+
+def _stats_of_clips(root:str, usage:list) -> dict:
+    """{(voice, filename): os.stat_result} of each of these clips (see CacheCatalog.usage()) that is still there."""
+    stats = {}
+    for r in usage:
+        try:
+            stats[(r['voice'], r['filename'])] = os.stat(join(root, r['voice'], r['filename']))
+        except FileNotFoundError:
+            pass
+    return stats
+
+
+def evict_phrase(path:str, filenames:list, root:str=SOUNDS_CACHE_PATH):
+    """Delete these files (one phrase's mp3, ogg and pcm) from this voice's directory, and forget them.
+
+    If a file was the last name of a blob in the content store, the blob is deleted too: else, no room would be freed.
+
+    """
+    catalog = catalog_of_root(root)
+    for f in filenames:
+        clip = catalog.clip(join(path, f))
+        blob = blob_of_file(join(path, f), root, sha256=None if clip is None else clip['sha256'])
+        try:
+            os.unlink(join(path, f))
+        except FileNotFoundError:
+            pass
+        if blob is not None:
+            collect_blob(blob)
+        phrase_index.discard(join(path, f))
+        forget_clip(join(path, f))
+        forget_trim_offsets(join(path, f), save=False)
+
+
+def enforce_budget(budget:int=None, active_voice:str=None, pinned:set=frozenset(), policy:str='lru',
+                   root:str=SOUNDS_CACHE_PATH, dry_run:bool=False, verbose:bool=True, exempt:set=frozenset(),
+                   sync:bool=False) -> tuple:
+    """Evict phrases from the cache until it fits the budget.
+
+    If a voice loses any phrases, its bundle (see my.tools.cache.bundle) is
+    deleted too: it no longer matches its directory, and it's the biggest
+    thing there. The loose files go on working without it.
+
+    The clips considered are those in the catalog, which the regen tool
+    keeps up to date; so, on the clock, this doesn't list every voice's
+    directory. Only one call runs at a time: any other waits for it.
+
+    Args:
+        budget (optional): In bytes. Default: cache_budget().
+        active_voice (optional): The voice that the clock is using now.
+        pinned (optional): The bare stems (see bare_stem(); e.g. 'seven')
+            of the active voice's phrases that must never be evicted.
+        policy: 'lru' or 'lfu'.
+        root: The cache root.
+        dry_run: If True, say what would be evicted, but evict nothing.
+        verbose: If True, print a summary.
+        exempt (optional): (voice, stem) pairs -- e.g. ('Freya',
+            'seven?') -- of any voice, that must not be evicted either;
+            e.g. everything that a regen run has just synthesized, which
+            has never been played, and so would otherwise go first.
+        sync: If True, bring the catalog into line with every voice's
+            directory first (see CacheCatalog.sync_directory()). Slow.
+
+    Returns:
+        tuple: (how many phrases were evicted, how many bytes that freed)
+
+    """
+    if policy not in EVICTION_POLICIES:
+        raise ValueError("%s is not an eviction policy. Try one of %s." % (policy, ', '.join(EVICTION_POLICIES)))
+    budget = cache_budget(root) if budget is None else budget
+    flush_plays()
+    with _enforce_lock:
+        return _enforce_budget(budget, active_voice, pinned, policy, root, dry_run, verbose, exempt, sync)
+
+
+def _enforce_budget(budget:int, active_voice:str, pinned:set, policy:str, root:str, dry_run:bool, verbose:bool, exempt:set,
+                    sync:bool) -> tuple:
+    catalog = catalog_of_root(root)
+    voices = [f for f in listdir(root) if isdir(join(root, f)) and not f.startswith('.')] if isdir(root) else []
+    for voice in (voices if sync else ()):
+        catalog.sync_directory(voice, hash_it=False)
+    bundles = {voice: os.path.getsize(pathname_of_bundle(join(root, voice))) for voice in voices if isfile(pathname_of_bundle(join(root, voice)))}
+    usage = catalog.usage()
+    stats = _stats_of_clips(root, usage)
+    links = Counter((st.st_dev, st.st_ino) for st in stats.values())  # how many clips share each payload
+    used = sum({(st.st_dev, st.st_ino): st.st_size for st in stats.values()}.values()) + sum(bundles.values())
+    evicted = freed = 0
+    touched = set()
+    for voice, filenames in _phrases_by_use(usage, active_voice, pinned, policy, exempt):
+        if used - freed <= budget:
+            break
+        if not dry_run:
+            evict_phrase(join(root, voice), filenames, root)
+        touched.add(voice)
+        evicted += 1
+        for st in [stats[(voice, f)] for f in filenames if (voice, f) in stats]:
+            links[(st.st_dev, st.st_ino)] -= 1
+            if links[(st.st_dev, st.st_ino)] == 0:  # ...its last name in the cache; so, its blob (if any) goes too
+                freed += st.st_size
+        freed += bundles.pop(voice, 0)
+    for voice in (touched if not dry_run else ()):
+        if drop_bundle(join(root, voice)):
+            phrase_index.forget(join(root, voice))  # ...which was listing the bundle's contents
+        save_trims(join(root, voice))
+    if verbose:
+        print("Cache budget: {used} of {budget} bytes used; {verb} {evicted} phrases, freeing {freed} bytes".format(
+            used=used, budget=budget, verb='would evict' if dry_run else 'evicted', evicted=evicted, freed=freed))
+    return (evicted, freed)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""Packed, per-voice bundles of cached audio.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Each voice directory (./sounds/cache/{voice name}/) holds thousands of tiny
+mp3 and ogg files. Opening each of them, on an SD card, is slow. A bundle
+is one file per voice -- ./sounds/cache/{voice name}.bundle -- that holds
+all of them, plus an index. We mmap() it once and serve every phrase from
+memory after that.
+
+If a bundled file's loose copy is replaced (or deleted) after the bundle is
+built, the bundle is stale, and the loose files are served instead until it
+is rebuilt. Other writes into the directory -- new clips, .pcm files,
+.trims.json -- don't matter: a file that isn't in the bundle is served loose.
+
+File format:
+    MAGIC               8 bytes, b'PALPACB1'
+    header length       4 bytes, unsigned, little-endian
+    header              JSON (utf-8): {"version": 1, "entries": {filename:
+                        [offset, length, codec, duration], ...}, "mtimes":
+                        {filename: the loose file's mtime, in ns, ...}}
+    payload             the audio files, back to back. Each offset is
+                        relative to the start of the payload.
+
+Example:
+    Here is how to use it::
+
+        $ python3
+        >>> from my.tools.cache.bundle import build_bundle, bundle_of_directory
+        >>> build_bundle('sounds/cache/Freya')
+        >>> b = bundle_of_directory('sounds/cache/Freya')
+        >>> data = b.read('good_morning.ogg')
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import mmap
+import os
+import struct
+from os import listdir
+from os.path import isfile, join
+from threading import Lock
+
+from my.tools.cache.catalog import catalog_of_clip
+
+BUNDLE_MAGIC = b'PALPACB1'
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = '.bundle'
+_HEADER_LEN_FMT = '<I'
+_bundles = {}
+_bundle_dir_mtimes = {}  # bundle pathname => its directory's mtime (ns), when the bundle was last checked against it
+_bundles_lock = Lock()
+
+
+def pathname_of_bundle(path:str) -> str:
+    """The pathname of the bundle for this directory, e.g. sounds/cache/Freya.bundle"""
+    return os.path.normpath(path) + BUNDLE_SUFFIX
+
+
+class PhraseBundle:
+    """Read-only, mmap'd view of a bundle file.
+
+    Attributes:
+        pathname (str): The bundle's pathname.
+        entries (dict): filename -> (offset, length, codec, duration).
+        mtimes (dict): filename -> the mtime (ns) of the loose file, when it
+            was bundled. Empty, if the bundle predates them.
+
+    """
+
+    def __init__(self, pathname:str):
+        self.pathname = pathname
+        with open(pathname, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        hdrlen_pos = len(BUNDLE_MAGIC)
+        data_pos = hdrlen_pos + struct.calcsize(_HEADER_LEN_FMT)
+        if self._mmap[:hdrlen_pos] != BUNDLE_MAGIC:
+            self._mmap.close()
+            raise ValueError("%s is not a bundle file" % pathname)
+        header_len = struct.unpack(_HEADER_LEN_FMT, self._mmap[hdrlen_pos:data_pos])[0]
+        header = json.loads(self._mmap[data_pos:data_pos + header_len].decode('utf-8'))
+        if header.get('version') != BUNDLE_VERSION:
+            self._mmap.close()
+            raise ValueError("%s is a version %s bundle; I can read only version %d" % (pathname, str(header.get('version')), BUNDLE_VERSION))
+        self._payload_pos = data_pos + header_len
+        self.entries = {k: tuple(v) for k, v in header['entries'].items()}
+        self.mtimes = header.get('mtimes', {})
+
+    def __contains__(self, filename:str) -> bool:
+        return filename in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def filenames(self) -> set:
+        return set(self.entries.keys())
+
+    def entry(self, filename:str) -> tuple:
+        """Return (offset, length, codec, duration) for this filename."""
+        return self.entries[filename]
+
+    def view(self, filename:str) -> memoryview:
+        """Return a zero-copy view of this file's bytes."""
+        offset, length, _, _ = self.entries[filename]
+        start = self._payload_pos + offset
+        return memoryview(self._mmap)[start:start + length]
+
+    def read(self, filename:str) -> bytes:
+        """Return this file's bytes."""
+        offset, length, _, _ = self.entries[filename]
+        start = self._payload_pos + offset
+        return self._mmap[start:start + length]
+
+    def close(self):
+        self._mmap.close()
+
+
+def _mtime_ns(fname:str) -> int:
+    try:
+        return os.stat(fname).st_mtime_ns
+    except OSError:
+        return None
+
+
+def changed_since_bundled(bundle:PhraseBundle, path:str) -> list:
+    """The bundled files whose loose copies in this directory have been replaced or deleted since the bundle was built."""
+    bundled_at = _mtime_ns(bundle.pathname)
+    changed = []
+    for f in bundle.entries:
+        mtime, recorded = _mtime_ns(join(path, f)), bundle.mtimes.get(f)
+        if mtime is None or (mtime != recorded if recorded is not None else mtime > bundled_at):
+            changed.append(f)
+    return changed
+
+
+def _open_bundle(bundle_fname:str, path:str) -> PhraseBundle:
+    """The bundle, opened; or None, if it's missing, unreadable or stale (see changed_since_bundled())."""
+    if not isfile(bundle_fname):
+        return None
+    try:
+        bundle = PhraseBundle(bundle_fname)
+    except (ValueError, OSError, struct.error) as e:  # e.g. empty (mmap says ValueError), truncated, or not a bundle at all
+        print("Unable to read %s (%s). I'll use the files instead." % (bundle_fname, str(e)))
+        return None
+    changed = changed_since_bundled(bundle, path)
+    if changed != []:
+        print("%d of the files in %s (e.g. %s) have changed since. I'll use the files until it's rebuilt." % (len(changed), bundle_fname, changed[0]))
+        _close_bundle(bundle)
+        return None
+    return bundle
+
+
+def _close_bundle(bundle:PhraseBundle):
+    if bundle is not None:
+        try:
+            bundle.close()
+        except BufferError:
+            pass  # Someone is still playing a view of it. The garbage collector will close it later.
+
+
+def bundle_of_directory(path:str) -> PhraseBundle:
+    """Return the (cached, already-opened) bundle for this directory; or None, if there isn't a usable one.
+
+    A bundle is unusable if it can't be read, or if any of the files that it
+    holds has been replaced or deleted since it was built (see
+    changed_since_bundled()). Then, the loose files are served instead. The
+    directory's mtime is checked on each call -- one stat() -- and, only if
+    it has moved, the bundled files are checked again.
+
+    """
+    bundle_fname = pathname_of_bundle(path)
+    dir_mtime = _mtime_ns(path)
+    old_bundle = None
+    with _bundles_lock:
+        if bundle_fname not in _bundles or _bundle_dir_mtimes.get(bundle_fname) != dir_mtime:
+            old_bundle = _bundles.pop(bundle_fname, None)
+            _bundles[bundle_fname] = _open_bundle(bundle_fname, path)
+            _bundle_dir_mtimes[bundle_fname] = dir_mtime
+        bundle = _bundles[bundle_fname]
+    _close_bundle(old_bundle)
+    return bundle
+
+
+def forget_bundle(path:str):
+    """Forget (and close) the bundle for this directory, e.g. because it has just been rebuilt."""
+    bundle_fname = pathname_of_bundle(path)
+    with _bundles_lock:
+        old_bundle = _bundles.pop(bundle_fname, None)
+        _bundle_dir_mtimes.pop(bundle_fname, None)
+    _close_bundle(old_bundle)
+
+
+def drop_bundle(path:str) -> bool:
+    """Forget this directory's bundle and delete it, e.g. because some of what it holds has been evicted or is stale. The loose files are served instead.
+
+    Returns:
+        bool: True if there was a bundle to delete.
+
+    """
+    forget_bundle(path)
+    try:
+        os.unlink(pathname_of_bundle(path))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def duration_of_audio_file(fname:str) -> float:
+    """How many seconds long is this audio file? None, if I can't decode it.
+
+    If the cache catalog knows, and the file hasn't changed since, it isn't decoded.
+
+    """
+    catalog = catalog_of_clip(fname)
+    clip = None if catalog is None else catalog.clip(fname)
+    if clip is not None and clip['duration'] is not None and clip['size'] == os.path.getsize(fname):
+        return clip['duration']
+    from pydub.audio_segment import AudioSegment
+    from pydub.exceptions import CouldntDecodeError
+    try:
+        return len(AudioSegment.from_file(fname, format=fname.split('.')[-1])) / 1000.
+    except CouldntDecodeError:
+        return None
+
+
+def build_bundle(path:str, suffixes:tuple=('ogg', 'mp3', 'pcm'), with_durations:bool=True) -> str:
+    """Pack every audio file in this directory into a bundle.
+
+    The bundle is written to a temporary file and then renamed, so that a
+    reader never sees half a bundle.
+
+    Args:
+        path: The directory, e.g. sounds/cache/Freya
+        suffixes: Which kinds of file to pack.
+        with_durations: If True, learn each mp3/ogg file's duration, from
+            the catalog or else by decoding it. (That's slow, but it only
+            happens once.)
+
+    Returns:
+        str: The pathname of the bundle.
+
+    """
+    fnames = sorted([f for f in listdir(path) if isfile(join(path, f)) and not f.startswith('.') and f.split('.')[-1] in suffixes])
+    entries, mtimes = {}, {}
+    offset = 0
+    for f in fnames:
+        st = os.stat(join(path, f))
+        duration = duration_of_audio_file(join(path, f)) if with_durations and f.split('.')[-1] in ('mp3', 'ogg') else None
+        entries[f] = (offset, st.st_size, f.split('.')[-1], duration)
+        mtimes[f] = st.st_mtime_ns
+        offset += st.st_size
+    header = json.dumps({'version': BUNDLE_VERSION, 'entries': entries, 'mtimes': mtimes}).encode('utf-8')
+    bundle_fname = pathname_of_bundle(path)
+    tmp_fname = bundle_fname + '.tmp'
+    with open(tmp_fname, 'wb') as outfile:
+        outfile.write(BUNDLE_MAGIC)
+        outfile.write(struct.pack(_HEADER_LEN_FMT, len(header)))
+        outfile.write(header)
+        for f in fnames:
+            with open(join(path, f), 'rb') as infile:
+                outfile.write(infile.read())
+    os.replace(tmp_fname, bundle_fname)
+    forget_bundle(path)
+    return bundle_fname
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""A SQLite catalog of everything in the speech cache.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Until now, everything we knew about a cached clip was derived from its
+filename (see phrase_audio_stem()) or from stat()ing and decoding it again.
+The catalog -- one small SQLite database per cache root, e.g.
+sounds/cache/catalog.sqlite3 -- records, for each clip: its voice, the
+phrase it says, its codec, size, content hash, duration, sample rate,
+loudness, silences (see my.tools.cache.trims), the ElevenLabs settings
+that generated it and its synthesis key (see my.tools.cache.store). Lookups
+are by primary key or by index.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.catalog import catalog_of_root
+    >>> catalog = catalog_of_root()
+    >>> catalog.lookup('Freya', 'good morning')
+    'sounds/cache/Freya/good_morning.ogg'
+    >>> catalog.missing('Freya', ['good morning', 'good grief'])
+    ['good grief']
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from os import listdir
+from os.path import basename, dirname, isdir, isfile, join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_PATH
+
+CATALOG_FILENAME = 'catalog.sqlite3'
+CATALOG_CODECS = ('mp3', 'ogg', 'pcm')
+SETTINGS_COLUMNS = ('model', 'stability', 'similarity', 'style', 'boost')
+SILENCE_COLUMNS = {'lazy': ('lead_lazy', 'trail_lazy'), 'default': ('lead_default', 'trail_default'), 'snippy': ('lead_snippy', 'trail_snippy')}
+AUDIO_COLUMNS = ('duration', 'sample_rate', 'loudness') + sum(SILENCE_COLUMNS.values(), ())
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS clips (
+    voice TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    phrase TEXT,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    duration REAL,
+    sample_rate INTEGER,
+    loudness REAL,
+    lead_lazy INTEGER, trail_lazy INTEGER,
+    lead_default INTEGER, trail_default INTEGER,
+    lead_snippy INTEGER, trail_snippy INTEGER,
+    model TEXT, stability REAL, similarity REAL, style REAL, boost INTEGER,
+    synthesis_key TEXT,
+    plays INTEGER NOT NULL DEFAULT 0,
+    last_played REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (voice, filename)
+);
+CREATE INDEX IF NOT EXISTS clips_by_phrase ON clips (voice, phrase, codec);
+CREATE INDEX IF NOT EXISTS clips_by_sha256 ON clips (sha256);
+'''
+_ADDED_COLUMNS = (('synthesis_key', 'TEXT'), ('plays', 'INTEGER NOT NULL DEFAULT 0'), ('last_played', 'REAL'))  # ...since the first catalogs were made
+_catalogs = {}
+_catalogs_lock = Lock()
+
+
+def pathname_of_catalog(root:str=SOUNDS_CACHE_PATH) -> str:
+    """The pathname of the catalog of this cache root, e.g. sounds/cache/catalog.sqlite3"""
+    return join(os.path.normpath(root), CATALOG_FILENAME)
+
+
+def phrase_of_filename(filename:str) -> str:
+    """good_morning^.ogg => 'good morning.' -- the reverse of phrase_audio_stem(), as far as that's possible."""
+    return filename.rsplit('.', 1)[0].replace('_', ' ').replace('^', '.').replace('&', '!')
+
+
+def sha256_of_file(fname:str) -> str:
+    """The SHA-256 of this file's contents, in hex."""
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class CacheCatalog:
+    """The catalog of one cache root: one row per clip, keyed by (voice, filename).
+
+    Attributes:
+        root (str): The cache root, e.g. sounds/cache
+        pathname (str): The database, e.g. sounds/cache/catalog.sqlite3
+
+    """
+
+    def __init__(self, root:str=SOUNDS_CACHE_PATH):
+        self.root = os.path.normpath(root)
+        self.pathname = pathname_of_catalog(root)
+        self._lock = Lock()
+        self._db = sqlite3.connect(self.pathname, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')  # so that regen_cache_for_voice.py and the clock can share it
+        self._db.executescript(_SCHEMA)
+        columns = [r['name'] for r in self._db.execute('PRAGMA table_info(clips)')]
+        for name, kind in _ADDED_COLUMNS:
+            if name not in columns:  # It was made before we had them
+                self._db.execute('ALTER TABLE clips ADD COLUMN %s %s' % (name, kind))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _key(self, fname:str) -> tuple:
+        return (basename(dirname(fname)), basename(fname))
+
+    def record(self, fname:str, phrase:str=None, settings:dict=None, audio=None, silences:dict=None, hash_it:bool=True, synthesis_key:str=None):
+        """Catalog this clip, or bring its row up to date.
+
+        Whatever isn't supplied is left as it was -- unless the clip's
+        contents have changed, in which case what we knew about its audio
+        is forgotten.
+
+        Args:
+            fname: The clip, e.g. sounds/cache/Freya/good_morning.ogg
+            phrase (optional): What it says, e.g. 'good morning'.
+            settings (optional): The settings that generated it, e.g.
+                Text2SpeechSingleton.synthesis_settings.
+            audio (optional): Its decoded AudioSegment, for its duration,
+                sample rate and loudness.
+            silences (optional): {'lazy': (leading, trailing), ...}; see
+                my.tools.sound.trim.measure_silences().
+            hash_it: If False, don't read the file to hash it.
+            synthesis_key (optional): See my.tools.cache.store.synthesis_key().
+
+        """
+        voice, filename = self._key(fname)
+        row = {'voice': voice, 'filename': filename, 'phrase': phrase, 'codec': filename.rsplit('.', 1)[-1],
+               'size': os.path.getsize(fname), 'sha256': sha256_of_file(fname) if hash_it else None,
+               'synthesis_key': synthesis_key, 'updated': time.time()}
+        row.update({k: None for k in AUDIO_COLUMNS + SETTINGS_COLUMNS})
+        if audio is not None:
+            loudness = audio.dBFS
+            row.update({'duration': len(audio) / 1000.0, 'sample_rate': audio.frame_rate,
+                        'loudness': loudness if loudness != -float('inf') else None})
+        for name, (lead, trail) in SILENCE_COLUMNS.items():
+            if silences is not None and name in silences:
+                row[lead], row[trail] = silences[name]
+        if settings is not None:
+            row.update({k: settings.get(k) for k in SETTINGS_COLUMNS})
+        same_contents = 'clips.size = excluded.size AND (excluded.sha256 IS NULL OR clips.sha256 IS excluded.sha256)'
+        updates = ['%s = COALESCE(excluded.%s, clips.%s)' % (k, k, k) for k in ('phrase', 'sha256', 'synthesis_key') + SETTINGS_COLUMNS] \
+            + ['%s = CASE WHEN %s THEN COALESCE(excluded.%s, clips.%s) ELSE excluded.%s END' % (k, same_contents, k, k, k) for k in AUDIO_COLUMNS] \
+            + ['size = excluded.size', 'codec = excluded.codec', 'updated = excluded.updated']
+        sql = 'INSERT INTO clips (%s) VALUES (%s) ON CONFLICT (voice, filename) DO UPDATE SET %s' % (
+            ', '.join(row.keys()), ', '.join('?' * len(row)), ', '.join(updates))
+        with self._lock, self._db:
+            self._db.execute(sql, tuple(row.values()))
+
+    def forget(self, fname:str):
+        """Remove this clip from the catalog, e.g. because it was deleted."""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM clips WHERE voice = ? AND filename = ?', self._key(fname))
+
+    def rename(self, src:str, dst:str):
+        """This clip has been renamed (within its voice's directory), e.g. from .mp3 to .ogg."""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM clips WHERE voice = ? AND filename = ?', self._key(dst))
+            self._db.execute('UPDATE clips SET filename = ?, codec = ? WHERE voice = ? AND filename = ?',
+                             (basename(dst), basename(dst).rsplit('.', 1)[-1]) + self._key(src))
+
+    def clip(self, fname:str) -> dict:
+        """Everything we know about this clip; or None, if it isn't in the catalog."""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM clips WHERE voice = ? AND filename = ?', self._key(fname)).fetchone()
+        return None if row is None else dict(row)
+
+    def is_stale(self, fname:str, synthesis_key:str) -> bool:
+        """True if this clip was synthesized with other settings than these (i.e. under a different synthesis key).
+
+        A clip whose synthesis key we never recorded isn't stale: we don't know.
+
+        """
+        with self._lock:
+            row = self._db.execute('SELECT synthesis_key FROM clips WHERE voice = ? AND filename = ?', self._key(fname)).fetchone()
+        return row is not None and row['synthesis_key'] is not None and row['synthesis_key'] != synthesis_key
+
+    def synthesis_keys(self, voice:str) -> dict:
+        """{filename: synthesis key} for every clip of this voice whose key we know. One query."""
+        with self._lock:
+            return {r['filename']: r['synthesis_key'] for r in self._db.execute(
+                'SELECT filename, synthesis_key FROM clips WHERE voice = ? AND synthesis_key IS NOT NULL', (voice,))}
+
+    def duration(self, fname:str) -> float:
+        """This clip's duration in seconds; or None, if we don't know it."""
+        with self._lock:
+            row = self._db.execute('SELECT duration FROM clips WHERE voice = ? AND filename = ?', self._key(fname)).fetchone()
+        return None if row is None else row['duration']
+
+    def lookup(self, voice:str, phrase:str, codec:str='ogg') -> str:
+        """The pathname of the clip of this voice saying this phrase, in this codec; or None."""
+        with self._lock:
+            row = self._db.execute('SELECT filename FROM clips WHERE voice = ? AND phrase = ? AND codec = ?',
+                                   (voice, phrase.lower().strip(' '), codec)).fetchone()
+        return None if row is None else join(self.root, voice, row['filename'])
+
+    def missing(self, voice:str, phrases:list, codecs:tuple=('mp3', 'ogg')) -> list:
+        """Which of these phrases does this voice lack, in at least one of these codecs? One query.
+
+        Returns:
+            list: The missing phrases, lowercased, sorted.
+
+        """
+        wanted = sorted(set(p.lower().strip(' ') for p in phrases))
+        sql = '''SELECT phrase FROM wanted WHERE
+                     (SELECT COUNT(DISTINCT codec) FROM clips
+                      WHERE clips.voice = ? AND clips.phrase = wanted.phrase AND clips.codec IN (%s)) < ?
+                 ORDER BY phrase''' % ', '.join('?' * len(codecs))
+        with self._lock, self._db:
+            self._db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (phrase TEXT PRIMARY KEY)')
+            self._db.execute('DELETE FROM wanted')
+            self._db.executemany('INSERT INTO wanted (phrase) VALUES (?)', [(p,) for p in wanted])
+            return [r['phrase'] for r in self._db.execute(sql, (voice,) + tuple(codecs) + (len(codecs),))]
+
+    def record_plays(self, plays:dict):
+        """Add to the play counts of these clips. One transaction.
+
+        Args:
+            plays: {pathname: (how many more times it was played, when it was last played)}
+
+        """
+        with self._lock, self._db:
+            self._db.executemany('UPDATE clips SET plays = plays + ?, last_played = MAX(COALESCE(last_played, 0), ?) WHERE voice = ? AND filename = ?',
+                                 [(n, when) + self._key(fname) for fname, (n, when) in plays.items()])
+
+    def usage(self, voice:str=None) -> list:
+        """[{'voice', 'filename', 'size', 'plays', 'last_played'}, ...] for every clip of this voice, or of all of them."""
+        sql = 'SELECT voice, filename, size, plays, last_played FROM clips %s' % ('' if voice is None else 'WHERE voice = ?')
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, () if voice is None else (voice,))]
+
+    def plays(self, by:str='phrase') -> dict:
+        """{phrase: how many times it's been played, by any voice}; or, if by is 'voice', {voice: how many plays of any phrase}."""
+        if by not in ('phrase', 'voice'):
+            raise ValueError("I can count plays by phrase or by voice, not by %s" % str(by))
+        sql = 'SELECT %s AS k, SUM(plays) AS n FROM clips WHERE %s IS NOT NULL GROUP BY %s' % (by, by, by)
+        with self._lock:
+            return {r['k']: r['n'] for r in self._db.execute(sql)}
+
+    def totals(self, voice:str=None) -> dict:
+        """{voice: (how many clips, how many bytes)}, for this voice or for all of them."""
+        sql = 'SELECT voice, COUNT(*) AS n, SUM(size) AS bytes FROM clips %s GROUP BY voice' % ('' if voice is None else 'WHERE voice = ?')
+        with self._lock:
+            return {r['voice']: (r['n'], r['bytes']) for r in self._db.execute(sql, () if voice is None else (voice,))}
+
+    def sync_directory(self, voice:str, hash_it:bool=True) -> tuple:
+        """Bring this voice's rows into line with its directory: catalog new (or changed) clips, and forget vanished ones.
+
+        Clips that arrived before the catalog did are cataloged with the
+        phrase that their filename implies (see phrase_of_filename()).
+
+        Returns:
+            tuple: (how many rows were added or updated, how many were removed)
+
+        """
+        path = join(self.root, voice)
+        present = {f: os.path.getsize(join(path, f)) for f in (listdir(path) if isdir(path) else [])
+                   if f.rsplit('.', 1)[-1] in CATALOG_CODECS and isfile(join(path, f))}
+        with self._lock:
+            known = {r['filename']: r['size'] for r in self._db.execute('SELECT filename, size FROM clips WHERE voice = ?', (voice,))}
+        vanished = [f for f in known if f not in present]
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM clips WHERE voice = ? AND filename = ?', [(voice, f) for f in vanished])
+        changed = [f for f, size in present.items() if known.get(f) != size]
+        for f in changed:
+            self.record(join(path, f), phrase=phrase_of_filename(f) if f not in known else None, hash_it=hash_it)
+        return (len(changed), len(vanished))
+
+
+def catalog_of_root(root:str=SOUNDS_CACHE_PATH) -> CacheCatalog:
+    """The catalog of this cache root, opened (and, if need be, created) once."""
+    root = os.path.normpath(root)
+    with _catalogs_lock:
+        if root not in _catalogs:
+            _catalogs[root] = CacheCatalog(root)
+        return _catalogs[root]
+
+
+def catalog_of_clip(fname:str) -> CacheCatalog:
+    """The catalog of the cache that this clip is in; or None, if it isn't in a cache (e.g. it's an alarm sound)."""
+    root = os.path.normpath(dirname(dirname(fname)))
+    if root != os.path.normpath(SOUNDS_CACHE_PATH) and not isfile(pathname_of_catalog(root)):
+        return None
+    return catalog_of_root(root)
+
+
+def forget_catalog(root:str=SOUNDS_CACHE_PATH):
+    """Close this root's catalog, e.g. because its database was replaced."""
+    root = os.path.normpath(root)
+    with _catalogs_lock:
+        catalog = _catalogs.pop(root, None)
+    if catalog is not None:
+        catalog.close()
+
+
+def record_clip(fname:str, **kwargs):
+    """Catalog this clip, if it's in a cache. See CacheCatalog.record()."""
+    catalog = catalog_of_clip(fname)
+    if catalog is not None:
+        catalog.record(fname, **kwargs)
+
+
+def forget_clip(fname:str):
+    """Remove this clip from its cache's catalog, if it's in a cache."""
+    catalog = catalog_of_clip(fname)
+    if catalog is not None:
+        catalog.forget(fname)
+
+
+def rename_clip(src:str, dst:str):
+    """This clip has been renamed. Tell its cache's catalog, if it's in a cache."""
+    catalog = catalog_of_clip(src)
+    if catalog is not None:
+        catalog.rename(src, dst)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Remember what the template lists looked like the last time each voice was regenerated.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Edit one line of alarm_messages_lst (see my.consts) and, until now, the only
+way to hear it was to regenerate every voice from scratch: every phrase of
+every template checked against the cache. Now, after each voice is done,
+regen_cache_for_voice.py records a fingerprint of the template lists and
+OWNER_NAME, and the atomic phrases (see my.tools.synthesis.planner) that they
+came to, in sounds/cache/.regen.fingerprint.json. Next time, if the
+fingerprint is the same, the voice is up to date; if not, only the phrases
+that were added need synthesizing, and the phrases that were removed can be
+forgotten.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.fingerprint import fingerprint_of_templates, last_run_of_voice, changed_templates
+    >>> now = fingerprint_of_templates({'hello_owner_lst': ['Hello, ${owner}']}, owner='Charlie')
+    >>> changed_templates(last_run_of_voice('Freya'), now)
+    ['OWNER_NAME']
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import hashlib
+import json
+import os
+from os.path import join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_PATH
+
+FINGERPRINT_FILENAME = '.regen.fingerprint.json'
+_fingerprints_lock = Lock()
+
+
+def pathname_of_fingerprints(root:str=SOUNDS_CACHE_PATH) -> str:
+    """Where the fingerprints of the cache at this root are kept."""
+    return join(root, FINGERPRINT_FILENAME)
+
+
+def fingerprint_of_templates(templates:dict, owner:str) -> dict:
+    """A fingerprint of these template lists, {name: [template, ...]}, and of the owner's name."""
+    return {'owner': owner,
+            'templates': {name: hashlib.sha256(json.dumps(list(lst)).encode('utf-8')).hexdigest() for name, lst in templates.items()}}
+
+
+def changed_templates(old:dict, new:dict) -> list:
+    """The names of the template lists (and 'OWNER_NAME') that differ between these two fingerprints. If old is None, all of them."""
+    if old is None:
+        return sorted(new['templates']) + ['OWNER_NAME']
+    changed = sorted(name for name in set(old['templates']) | set(new['templates'])
+                     if old['templates'].get(name) != new['templates'].get(name))
+    return changed + (['OWNER_NAME'] if old['owner'] != new['owner'] else [])
+
+
+def diff_phrases(old_phrases:list, new_phrases:list) -> tuple:
+    """(the phrases that were added, the phrases that were removed), each sorted."""
+    old_phrases, new_phrases = set(old_phrases), set(new_phrases)
+    return (sorted(new_phrases - old_phrases), sorted(old_phrases - new_phrases))
+
+
+def _load_fingerprints(root:str) -> dict:
+    try:
+        with open(pathname_of_fingerprints(root), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def last_run_of_voice(voice:str, root:str=SOUNDS_CACHE_PATH) -> dict:
+    """What the last successful regeneration of this voice was made from: {'owner', 'templates', 'phrases'}; or None."""
+    with _fingerprints_lock:
+        return _load_fingerprints(root).get(voice)
+
+
+def record_run_of_voice(voice:str, fingerprint:dict, phrases:list, root:str=SOUNDS_CACHE_PATH):
+    """This voice has just been regenerated successfully, from these templates, into these phrases."""
+    with _fingerprints_lock:
+        fingerprints = _load_fingerprints(root)
+        fingerprints[voice] = dict(fingerprint, phrases=sorted(phrases))
+        tmpfname = pathname_of_fingerprints(root) + '.tmp'
+        os.makedirs(root, exist_ok=True)
+        with open(tmpfname, 'w', encoding='utf-8') as f:
+            json.dump(fingerprints, f, sort_keys=True)
+        os.replace(tmpfname, pathname_of_fingerprints(root))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Tidy up the speech cache in one pass.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Over time, the speech cache collects junk: files with spaces in their names
+(phrase filenames use underscores, so these are never looked up), empty
+files left behind by failed downloads, and files with the wrong extension
+(e.g. leftover .tmp files from an interrupted write, or an mp3 file that is
+really an ogg). sweep_cache() finds
+all of them in a single walk of the cache, reports them, and (optionally)
+fixes them.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.janitor import sweep_cache
+    >>> report = sweep_cache(fix=False)
+    >>> report['empty']
+    ['sounds/cache/Freya/hello^.ogg']
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import os
+from os import listdir
+from os.path import isdir, isfile, join
+
+from my.globals import SOUNDS_CACHE_PATH
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.catalog import forget_clip, rename_clip
+from my.tools.cache.sniff import sniff_audio_format
+
+CACHE_SUFFIXES = ('mp3', 'ogg', 'pcm')
+
+
+def sweep_voice_directory(path:str, fix:bool=True, report:dict=None) -> dict:
+    """Find (and, if fix is True, fix) the junk in one voice's directory.
+
+    Files with spaces in their names, and empty files, are deleted. Files
+    whose suffix is merely in the wrong case (.MP3), or whose contents are
+    of a different kind than their suffix says (an mp3 that's really an
+    ogg), are renamed, unless that would overwrite something. Any other
+    file with an unexpected suffix is deleted.
+
+    Args:
+        path: The directory, e.g. sounds/cache/Freya
+        fix: If False, just report.
+        report (optional): A report to add to. See sweep_cache().
+
+    Returns:
+        dict: The report.
+
+    """
+    report = {'spaces': [], 'empty': [], 'wrong_extension': [], 'fixed': 0} if report is None else report
+    for f in listdir(path):
+        fname = join(path, f)
+        if f.startswith('.') or not isfile(fname):
+            continue
+        suffix = f.split('.')[-1] if '.' in f else ''
+        kind = sniff_audio_format(fname)
+        newfname = None
+        if ' ' in f:
+            report['spaces'].append(fname)
+        elif kind == 'empty':
+            report['empty'].append(fname)
+        elif suffix not in CACHE_SUFFIXES and suffix.lower() not in CACHE_SUFFIXES:
+            report['wrong_extension'].append(fname)
+        elif kind in CACHE_SUFFIXES and kind != suffix:
+            report['wrong_extension'].append(fname)
+            newfname = fname[:-len(suffix)] + kind
+        elif suffix not in CACHE_SUFFIXES:
+            report['wrong_extension'].append(fname)
+            newfname = fname[:-len(suffix)] + suffix.lower()
+        else:
+            continue
+        if not fix:
+            continue
+        if newfname is not None:
+            if os.path.exists(newfname):
+                continue
+            os.rename(fname, newfname)
+            phrase_index.rename(fname, newfname)
+            rename_clip(fname, newfname)
+        else:
+            os.unlink(fname)
+            phrase_index.discard(fname)
+            forget_clip(fname)
+        report['fixed'] += 1
+    return report
+
+
+def sweep_cache(cache_path:str=SOUNDS_CACHE_PATH, voices:list=None, fix:bool=True, verbose:bool=True) -> dict:
+    """Find (and, if fix is True, fix) the junk in the whole speech cache.
+
+    Args:
+        cache_path: The cache, e.g. sounds/cache
+        voices (optional): Sweep only these voices. Default: all of them.
+        fix: If False, just report.
+        verbose: If True, print a summary.
+
+    Returns:
+        dict: {'spaces': [pathnames], 'empty': [pathnames],
+            'wrong_extension': [pathnames], 'fixed': how many were fixed}
+
+    """
+    report = {'spaces': [], 'empty': [], 'wrong_extension': [], 'fixed': 0}
+    if voices is None:
+        voices = [f for f in listdir(cache_path) if isdir(join(cache_path, f)) and not f.startswith('.')] if isdir(cache_path) else []
+    for voice in voices:
+        if isdir(join(cache_path, voice)):
+            sweep_voice_directory(join(cache_path, voice), fix=fix, report=report)
+    if verbose:
+        print("Cache janitor: {spaces} with spaces, {empty} empty, {wrong} with the wrong extension; {fixed} fixed".format(
+            spaces=len(report['spaces']), empty=len(report['empty']), wrong=len(report['wrong_extension']), fixed=report['fixed']))
+    return report
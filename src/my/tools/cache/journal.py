@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Remember how far a regeneration run got, so that the next one can carry on from there.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+If regen_cache_for_voice.py died part-way -- a network blip, a full tmpfs,
+a kill -- the next run started again at the first voice. Now, each run keeps
+a journal (sounds/cache/.regen.journal): one line of JSON per unit of work
+done, i.e. per (voice, phrase, format), plus one per voice finished. Each
+line is flushed and fsync'd as it's written, so the journal never claims
+more than is on disk; a line torn by a crash is ignored, and cut off, when
+the journal is next opened.
+
+The journal's first line says what the run was for -- the owner, the voices,
+the formats, the phrases -- and how many units each voice has to do. A run
+with the same parameters resumes the journal; a run with other parameters,
+or after the last one finished, starts a new one. So, --status can say how
+far along each voice is from the journal alone, without asking ElevenLabs
+anything.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.journal import RegenJournal
+    >>> journal = RegenJournal({'owner': 'Charlie', 'voices': ['Freya'], 'formats': ['mp3', 'ogg']}, {'Freya': 2000})
+    >>> journal.is_done('Freya', 'good morning', 'ogg')
+    False
+    >>> journal.mark_done('Freya', ['good morning'], ['mp3', 'ogg'])
+    >>> journal.progress('Freya')
+    (2, 2000)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import os
+import time
+from os.path import join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_PATH
+
+JOURNAL_FILENAME = '.regen.journal'
+
+
+def pathname_of_journal(root:str=SOUNDS_CACHE_PATH) -> str:
+    """Where the journal of the cache at this root is kept."""
+    return join(root, JOURNAL_FILENAME)
+
+
+def read_journal(fname:str) -> tuple:
+    """The records in this journal, in order, and how many bytes of it are whole lines. A torn last line is left out."""
+    try:
+        with open(fname, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    whole = data.rfind(b'\n') + 1
+    records = []
+    for line in data[:whole].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, whole
+
+
+class RegenJournal:
+    """The journal of one regeneration run. Thread-safe.
+
+    Args:
+        params: What the run is for, e.g. {'owner': ..., 'voices': [...],
+            'formats': [...], 'phrases': a digest of the phrase list}. If
+            the journal on disk was started with the same params, and not
+            finished, it's resumed; else, it's started afresh.
+        totals: {voice: how many units of work it has to do}
+        root: The cache root.
+
+    Attributes:
+        resumed (bool): True if this run is carrying on from an earlier one.
+
+    """
+
+    def __init__(self, params:dict, totals:dict, root:str=SOUNDS_CACHE_PATH):
+        self.fname = pathname_of_journal(root)
+        self.params = json.loads(json.dumps(params))  # ...as it would be read back
+        self._lock = Lock()
+        self._done = set()
+        self._voices_done = set()
+        records, whole = read_journal(self.fname)
+        self.resumed = len(records) > 0 and records[0].get('params') == self.params and not any('finished' in r for r in records)
+        if self.resumed:
+            self.totals = records[0]['totals']
+            for r in records[1:]:
+                self._load(r)
+            with open(self.fname, 'r+b') as f:
+                f.truncate(whole)  # ...so that the next line doesn't get glued to a torn one
+        else:
+            self.totals = dict(totals)
+            os.makedirs(os.path.dirname(self.fname) or '.', exist_ok=True)
+            with open(self.fname, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'params': self.params, 'totals': self.totals, 'started': time.time()}) + '\n')
+        self._f = open(self.fname, 'a', encoding='utf-8')  # pylint: disable=consider-using-with
+
+    def _load(self, record:dict):
+        if 'voice_done' in record:
+            self._voices_done.add(record['voice_done'])
+        elif 'voice' in record:
+            for fmt in record['formats']:
+                for phrase in record['phrases']:
+                    self._done.add((record['voice'], phrase, fmt))
+
+    def _append(self, record:dict):
+        """Write one record and make sure that it's on disk before returning. Call me with self._lock held."""
+        self._f.write(json.dumps(record) + '\n')
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def is_done(self, voice:str, phrase:str, fmt:str) -> bool:
+        with self._lock:
+            return (voice, phrase, fmt) in self._done
+
+    def is_voice_done(self, voice:str) -> bool:
+        with self._lock:
+            return voice in self._voices_done
+
+    def mark_done(self, voice:str, phrases:list, formats:list):
+        """These phrases are done, in these formats. Phrases already marked done are not written again."""
+        with self._lock:
+            phrases = [p for p in phrases if any((voice, p, fmt) not in self._done for fmt in formats)]
+            if phrases == []:
+                return
+            self._append({'voice': voice, 'phrases': phrases, 'formats': list(formats)})
+            for fmt in formats:
+                for phrase in phrases:
+                    self._done.add((voice, phrase, fmt))
+
+    def mark_voice_done(self, voice:str):
+        """Everything for this voice is done, including the per-directory steps after synthesis."""
+        with self._lock:
+            if voice not in self._voices_done:
+                self._append({'voice_done': voice})
+                self._voices_done.add(voice)
+
+    def progress(self, voice:str) -> tuple:
+        """(units done, units to do) for this voice."""
+        with self._lock:
+            total = self.totals.get(voice, 0)
+            if voice in self._voices_done:
+                return (total, total)
+            return (min(total, sum(1 for v, _, _ in self._done if v == voice)), total)
+
+    def finish(self):
+        """The run is over. The next run starts a new journal."""
+        with self._lock:
+            self._append({'finished': time.time()})
+            self._f.close()
+
+
+def journal_status(root:str=SOUNDS_CACHE_PATH) -> dict:
+    """What the journal says, without resuming it: {'params', 'started', 'finished' (or None), 'voices': {voice: (done, total)}}; or None, if there's no journal."""
+    records, _ = read_journal(pathname_of_journal(root))
+    if records == [] or 'params' not in records[0]:
+        return None
+    done, voices_done, finished = {}, set(), None
+    for r in records[1:]:
+        if 'voice_done' in r:
+            voices_done.add(r['voice_done'])
+        elif 'voice' in r:
+            done.setdefault(r['voice'], set()).update((p, fmt) for p in r['phrases'] for fmt in r['formats'])
+        elif 'finished' in r:
+            finished = r['finished']
+    totals = records[0]['totals']
+    return {'params': records[0]['params'], 'started': records[0].get('started'), 'finished': finished,
+            'voices': {v: (t if v in voices_done else min(t, len(done.get(v, ()))), t) for v, t in totals.items()}}
+
+
+def report_status(root:str=SOUNDS_CACHE_PATH) -> int:
+    """Print how far along the current (or last) regeneration run is, voice by voice.
+
+    Returns:
+        int: 0 if the run finished (or there's none); 1 if it's unfinished.
+
+    """
+    status = journal_status(root)
+    if status is None:
+        print("No regeneration run has been journaled in %s" % root)
+        return 0
+    print("Regeneration run started {started}; {state}".format(
+        started=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(status['started'] or 0)),
+        state='unfinished' if status['finished'] is None else 'finished ' + time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(status['finished']))))
+    all_done = all_total = 0
+    for voice in status['params'].get('voices', sorted(status['voices'])):
+        done, total = status['voices'].get(voice, (0, 0))
+        all_done, all_total = all_done + done, all_total + total
+        print("    {voice:<20} {pc:5.1f}% ({done} of {total})".format(voice=voice, pc=100.0 * done / total if total else 100.0, done=done, total=total))
+    print("In all: {pc:5.1f}% ({done} of {total})".format(pc=100.0 * all_done / all_total if all_total else 100.0, done=all_done, total=all_total))
+    return 0 if status['finished'] is not None else 1
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Work out what kind of audio file something really is, from its first few bytes.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+ElevenLabs sometimes hands us an ogg when we asked for an mp3, and a failed
+download can leave an empty file. This module recognizes each kind of file
+by its magic bytes, so that we needn't shell out to `file | grep` for every
+phrase. verify_cache() checks a whole voice directory, in parallel, in one
+pass.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.sniff import sniff_audio_format, verify_cache
+    >>> sniff_audio_format('sounds/cache/Freya/good_morning.ogg')
+    'ogg'
+    >>> report = verify_cache('Freya')
+    >>> report['mismatched']
+    []
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir
+from os.path import isfile, join
+
+from my.globals import SOUNDS_CACHE_PATH
+
+SNIFF_LEN = 4
+
+
+def sniff_audio_bytes(data:bytes) -> str:
+    """Return 'ogg', 'mp3', 'pcm' or 'empty', depending on what these (first few) bytes look like; else, None."""
+    if len(data) == 0:
+        return 'empty'
+    elif data[:4] == b'OggS':
+        return 'ogg'
+    elif data[:3] == b'ID3':
+        return 'mp3'
+    elif len(data) >= 2 and data[0] == 0xFF and (data[1] & 0xE0) == 0xE0:  # MPEG frame sync
+        return 'mp3'
+    elif data[:4] == b'PCM1':
+        return 'pcm'
+    else:
+        return None
+
+
+def sniff_audio_format(fname:str) -> str:
+    """Return 'ogg', 'mp3', 'pcm' or 'empty', depending on what this file really is.
+
+    Returns:
+        str: The kind of file. None, if it doesn't exist or I don't recognize it.
+
+    """
+    try:
+        with open(fname, 'rb') as f:
+            return sniff_audio_bytes(f.read(SNIFF_LEN))
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def verify_directory(path:str, max_workers:int=8) -> dict:
+    """Sniff every file in this directory, in parallel, and say what's wrong.
+
+    Args:
+        path: The directory, e.g. sounds/cache/Freya
+        max_workers: How many files to sniff at once.
+
+    Returns:
+        dict: {'path': path, 'checked': how many files,
+            'ok': how many are what their suffix says they are,
+            'empty': [pathnames], 'unknown': [pathnames],
+            'mismatched': [(pathname, what it really is)],
+            'missing_ogg': [mp3 pathnames with no ogg],
+            'missing_mp3': [ogg pathnames with no mp3]}
+
+    """
+    fnames = sorted([f for f in listdir(path) if isfile(join(path, f)) and not f.startswith('.')])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        kinds = list(executor.map(lambda f: sniff_audio_format(join(path, f)), fnames))
+    report = {'path': path, 'checked': len(fnames), 'ok': 0, 'empty': [], 'unknown': [], 'mismatched': [], 'missing_ogg': [], 'missing_mp3': []}
+    for f, kind in zip(fnames, kinds):
+        suffix = f.split('.')[-1]
+        if kind == 'empty':
+            report['empty'].append(join(path, f))
+        elif kind is None:
+            report['unknown'].append(join(path, f))
+        elif kind != suffix:
+            report['mismatched'].append((join(path, f), kind))
+        else:
+            report['ok'] += 1
+    present = set(fnames)
+    for f in fnames:
+        stem, suffix = f[:-4], f[-4:]
+        if suffix == '.mp3' and stem + '.ogg' not in present:
+            report['missing_ogg'].append(join(path, f))
+        elif suffix == '.ogg' and stem + '.mp3' not in present:
+            report['missing_mp3'].append(join(path, f))
+    return report
+
+
+def verify_cache(voice:str, cache_path:str=SOUNDS_CACHE_PATH, max_workers:int=8) -> dict:
+    """Check, in one parallel pass, that every file in this voice's cache is what it says it is.
+
+    See verify_directory() for the report. Its 'voice' key is set, too.
+
+    """
+    report = verify_directory(join(cache_path, voice), max_workers=max_workers)
+    report['voice'] = voice
+    return report
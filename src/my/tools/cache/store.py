@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""A content-addressed store underneath the speech cache.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+A cached clip's filename says only who speaks it and (roughly) what they say.
+It doesn't say which model or voice settings made it; and two clips with the
+same contents -- e.g. punctuation variants that ElevenLabs speaks identically
+-- take up twice the room.
+
+So, two keys:
+
+    synthesis key   SHA-256 of the voice, the normalized text and the full
+                    synthesis settings. It's recorded in the catalog, next
+                    to each clip. If the settings change, the keys of exactly
+                    those clips that the change affects stop matching, and
+                    the regen tool makes them again.
+    content hash    SHA-256 of the clip's bytes. Each distinct payload is
+                    stored once, as sounds/cache/.store/ab/abcdef....ogg,
+                    and every named file with those contents (e.g.
+                    sounds/cache/Freya/good_morning.ogg) is a hard link to
+                    it. So, the names -- and every function that uses them
+                    -- work as before.
+
+A blob with no names left (i.e. a link count of one) is garbage; see
+collect_garbage(), or collect_blob() for one blob whose last name has just
+been deleted.
+
+Note:
+    Never write into a cached file in place. Unlink it, then write it. (All
+    our code does.) Otherwise, every name that shares its blob would change.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.store import dedupe_directory, collect_garbage
+    >>> dedupe_directory('sounds/cache/Freya')
+    (412, 1839104)
+    >>> collect_garbage()
+    0
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import hashlib
+import json
+import os
+from os import listdir
+from os.path import dirname, exists, isdir, isfile, join
+
+from my.globals import SOUNDS_CACHE_PATH
+from my.tools.cache.catalog import CATALOG_CODECS, catalog_of_clip, sha256_of_file
+
+STORE_DIRNAME = '.store'
+
+
+def pathname_of_store(root:str=SOUNDS_CACHE_PATH) -> str:
+    """The store of this cache root, e.g. sounds/cache/.store"""
+    return join(os.path.normpath(root), STORE_DIRNAME)
+
+
+def pathname_of_blob(sha256:str, codec:str, root:str=SOUNDS_CACHE_PATH) -> str:
+    """Where the blob with this content hash lives, e.g. sounds/cache/.store/ab/abcdef....ogg"""
+    return join(pathname_of_store(root), sha256[:2], '%s.%s' % (sha256, codec))
+
+
+def normalized_text(text:str) -> str:
+    """The text as ElevenLabs will hear it: lowercase, with single spaces and straight single quotes."""
+    return ' '.join(text.lower().replace('"', "'").replace('’', "'").split())
+
+
+def synthesis_key(voice:str, text:str, settings:dict) -> str:
+    """The SHA-256, in hex, of everything that determines what a synthesized clip sounds like.
+
+    Args:
+        voice: e.g. Freya
+        text: What she says. It's normalized first (see normalized_text()).
+        settings: e.g. Text2SpeechSingleton.synthesis_settings
+
+    """
+    identity = json.dumps({'voice': voice, 'text': normalized_text(text), 'settings': settings}, sort_keys=True)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def intern_file(fname:str, root:str=SOUNDS_CACHE_PATH) -> str:
+    """Store this file's contents once, in the store; make fname a hard link to that copy.
+
+    If the store has these contents already, fname is replaced (atomically)
+    by a link to them, and its own copy is freed. If the filesystem can't do
+    hard links, nothing changes.
+
+    Returns:
+        str: The content hash.
+
+    """
+    sha256 = sha256_of_file(fname)
+    blob = pathname_of_blob(sha256, fname.rsplit('.', 1)[-1], root)
+    try:
+        if not exists(blob):
+            os.makedirs(dirname(blob), exist_ok=True)
+            os.link(fname, blob)
+        elif not os.path.samefile(fname, blob):
+            tmpfname = fname + '.tmp'
+            os.link(blob, tmpfname)
+            os.replace(tmpfname, fname)
+    except OSError as e:
+        print("WARNING - unable to store %s by its contents: %s" % (fname, str(e)))
+    return sha256
+
+
+def dedupe_directory(path:str, root:str=SOUNDS_CACHE_PATH) -> tuple:
+    """Intern every clip in this directory (e.g. sounds/cache/Freya) that isn't interned already.
+
+    Returns:
+        tuple: (how many clips I interned, how many bytes that freed)
+
+    """
+    interned = freed = 0
+    for f in sorted(listdir(path)):
+        fname = join(path, f)
+        if f.rsplit('.', 1)[-1] not in CATALOG_CODECS or not isfile(fname) or os.stat(fname).st_nlink > 1:
+            continue
+        before = os.stat(fname)
+        intern_file(fname, root)
+        interned += 1
+        freed += before.st_size if os.stat(fname).st_ino != before.st_ino else 0  # It's a link to an older copy now
+    return (interned, freed)
+
+
+def blob_of_file(fname:str, root:str=SOUNDS_CACHE_PATH, sha256:str=None) -> str:
+    """The blob that this file is a hard link to; or None, if it isn't interned.
+
+    Args:
+        fname: e.g. sounds/cache/Freya/good_morning.ogg
+        root: The cache root.
+        sha256 (optional): Its content hash, if known (e.g. from the
+            catalog). Otherwise, the file is read to learn it.
+
+    """
+    try:
+        if os.stat(fname).st_nlink < 2:
+            return None
+        blob = pathname_of_blob(sha256_of_file(fname) if sha256 is None else sha256, fname.rsplit('.', 1)[-1], root)
+        return blob if exists(blob) and os.path.samefile(fname, blob) else None
+    except FileNotFoundError:
+        return None
+
+
+def collect_blob(blob:str) -> int:
+    """Delete this blob if no cached clip links to it any more, e.g. because its last one has just been evicted.
+
+    Returns:
+        int: How many bytes that freed.
+
+    """
+    try:
+        st = os.stat(blob)
+        if st.st_nlink > 1:
+            return 0
+        os.unlink(blob)
+    except FileNotFoundError:
+        return 0
+    return st.st_size
+
+
+def collect_garbage(root:str=SOUNDS_CACHE_PATH) -> int:
+    """Delete every blob that no cached clip links to any more.
+
+    Returns:
+        int: How many bytes that freed.
+
+    """
+    store = pathname_of_store(root)
+    freed = 0
+    for subdir in (listdir(store) if isdir(store) else []):
+        for f in listdir(join(store, subdir)):
+            freed += collect_blob(join(store, subdir, f))
+    return freed
+
+
+def intern_clip(fname:str) -> str:
+    """Intern this clip, if it's in a cache (see my.tools.cache.catalog.catalog_of_clip()). Return its content hash, or None."""
+    catalog = catalog_of_clip(fname)
+    return None if catalog is None else intern_file(fname, catalog.root)
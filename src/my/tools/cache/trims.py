@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""How much silence there is at either end of each cached clip.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Working out where a clip's silence starts and stops means decoding it and
+examining it. That used to happen three times over: when the ogg was made,
+when a sentence was rendered, and when the alarm sounds were trimmed. Now,
+it happens once, when the clip enters the cache. The answers -- the leading
+and trailing silence, in ms, at each of the three silence thresholds -- are
+kept in one small JSON file per directory (e.g.
+sounds/cache/Freya/.trims.json), which the janitor leaves alone.
+
+Examples:
+    $ python3
+    >>> from my.tools.cache.trims import trim_offsets
+    >>> trim_offsets('sounds/cache/Freya/good_morning.ogg', trim_level=1)
+    (0, 30)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import os
+from os.path import basename, dirname, join
+from threading import Lock
+
+from my.globals import DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD, LAZY_SILENCE_THRESHOLD
+
+TRIMS_FILENAME = '.trims.json'
+TRIMS_SAVE_EVERY = 50  # clips between saves of a directory's trims file, when many are cached at once (see my.text2speech.synthesize_plan())
+SILENCE_THRESHOLDS = {'lazy': LAZY_SILENCE_THRESHOLD, 'default': DEFAULT_SILENCE_THRESHOLD, 'snippy': SNIPPY_SILENCE_THRESHOLD}
+_trims = {}  # directory => {filename: {'size': bytes, 'lazy': [leading, trailing], 'default': [...], 'snippy': [...]}}
+_trims_lock = Lock()
+
+
+def pathname_of_trims(path:str) -> str:
+    """The pathname of the trims file for this directory, e.g. sounds/cache/Freya/.trims.json"""
+    return join(os.path.normpath(path), TRIMS_FILENAME)
+
+
+def silence_threshold_name(trim_level:int) -> str:
+    """The name of the silence threshold that trim_my_audio() uses at this trim level: 0=default, 1=lazy, 2+=snippy."""
+    return 'snippy' if trim_level > 1 else 'default' if trim_level == 0 else 'lazy'
+
+
+def _trims_of_directory(path:str) -> dict:
+    """The trims of this directory, loaded (once) from its trims file. Call me with _trims_lock held."""
+    path = os.path.normpath(path)
+    if path not in _trims:
+        try:
+            with open(pathname_of_trims(path), 'r', encoding='utf-8') as f:
+                _trims[path] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _trims[path] = {}
+    return _trims[path]
+
+
+def trim_offsets(fname:str, trim_level:int) -> tuple:
+    """How much silence (leading, trailing), in ms, trim_my_audio() would find in this clip at this trim level.
+
+    Returns:
+        tuple: (leading, trailing). None, if I don't know; e.g. if the clip
+            has been replaced since I was told.
+
+    """
+    with _trims_lock:
+        entry = _trims_of_directory(dirname(fname)).get(basename(fname))
+    if entry is None:
+        return None
+    try:
+        if os.path.getsize(fname) != entry['size']:
+            return None
+    except FileNotFoundError:
+        pass  # It's in the bundle, perhaps.
+    return tuple(entry[silence_threshold_name(trim_level)])
+
+
+def record_trim_offsets(fname:str, silences:dict, save:bool=True):
+    """Remember how much silence there is at either end of this clip.
+
+    Args:
+        fname: The clip, e.g. sounds/cache/Freya/good_morning.ogg
+        silences: {'lazy': (leading, trailing), 'default': ..., 'snippy': ...}
+        save: If False, don't write the trims file yet. See save_trims().
+
+    """
+    entry = {'size': os.path.getsize(fname)}
+    entry.update({k: list(silences[k]) for k in SILENCE_THRESHOLDS})
+    with _trims_lock:
+        _trims_of_directory(dirname(fname))[basename(fname)] = entry
+    if save:
+        save_trims(dirname(fname))
+
+
+def forget_trim_offsets(fname:str, save:bool=True):
+    """Forget what I knew about this clip's silence, e.g. because it was deleted."""
+    with _trims_lock:
+        forgotten = _trims_of_directory(dirname(fname)).pop(basename(fname), None)
+    if save and forgotten is not None:
+        save_trims(dirname(fname))
+
+
+def save_trims(path:str):
+    """Write this directory's trims file."""
+    path = os.path.normpath(path)
+    with _trims_lock:  # ...held while writing, too, so that two threads never write the same temporary file
+        data = json.dumps(_trims_of_directory(path), sort_keys=True)
+        tmpfname = pathname_of_trims(path) + '.tmp'
+        with open(tmpfname, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmpfname, pathname_of_trims(path))
@@ -23,16 +23,24 @@ Todo:
 
 """
 
+import io
 import pygame  # @UnresolvedImport
 import time
 from pydub.audio_segment import AudioSegment
-from my.tools.sound.trim import trim_my_audio
+from my.tools.sound.trim import measure_silences
 from my.globals import SOUNDS_CACHE_PATH
 from pydub.exceptions import CouldntDecodeError
 import os
 from os import listdir
 from os.path import isfile, join
 from my.classes.exceptions import MissingFromCacheError, PygameStartupError
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.bundle import bundle_of_directory
+from my.tools.cache.trims import record_trim_offsets, save_trims, trim_offsets
+from my.tools.sound.completion import playback_stopped, wait_for_playback
+from my.tools.sound.pcm import load_pcm_sound
+from my.tools.sound.transcode import file_mp3_to_ogg, mp3_to_ogg_batch, save_manifest, transcode_mp3_to_ogg, trim_audio_file, \
+    trimmed_alarms_batch
 from threading import Thread
 from queue import Empty, Queue
 
@@ -40,10 +48,49 @@ from queue import Empty, Queue
 def stop_sounds():
     pygame.mixer.music.stop()
     pygame.mixer.stop()
+    playback_stopped()  # ...so that whoever was waiting for a sound to end stops waiting
+
+
+def audio_source(fname):
+    """Return something that pygame can load: a file-like view into a bundle, if fname is bundled; else, fname."""
+    bundle = bundle_of_directory(os.path.dirname(fname))
+    if bundle is not None and os.path.basename(fname) in bundle:
+        return io.BytesIO(bundle.view(os.path.basename(fname)))
+    return fname
+
+
+def is_in_sounds_cache(fname) -> bool:
+    return os.path.abspath(fname).startswith(os.path.abspath(SOUNDS_CACHE_PATH) + os.sep)
+
+
+def audio_file_exists(fname) -> bool:
+    """Does this audio file exist?
+
+    A phrase in the sounds cache is looked up in the phrase index, which is
+    built once per process; so, on a miss, look on disk too (and tell the
+    index), in case another process wrote it since. Any other file (an alarm,
+    say) is looked for on disk.
+
+    """
+    if not is_in_sounds_cache(fname):
+        return os.path.exists(fname)
+    elif phrase_index.exists(fname):
+        return True
+    elif os.path.exists(fname):
+        phrase_index.add(fname)
+        return True
+    else:
+        return False
+
+
+def forget_audio_file(fname):
+    """It couldn't be opened, after all: take it out of the phrase index, so that the next lookup looks on disk."""
+    if is_in_sounds_cache(fname):
+        phrase_index.discard(fname)
 
 
 def play_audiofile(fname, vol=1.0, nowait=False):
-    if not os.path.exists(fname):
+    if not audio_file_exists(fname):
         raise FileNotFoundError("play_audiofile() cannot play %s: it doesn't exist" % fname)
     elif fname.endswith('.mp3'):
         play_mp3file(fname=fname, vol=vol, nowait=nowait)
@@ -53,47 +100,47 @@ def play_audiofile(fname, vol=1.0, nowait=False):
         raise ValueError("play_audiofile() cannot handle files of type .%s" % fname.split('.')[-1])
 
 
+def play_sound(sound1, vol=1.0, nowait=False):
+    chan = pygame.mixer.find_channel(True)
+    chan.set_volume(vol, vol)
+    chan.play(sound1)
+    if not nowait:
+        wait_for_playback(chan.get_busy, sound1.get_length())
+
+
 def play_mp3file(fname, vol=1.0, nowait=False):
     try:
-        pygame.mixer.music.load(fname)
+        pygame.mixer.music.load(audio_source(fname), fname.split('.')[-1])
     except FileNotFoundError as e:
+        forget_audio_file(fname)
         raise FileNotFoundError("play_mp3file() cannot play %s: it doesn't exist" % fname) from e
     else:
         pygame.mixer.music.set_volume(vol)
         pygame.mixer.music.play()
         if not nowait:
-            while pygame.mixer.music.get_busy() == True:
-                continue
+            wait_for_playback(pygame.mixer.music.get_busy)
 
 
 def play_oggfile(fname, vol=1.0, nowait=False):
     try:
-        sound1 = pygame.mixer.Sound(fname)
+        sound1 = load_pcm_sound(fname)  # Pre-decoded, if regen_cache_for_voice.py was run with --pcm
+        if sound1 is None:
+            sound1 = pygame.mixer.Sound(audio_source(fname))
     except FileNotFoundError as e:
+        forget_audio_file(fname)
         raise FileNotFoundError("FYI, play_oggfile() cannot play %s: it doesn't exist" % fname) from e
     else:
-        chan = pygame.mixer.find_channel(True)
-        chan.set_volume(vol, vol)
-        chan.play(sound1)
-        if not nowait:
-            while chan.get_busy() == True:
-                continue
+        play_sound(sound1, vol=vol, nowait=nowait)
 
 
-def mp3_to_ogg_conversions(path):
-    errors = 0
-    mp3files = [f for f in listdir(path) if isfile(join(path, f)) and f.endswith('.mp3')]
-    for f in mp3files:
-        mp3fname = '%s/%s' % (path, f)
-        oggfname = mp3fname.replace('.mp3', '.ogg')
-        if not os.path.exists(oggfname):
-            try:
-                convert_one_mp3_to_ogg_file(mp3fname, oggfname)
-            except CouldntDecodeError:
-                print("WARNING - could not decode %s; so, I'll delete it." % mp3fname)
-                os.unlink(mp3fname)
-                errors = errors + 1
-    return errors
+def mp3_to_ogg_conversions(path, workers=None):
+    """Convert each mp3 in this directory whose ogg is missing or out of date, on every core. See my.tools.sound.transcode.
+
+    Returns:
+        int: How many mp3 files couldn't be converted.
+
+    """
+    return mp3_to_ogg_batch(path, workers=workers)['failed']
 
 
 def mp3_to_ogg_voice_conversions(voice:str):
@@ -101,19 +148,43 @@ def mp3_to_ogg_voice_conversions(voice:str):
     mp3_to_ogg_conversions(path)
 
 
-def convert_one_mp3_to_ogg_file(mp3fname, oggfname):
+def convert_one_mp3_to_ogg_file(mp3fname, oggfname, save=True):
+    """Convert an mp3 into a trimmed ogg; and, while they're decoded, measure and record their silences (see my.tools.cache.trims)."""
     assert(os.path.exists(mp3fname))
     try:
         os.unlink(oggfname)
     except FileNotFoundError as _:
         pass
-    untrimmed_audio = AudioSegment.from_mp3(mp3fname)
-    trimmed_aud = trim_my_audio(untrimmed_audio, trim_level=1)
-    trimmed_aud.export(oggfname, format="ogg")
+    file_mp3_to_ogg(mp3fname, oggfname, transcode_mp3_to_ogg(mp3fname, oggfname), save=save)
     assert(os.path.exists(oggfname))
+    if save:
+        save_manifest(os.path.dirname(oggfname))
 #    print("Written output file to", oggfname)
 
 
+def measure_missing_trims(path, suffixes=('ogg', 'mp3')):
+    """Measure and record the silences of every clip in this directory that arrived before we kept track of them.
+
+    Returns:
+        int: How many clips I measured.
+
+    """
+    measured = 0
+    for f in sorted(listdir(path)):
+        fname = join(path, f)
+        if f.split('.')[-1] not in suffixes or not isfile(fname) or trim_offsets(fname, trim_level=1) is not None:
+            continue
+        try:
+            record_trim_offsets(fname, measure_silences(AudioSegment.from_file(fname)), save=False)
+        except CouldntDecodeError:
+            print("WARNING - could not decode %s; so, I can't measure its silences." % fname)
+        else:
+            measured += 1
+    if measured > 0:
+        save_trims(path)
+    return measured
+
+
 def ogg_file_queue_thread_func(qu):
     while True:
         try:
@@ -123,7 +194,10 @@ def ogg_file_queue_thread_func(qu):
         else:
             print(f'Processing item {item}')
             try:
-                play_oggfile(item)
+                if isinstance(item, pygame.mixer.Sound):
+                    play_sound(item)
+                else:
+                    play_oggfile(item)
             except FileNotFoundError:
                 print("ogg_file_queue_thread_func() -- cannot play %s: it doesn't exist" % item)
             qu.task_done()
@@ -138,19 +212,15 @@ def clear_ogg_queue():
     stop_sounds()
 
 
-def generate_trimmed_alarm_sounds(input_path, output_path, trim_level=1):
-    errors = 0
-    oggfiles = [f for f in listdir(input_path) if isfile(join(input_path, f)) and f.endswith('.ogg')]
-    for f in oggfiles:
-        oggfname = '%s/%s' % (input_path, f)
-        trimmedfname = '%s/%s' % (output_path, f)
-        generate_a_trimmed_alarm_sound(oggfname, trimmedfname, trim_level)
+def generate_trimmed_alarm_sounds(input_path, output_path, trim_level=1, workers=None):
+    """Trim each alarm sound whose trimmed copy is missing or out of date, on every core. See my.tools.sound.transcode."""
+    return trimmed_alarms_batch(input_path, output_path, trim_level, workers=workers)['failed']
 
 
-def generate_a_trimmed_alarm_sound(oggfname, trimmedfname, trim_level):
-    untrimmed_audio = AudioSegment.from_ogg(oggfname)
-    trimmed_aud = trim_my_audio(untrimmed_audio, trim_level)
-    trimmed_aud.export(trimmedfname, format="ogg")
+def generate_a_trimmed_alarm_sound(oggfname, trimmedfname, trim_level, save=True):
+    result = trim_audio_file(oggfname, trimmedfname, trim_level, silence=trim_offsets(oggfname, trim_level))
+    if result['silences'] is not None:  # It was put there by hand, not by mp3_to_ogg_conversions()
+        record_trim_offsets(oggfname, result['silences'], save=save)
 
 
 _CLEAR_THE_QUEUE = False
@@ -158,12 +228,16 @@ _CLEAR_THE_QUEUE = False
 
 def queue_oggfile(fname):  # TODO: rename queue_audiofile
     global ogg_queue
-    if not os.path.exists(fname):
+    if not audio_file_exists(fname):
         raise MissingFromCacheError("queue_oggfile() cannot queue %s: it doesn't exist" % fname)
     ogg_queue.put(fname)
 
-######################## MAIN-ish ###########################
 
+def queue_sound(sound1):
+    """Queue an already-rendered pygame.mixer.Sound, e.g. a pre-rendered alarm message."""
+    ogg_queue.put(sound1)
+
+######################## MAIN-ish ###########################
 
 ogg_queue = Queue()
 try:
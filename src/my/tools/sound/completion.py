@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Wait for a sound to finish, without burning a CPU core while it plays.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+play_sound() and play_mp3file() used to wait for the end of each clip in
+    while chan.get_busy() == True:
+        continue
+which kept one core at 100% -- on the ogg queue's thread, and on the GUI's,
+e.g. when it farts and apologizes -- for as long as the clip played. On a
+Pi, that's a hot Pi and a stuttering clockface.
+
+Now, the waiter sleeps. If it knows how long the sound is, it sleeps through
+that first; then, until the channel is no longer busy, it wakes every
+PLAYBACK_POLL_INTERVAL seconds to ask. stop_sounds() wakes every waiter at
+once (see playback_stopped()), so that nobody waits for a sound that has been
+cut off.
+
+Note:
+    pygame's own end events (Channel.set_endevent()) arrive on pygame's
+    event queue, which nobody pumps: the GUI is Qt's. So, we don't use them.
+
+Example:
+    $ python3
+    >>> from my.tools.sound.completion import wait_for_playback
+    >>> chan.play(sound1)
+    >>> wait_for_playback(chan.get_busy, sound1.get_length())
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import time
+from threading import Condition
+
+PLAYBACK_POLL_INTERVAL = 0.02  # seconds between "are you done yet?"s, once the sound should have ended
+_stops = Condition()
+_stop_count = 0  # how many times playback_stopped() has been called
+
+
+def playback_stopped():
+    """Every sound has just been stopped. Wake everyone who is waiting for one."""
+    global _stop_count  # pylint: disable=global-statement
+    with _stops:
+        _stop_count += 1
+        _stops.notify_all()
+
+
+def wait_for_playback(is_busy, length:float=None, poll:float=PLAYBACK_POLL_INTERVAL) -> bool:
+    """Sleep until is_busy() says False, or until playback_stopped() is called.
+
+    Args:
+        is_busy: e.g. chan.get_busy, or pygame.mixer.music.get_busy
+        length (optional): How many seconds the sound lasts, if known. It
+            isn't asked whether it's busy until then.
+        poll: How often to ask, after that.
+
+    Returns:
+        bool: True if the sound finished; False if it was stopped.
+
+    """
+    deadline = None if length is None else time.monotonic() + length
+    with _stops:
+        stop_count = _stop_count
+        while True:
+            if _stop_count != stop_count:
+                return False
+            now = time.monotonic()
+            if deadline is not None and now < deadline:
+                _stops.wait(deadline - now)
+            elif not is_busy():
+                return True
+            else:
+                _stops.wait(poll)
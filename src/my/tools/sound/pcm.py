@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Pre-decoded PCM copies of cached ogg files.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Decoding Vorbis on a Raspberry Pi, clip by clip, while the user waits for
+the next word, is slow. This module writes a .pcm file next to each .ogg
+file: the same audio, already decoded into the mixer's native sample format.
+Playback hands that buffer straight to pygame.mixer.Sound(buffer=...).
+
+File format:
+    MAGIC               4 bytes, b'PCM1'
+    frequency           4 bytes, unsigned, little-endian (e.g. 44100)
+    format              2 bytes, signed, little-endian (e.g. -16)
+    channels            2 bytes, unsigned, little-endian (e.g. 2)
+    samples             raw, interleaved
+
+If the mixer was initialized with a different frequency/format/channels,
+or if the .ogg has been rewritten since the .pcm was decoded from it, the
+.pcm file is ignored and the .ogg is decoded as usual.
+
+Examples:
+    $ python3
+    >>> from my.tools.sound.pcm import ogg_to_pcm_conversions
+    >>> ogg_to_pcm_conversions('sounds/cache/Freya')
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import mmap
+import os
+import struct
+from os import listdir
+from os.path import isfile, join
+
+import pygame  # @UnresolvedImport
+from pydub.audio_segment import AudioSegment
+from pydub.exceptions import CouldntDecodeError
+
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.bundle import bundle_of_directory
+
+PCM_MAGIC = b'PCM1'
+PCM_HEADER_FMT = '<4sIhH'
+PCM_HEADER_LEN = struct.calcsize(PCM_HEADER_FMT)
+
+
+def pcm_pathname(fname:str) -> str:
+    """sounds/cache/Freya/good_morning.ogg => sounds/cache/Freya/good_morning.pcm"""
+    return os.path.splitext(fname)[0] + '.pcm'
+
+
+def is_pcm_stale(pcmfname:str) -> bool:
+    """True if this .pcm file is older than its .ogg file, i.e. was decoded from audio that has since been replaced."""
+    try:
+        return os.path.getmtime(pcmfname) < os.path.getmtime(os.path.splitext(pcmfname)[0] + '.ogg')
+    except FileNotFoundError:
+        return False
+
+
+def mixer_format() -> tuple:
+    """Return the mixer's (frequency, format, channels). Raise ValueError if the mixer isn't running."""
+    fmt = pygame.mixer.get_init()
+    if fmt is None:
+        raise ValueError("The pygame mixer has not been initialized. I don't know which format to use.")
+    return tuple(fmt[:3])
+
+
+def pydub_format_of_mixer(the_format:tuple=None) -> tuple:
+    """Return the mixer's format as pydub would put it: (frame rate, sample width, channels).
+
+    Raises:
+        ValueError: The format isn't signed 16-bit, which is all that I handle.
+
+    """
+    frequency, sample_format, channels = mixer_format() if the_format is None else the_format
+    if sample_format != -16:
+        raise ValueError("I can convert only into signed 16-bit samples, not format %d" % sample_format)
+    return (frequency, 2, channels)
+
+
+def convert_one_ogg_to_pcm_file(oggfname:str, pcmfname:str, the_format:tuple=None):
+    """Decode an ogg file into a .pcm file in the mixer's native format.
+
+    Args:
+        oggfname: The source.
+        pcmfname: The destination.
+        the_format (optional): (frequency, format, channels). Default: the
+            mixer's current format.
+
+    Raises:
+        ValueError: The format isn't signed 16-bit, which is all that I handle.
+        CouldntDecodeError: The ogg file is duff.
+
+    """
+    the_format = mixer_format() if the_format is None else the_format
+    if the_format[1] != -16:
+        raise ValueError("I can pre-decode only into signed 16-bit samples, not format %d" % the_format[1])
+    write_pcm_file(AudioSegment.from_ogg(oggfname), pcmfname, the_format)
+
+
+def write_pcm_file(audio:AudioSegment, pcmfname:str, the_format:tuple=None):
+    """Write this audio into a .pcm file, in this format (default: the mixer's), atomically.
+
+    Raises:
+        ValueError: The format isn't signed 16-bit, which is all that I handle.
+
+    """
+    frequency, sample_format, channels = mixer_format() if the_format is None else the_format
+    if sample_format != -16:
+        raise ValueError("I can pre-decode only into signed 16-bit samples, not format %d" % sample_format)
+    audio = audio.set_frame_rate(frequency).set_channels(channels).set_sample_width(2)
+    tmpfname = pcmfname + '.tmp'
+    with open(tmpfname, 'wb') as f:
+        f.write(struct.pack(PCM_HEADER_FMT, PCM_MAGIC, frequency, sample_format, channels))
+        f.write(audio.raw_data)
+    os.replace(tmpfname, pcmfname)
+    phrase_index.add(pcmfname)
+
+
+def ogg_to_pcm_conversions(path:str, the_format:tuple=None) -> int:
+    """Pre-decode every ogg file in this directory whose .pcm is missing or older than it.
+
+    Returns:
+        int: How many files I couldn't decode.
+
+    """
+    errors = 0
+    the_format = mixer_format() if the_format is None else the_format
+    oggfiles = [f for f in listdir(path) if isfile(join(path, f)) and f.endswith('.ogg')]
+    for f in oggfiles:
+        oggfname = join(path, f)
+        pcmfname = pcm_pathname(oggfname)
+        if os.path.exists(pcmfname) and not is_pcm_stale(pcmfname):
+            continue
+        try:
+            convert_one_ogg_to_pcm_file(oggfname, pcmfname, the_format)
+        except CouldntDecodeError:
+            print("WARNING - could not decode %s; so, I can't pre-decode it." % oggfname)
+            errors = errors + 1
+    return errors
+
+
+def pcm_buffer(fname:str, the_format:tuple=None):
+    """Return the pre-decoded samples of this ogg file, without copying them; or None.
+
+    The samples come from the voice's bundle, if it has them; else, from an
+    mmap of the .pcm file. If there is no .pcm file, or if it was decoded
+    for a different mixer format, or if it's older than the ogg file (see
+    is_pcm_stale()), return None.
+
+    """
+    pcmfname = pcm_pathname(fname)
+    if not phrase_index.exists(pcmfname):
+        return None
+    bundle = bundle_of_directory(os.path.dirname(pcmfname))
+    if bundle is not None and os.path.basename(pcmfname) in bundle:
+        buf = bundle.view(os.path.basename(pcmfname))
+    elif is_pcm_stale(pcmfname):
+        return None  # ...until ogg_to_pcm_conversions() decodes it again
+    else:
+        try:
+            with open(pcmfname, 'rb') as f:
+                buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (FileNotFoundError, ValueError):
+            return None
+    if len(buf) < PCM_HEADER_LEN:
+        return None
+    magic, frequency, sample_format, channels = struct.unpack(PCM_HEADER_FMT, buf[:PCM_HEADER_LEN])
+    if magic != PCM_MAGIC or (frequency, sample_format, channels) != (mixer_format() if the_format is None else the_format):
+        return None
+    return buf[PCM_HEADER_LEN:]
+
+
+def audiosegment_to_sound(audio:AudioSegment, the_format:tuple=None):
+    """Convert an AudioSegment into a pygame.mixer.Sound, resampling it into the mixer's native format.
+
+    If it's in that format already (see pydub_format_of_mixer()), its samples are not copied again here.
+
+    """
+    frame_rate, sample_width, channels = pydub_format_of_mixer(the_format)
+    audio = audio.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+    return pygame.mixer.Sound(buffer=audio.raw_data)
+
+
+def load_pcm_sound(fname:str):
+    """Return a pygame.mixer.Sound of this ogg file's pre-decoded samples; or None, if there are none."""
+    buf = pcm_buffer(fname)
+    return None if buf is None else pygame.mixer.Sound(buffer=buf)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Transcode many audio files at once, on every core, skipping what's up to date.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+mp3_to_ogg_conversions() and generate_trimmed_alarm_sounds() used to decode,
+trim and encode their files one at a time, on one core; and the latter did
+all of it again on every run, whether or not anything had changed. Now, each
+batch is fanned out over a pool of processes (one per core, by default), and
+an output is skipped if it's up to date:
+
+    1. it's newer than its source, and was made with the same parameters
+       (e.g. trim level); or
+    2. its source's SHA-256 is the one it was made from -- e.g. because
+       the source was merely copied or touched -- in which case its mtime
+       is brought up to date, so that (1) says so quickly next time.
+
+What each output was made from, and how, is kept in a small JSON file per
+output directory (e.g. sounds/trimmedalarms/.transcode.json).
+
+The workers only decode, measure, trim and encode. Everything that touches
+shared state -- the trims files, the catalog, the phrase index -- happens
+in the parent, as each result comes back.
+
+Examples:
+    $ python3
+    >>> from my.tools.sound.transcode import mp3_to_ogg_batch
+    >>> report = mp3_to_ogg_batch('sounds/alarms')
+    Transcoded 3 files (1.2 MB) in 1.9s -- 1.6 files/s, 0.6 MB/s; 21 up to date; 0 failed
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import listdir
+from os.path import basename, dirname, exists, isfile, join
+from threading import Lock
+
+from pydub.audio_segment import AudioSegment
+from pydub.exceptions import CouldntDecodeError
+
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.cache.catalog import SETTINGS_COLUMNS, catalog_of_clip, record_clip, sha256_of_file
+from my.tools.cache.trims import record_trim_offsets, save_trims, silence_threshold_name, trim_offsets
+from my.tools.sound.trim import measure_silences, trim_my_audio
+
+MANIFEST_FILENAME = '.transcode.json'
+_manifests = {}  # directory => {output filename: {'sha256': of its source, 'params': {...}}}
+_manifests_lock = Lock()
+
+
+class AudioFacts:
+    """What the catalog wants to know about a decoded clip (see CacheCatalog.record()), without the clip itself, which is too big to send between processes."""
+
+    def __init__(self, audio:AudioSegment):
+        self.duration_ms = len(audio)
+        self.frame_rate = audio.frame_rate
+        self.dBFS = audio.dBFS
+
+    def __len__(self):
+        return self.duration_ms
+
+
+def _manifest_of_directory(path:str) -> dict:
+    """The manifest of this output directory, loaded (once). Call me with _manifests_lock held."""
+    path = os.path.normpath(path)
+    if path not in _manifests:
+        try:
+            with open(join(path, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+                _manifests[path] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _manifests[path] = {}
+    return _manifests[path]
+
+
+def save_manifest(path:str):
+    """Write this output directory's manifest."""
+    path = os.path.normpath(path)
+    with _manifests_lock:  # ...held while writing, too, so that two threads never write the same temporary file
+        data = json.dumps(_manifest_of_directory(path), sort_keys=True)
+        tmpfname = join(path, MANIFEST_FILENAME) + '.tmp'
+        with open(tmpfname, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmpfname, join(path, MANIFEST_FILENAME))
+
+
+def is_up_to_date(src:str, dst:str, params:dict=None) -> bool:
+    """Is dst a current transcoding of src, made with these parameters? See the module docstring."""
+    if not exists(dst):
+        return False
+    with _manifests_lock:
+        entry = _manifest_of_directory(dirname(dst)).get(basename(dst))
+    if entry is not None and entry.get('params') != params:
+        return False
+    if os.path.getmtime(dst) >= os.path.getmtime(src):
+        return True
+    if entry is not None and entry.get('sha256') == sha256_of_file(src):
+        os.utime(dst)  # ...so that next time, the mtime says so
+        return True
+    return False
+
+
+def _record_transcoding(dst:str, sha256:str, params:dict):
+    with _manifests_lock:
+        _manifest_of_directory(dirname(dst))[basename(dst)] = {'sha256': sha256, 'params': params}
+
+
+def transcode_mp3_to_ogg(mp3fname:str, oggfname:str) -> dict:
+    """Decode an mp3, trim it (at trim level 1) and encode it as an ogg; measure both. Safe to run in a worker process.
+
+    Returns:
+        dict: {'sha256': of the mp3, 'mp3': (AudioFacts, silences), 'ogg': (AudioFacts, silences)}
+
+    """
+    untrimmed_audio = AudioSegment.from_mp3(mp3fname)
+    mp3_silences = measure_silences(untrimmed_audio)
+    trimmed_aud = trim_my_audio(untrimmed_audio, trim_level=1, silence=mp3_silences[silence_threshold_name(1)])
+    tmpfname = oggfname + '.tmp'
+    trimmed_aud.export(tmpfname, format="ogg")
+    os.replace(tmpfname, oggfname)
+    return {'sha256': sha256_of_file(mp3fname), 'mp3': (AudioFacts(untrimmed_audio), mp3_silences),
+            'ogg': (AudioFacts(trimmed_aud), measure_silences(trimmed_aud))}
+
+
+def file_mp3_to_ogg(mp3fname:str, oggfname:str, result:dict, save:bool=True):
+    """Record what transcode_mp3_to_ogg() found: the trims of both files, their catalog rows, the manifest and the phrase index."""
+    audio, silences = result['mp3']
+    record_trim_offsets(mp3fname, silences, save=False)
+    record_clip(mp3fname, audio=audio, silences=silences)
+    audio, silences = result['ogg']
+    record_trim_offsets(oggfname, silences, save=save)
+    catalog = catalog_of_clip(mp3fname)
+    mp3_clip = None if catalog is None else catalog.clip(mp3fname)
+    record_clip(oggfname, audio=audio, silences=silences, phrase=None if mp3_clip is None else mp3_clip['phrase'],
+                settings=None if mp3_clip is None else {k: mp3_clip[k] for k in SETTINGS_COLUMNS},
+                synthesis_key=None if mp3_clip is None else mp3_clip['synthesis_key'])
+    _record_transcoding(oggfname, result['sha256'], {'trim_level': 1})
+    phrase_index.add(oggfname)
+
+
+def trim_audio_file(srcfname:str, dstfname:str, trim_level:int, silence:tuple=None) -> dict:
+    """Trim an audio file's silences (measuring them, if silence is None) and encode it as an ogg. Safe to run in a worker process.
+
+    Returns:
+        dict: {'sha256': of the source, 'silences': what I measured, or None}
+
+    """
+    untrimmed_audio = AudioSegment.from_file(srcfname)
+    silences = None
+    if silence is None:
+        silences = measure_silences(untrimmed_audio)
+        silence = silences[silence_threshold_name(trim_level)]
+    tmpfname = dstfname + '.tmp'
+    trim_my_audio(untrimmed_audio, trim_level, silence=silence).export(tmpfname, format="ogg")
+    os.replace(tmpfname, dstfname)
+    return {'sha256': sha256_of_file(srcfname), 'silences': silences}
+
+
+def _pool_context():
+    # Forked workers inherit our imports. Spawned ones (macOS) would import my.tools.sound afresh -- and start another mixer.
+    return multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+
+
+def run_batch(func, tasks:list, on_result, on_error=None, workers:int=None, skipped:int=0, verbose:bool=True) -> dict:
+    """Run func(*task) for each task on a pool of processes; hand each result, in this process, to on_result(task, result).
+
+    Args:
+        func: A top-level function (so that it can be pickled).
+        tasks: [(arg, arg, ...), ...]. The first arg is the source file.
+        on_result: on_result(task, result), for each success.
+        on_error (optional): on_error(task, exception), for each failure.
+            If None, failures are merely counted and reported.
+        workers (optional): How many processes. Default: one per core. With
+            one worker, or one task, no pool is made.
+        skipped: How many files the caller skipped, for the report.
+        verbose: If True, print the throughput.
+
+    Returns:
+        dict: {'done': n, 'failed': n, 'skipped': n, 'bytes': of the sources done, 'seconds': s}
+
+    """
+    workers = workers or os.cpu_count() or 1
+    report = {'done': 0, 'failed': 0, 'skipped': skipped, 'bytes': 0, 'seconds': 0.0}
+    started = time.monotonic()
+
+    def finish(task, future_or_result, error):
+        if error is not None:
+            report['failed'] += 1
+            if on_error is not None:
+                on_error(task, error)
+            else:
+                print("WARNING - unable to transcode %s: %s" % (task[0], str(error)))
+        else:
+            on_result(task, future_or_result)
+            report['done'] += 1
+            report['bytes'] += os.path.getsize(task[0]) if exists(task[0]) else 0
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                result = func(*task)
+            except (CouldntDecodeError, OSError) as e:
+                finish(task, None, e)
+            else:
+                finish(task, result, None)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=_pool_context()) as pool:
+            futures = {pool.submit(func, *task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except (CouldntDecodeError, OSError) as e:
+                    finish(futures[future], None, e)
+                else:
+                    finish(futures[future], result, None)
+    report['seconds'] = time.monotonic() - started
+    if verbose and (report['done'] or report['failed']):
+        print("Transcoded {done} files ({mb:.1f} MB) in {secs:.1f}s -- {fps:.1f} files/s, {mbps:.1f} MB/s; {skipped} up to date; {failed} failed".format(
+            done=report['done'], mb=report['bytes'] / 1e6, secs=report['seconds'],
+            fps=report['done'] / max(report['seconds'], 1e-6), mbps=report['bytes'] / 1e6 / max(report['seconds'], 1e-6),
+            skipped=report['skipped'], failed=report['failed']))
+    return report
+
+
+def mp3_to_ogg_batch(path:str, workers:int=None, verbose:bool=True) -> dict:
+    """Convert every mp3 in this directory into a trimmed ogg, unless its ogg is up to date. Undecodable mp3s are deleted.
+
+    Returns:
+        dict: See run_batch().
+
+    """
+    tasks = []
+    skipped = 0
+    for f in sorted(listdir(path)):
+        mp3fname = join(path, f)
+        if not f.endswith('.mp3') or not isfile(mp3fname):
+            continue
+        oggfname = mp3fname[:-4] + '.ogg'
+        if is_up_to_date(mp3fname, oggfname, {'trim_level': 1}):
+            skipped += 1
+        else:
+            tasks.append((mp3fname, oggfname))
+
+    def on_error(task, error):
+        if isinstance(error, CouldntDecodeError):
+            print("WARNING - could not decode %s; so, I'll delete it." % task[0])
+            os.unlink(task[0])
+            phrase_index.discard(task[0])
+        else:
+            print("WARNING - unable to convert %s: %s" % (task[0], str(error)))
+
+    report = run_batch(transcode_mp3_to_ogg, tasks, on_result=lambda task, result: file_mp3_to_ogg(task[0], task[1], result, save=False),
+                       on_error=on_error, workers=workers, skipped=skipped, verbose=verbose)
+    if tasks:
+        save_trims(path)
+        save_manifest(path)
+    return report
+
+
+def trimmed_alarms_batch(input_path:str, output_path:str, trim_level:int=1, workers:int=None, verbose:bool=True) -> dict:
+    """Trim every ogg in input_path into output_path, unless the trimmed copy is up to date.
+
+    Returns:
+        dict: See run_batch().
+
+    """
+    os.makedirs(output_path, exist_ok=True)
+    tasks = []
+    skipped = 0
+    for f in sorted(listdir(input_path)):
+        oggfname = join(input_path, f)
+        if not f.endswith('.ogg') or not isfile(oggfname):
+            continue
+        trimmedfname = join(output_path, f)
+        if is_up_to_date(oggfname, trimmedfname, {'trim_level': trim_level}):
+            skipped += 1
+        else:
+            tasks.append((oggfname, trimmedfname, trim_level, trim_offsets(oggfname, trim_level)))
+
+    def on_result(task, result):
+        if result['silences'] is not None:  # It was put there by hand, not by mp3_to_ogg_conversions()
+            record_trim_offsets(task[0], result['silences'], save=False)
+        _record_transcoding(task[1], result['sha256'], {'trim_level': trim_level})
+
+    report = run_batch(trim_audio_file, tasks, on_result=on_result, workers=workers, skipped=skipped, verbose=verbose)
+    if tasks:
+        save_trims(input_path)
+        save_manifest(output_path)
+    return report
@@ -20,12 +20,14 @@ Todo:
 
 """
 
-import os
+import io
 
+import numpy as np
 from pydub.audio_segment import AudioSegment
 
-from my.globals import DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD, LAZY_SILENCE_THRESHOLD
-from my.stringutils import generate_random_string
+from my.globals import DEFAULT_SILENCE_THRESHOLD
+from my.tools.cache.sniff import sniff_audio_bytes
+from my.tools.cache.trims import SILENCE_THRESHOLDS, silence_threshold_name
 
 
 def detect_leading_silence(sound:AudioSegment, silence_threshold:float=DEFAULT_SILENCE_THRESHOLD, chunk_size:int=10) -> int:
@@ -53,12 +55,152 @@ def detect_leading_silence(sound:AudioSegment, silence_threshold:float=DEFAULT_S
     return trim_ms
 
 
-def convert_audio_recordings_list_into_one_audio_recording(data, trim_level, suffix) -> AudioSegment:
+FIRST_BATCH_OF_CHUNKS = 32
+
+
+def _chunk_boundaries(sound:AudioSegment, chunk_size:int) -> np.ndarray:
+    """Where (in frames) each chunk_size-ms chunk of this sound starts, as pydub would slice it, plus where the last one ends."""
+    duration = len(sound)
+    no_of_chunks = -(-duration // chunk_size)
+    milliseconds = np.minimum(np.arange(no_of_chunks + 1) * chunk_size, duration)
+    return (milliseconds * (sound.frame_rate / 1000.0)).astype(np.int64)
+
+
+def _chunk_dbfs(frames:np.ndarray, boundaries:np.ndarray, max_amplitude:float) -> np.ndarray:
+    """The dBFS of each chunk of frames [boundaries[i], boundaries[i+1]), the way AudioSegment.dBFS would compute it.
+
+    The boundaries may run backwards, from the end of the sound; if so, each
+    chunk is [boundaries[i+1], boundaries[i]). If a chunk runs off either end
+    of the sound, pydub pads it with silence; so, the missing frames count
+    towards the mean, but not towards the sum.
+
+    """
+    clamped = np.clip(boundaries, 0, len(frames))
+    lo, hi = int(clamped.min()), int(clamped.max())
+    squares = frames[lo:hi].astype(np.float64) ** 2
+    cumulative = np.concatenate(([0.0], np.cumsum(squares.sum(axis=1))))
+    sums = cumulative[clamped[1:] - lo] - cumulative[clamped[:-1] - lo]
+    counts = np.abs(boundaries[1:] - boundaries[:-1]) * frames.shape[1]
+    rms = np.floor(np.sqrt(np.divide(np.abs(sums), counts, out=np.zeros(len(sums)), where=counts > 0)))  # audioop.rms() returns an int
+    with np.errstate(divide='ignore'):
+        return 20 * np.log10(rms / max_amplitude)
+
+
+def _silent_chunks(frames:np.ndarray, boundaries:np.ndarray, silence_threshold:float, max_amplitude:float) -> int:
+    """How many of these chunks, in order, are silent before the first loud one.
+
+    Look at a few chunks at a time, doubling the batch each time, so that a
+    long clip with very little silence at its ends is hardly read at all.
+
+    """
+    start, batch = 0, FIRST_BATCH_OF_CHUNKS
+    while start < len(boundaries) - 1:
+        end = min(start + batch, len(boundaries) - 1)
+        loud = np.flatnonzero(_chunk_dbfs(frames, boundaries[start:end + 1], max_amplitude) >= silence_threshold)
+        if len(loud):
+            return start + int(loud[0])
+        start, batch = end, batch * 2
+    return len(boundaries) - 1
+
+
+def detect_silence_at_both_ends(sound:AudioSegment, silence_threshold:float=DEFAULT_SILENCE_THRESHOLD, chunk_size:int=10) -> tuple:
+    """Detect the leading and trailing silence in a sound sample.
+
+    This gives the same answers as calling detect_leading_silence() on the
+    sound and on sound.reverse(); but it reads the samples in place, with
+    NumPy, many chunks at a time, and never makes a reversed copy.
+
+    Args:
+        sound: The audio data.
+        silence_threshold: The silence threshold, for 'squelching', in decibels.
+        chunk_size: How many milliseconds should we examine at a time.
+
+    Returns:
+        tuple: (leading, trailing) milliseconds of silence that we found.
+
+    """
+    assert chunk_size > 0
+    if sound.sample_width not in (1, 2, 4):  # 24-bit samples don't map onto a NumPy type
+        return (detect_leading_silence(sound, silence_threshold, chunk_size),
+                detect_leading_silence(sound.reverse(), silence_threshold, chunk_size))
+    frames = np.frombuffer(sound.raw_data, dtype={1: np.int8, 2: np.int16, 4: np.int32}[sound.sample_width]).reshape(-1, sound.channels)
+    boundaries = _chunk_boundaries(sound, chunk_size)
+    leading = _silent_chunks(frames, boundaries, silence_threshold, sound.max_possible_amplitude)
+    trailing = _silent_chunks(frames, len(frames) - boundaries, silence_threshold, sound.max_possible_amplitude)
+    return (leading * chunk_size, trailing * chunk_size)
+
+
+def decode_audio_data(data:bytes, suffix:str) -> AudioSegment:
+    """Decode one audio recording (mp3 or ogg data) into an AudioSegment, in memory.
+
+    pydub pipes the data into ffmpeg and reads the samples back, so no
+    temporary file is written. If the data's magic bytes say that it's
+    really an ogg (or an mp3), never mind the suffix.
+
+    """
+    kind = sniff_audio_bytes(data[:4])
+    kind = kind if kind in ('mp3', 'ogg') else suffix if suffix in ('mp3', 'ogg') else None
+    return AudioSegment.from_file(io.BytesIO(data), format=kind)
+
+
+def _frames_of_span(audio:AudioSegment, span:tuple) -> tuple:
+    """The (first, last) frames of this (start, end) span, in ms, the way pydub would slice it. None means all of it."""
+    start, end = (0, len(audio)) if span is None else (min(span[0], len(audio)), min(span[1], len(audio)))
+    return int(start * (audio.frame_rate / 1000.0)), int(end * (audio.frame_rate / 1000.0))
+
+
+def concatenate_audio(segments:list, spans:list=None, gap_ms:int=0, the_format:tuple=None) -> AudioSegment:
+    """Concatenate these clips (or these spans of them) into one buffer, written once.
+
+    sounds += clip copies everything so far, every time; so, a long sentence
+    costs quadratic memory traffic. Instead, I measure every clip first,
+    allocate one buffer for the lot, and copy each clip into it once.
+
+    Args:
+        segments: The AudioSegments.
+        spans (optional): For each segment, the (start, end) in ms of the
+            part of it to use (see trim_span()), or None, meaning all of it.
+        gap_ms: How many ms of silence to put between one clip and the next.
+        the_format (optional): The (frame rate, sample width, channels) of
+            the result. Default: the finest of the clips' own, as
+            AudioSegment.__add__() would choose. Clips in another format are
+            converted first.
+
+    Returns:
+        AudioSegment: The lot. Its raw_data is the buffer itself, which can
+            be handed to pygame.mixer.Sound(buffer=...) without a copy.
+
+    """
+    if spans is None:
+        spans = [None] * len(segments)
+    if the_format is None:
+        the_format = (max(s.frame_rate for s in segments), max(s.sample_width for s in segments), max(s.channels for s in segments))
+    frame_rate, sample_width, channels = the_format
+    frame_width = sample_width * channels
+    pieces = []  # (the bytes to copy, how many frames they should fill)
+    for audio, span in zip(segments, spans):
+        if (audio.frame_rate, audio.sample_width, audio.channels) == the_format:
+            first, last = _frames_of_span(audio, span)
+            pieces.append((memoryview(audio.raw_data)[first * frame_width:last * frame_width], max(0, last - first)))
+        else:
+            audio = (audio if span is None else audio[span[0]:span[1]]).set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width)
+            pieces.append((memoryview(audio.raw_data), len(audio.raw_data) // frame_width))
+    gap_frames = int(gap_ms * (frame_rate / 1000.0))
+    buf = bytearray((sum(n for _, n in pieces) + gap_frames * max(0, len(pieces) - 1)) * frame_width)  # all zeroes, i.e. silence
+    pos = 0
+    for data, no_of_frames in pieces:
+        buf[pos:pos + len(data)] = data  # If pydub would have padded the clip with silence, the zeroes are there already.
+        pos += (no_of_frames + gap_frames) * frame_width
+    return AudioSegment(data=buf, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+
+def convert_audio_recordings_list_into_one_audio_recording(data, trim_level, suffix, gap_ms:int=0, the_format:tuple=None, silences:list=None) -> AudioSegment:
     """Convert a list of audio data into one AudioSegment instance.
 
-    Write the supplied list of data (probably MP3) to individual files.
-    Use the pydub library to combine them into a single AudioSegment
-    instance.
+    Decode each of the supplied list of data (probably MP3) in memory,
+    work out where to trim it, and copy the trimmed parts into a single
+    AudioSegment instance, once (see concatenate_audio()). Nothing is
+    written to /tmp, which is a small tmpfs on our units.
 
     Args:
         data: The list of MP3 data. I say 'list' because
@@ -67,39 +209,63 @@ def convert_audio_recordings_list_into_one_audio_recording(data, trim_level, suf
             The second is data[1]. You get the picture, I hope.
         trim_level: If 0, don't trim. If 1, trim. If 2, trim aggressively.
         suffix: mp3 or ogg
+        gap_ms: How many ms of silence to put between the recordings.
+        the_format (optional): The (frame rate, sample width, channels) of
+            the result, e.g. the mixer's. See concatenate_audio().
+        silences (optional): For each recording, its (leading, trailing)
+            silence at this trim level, in ms, if we know it already (see
+            my.tools.cache.trims); else, None, and I'll work it out.
 
     Returns:
         AudioSegment: An instance of an AudioSegment, ready to be exported
-            etc. via the 'export' method: AudioSegment.export
+            etc. via the 'export' method: AudioSegment.export. None, if
+            there was no data.
 
     Raises:
         Unknown.
 
     """
-    sounds = None
-    # We use MP3 here. It doesn't matter why. We delete the file in the end anyway.
-    filenames = ''
-    for d in data:
-        fname = '/tmp/{rnd}.{suffix}'.format(rnd=generate_random_string(32), suffix=suffix)
-        filenames += ' {fname}'.format(fname=fname)
-        with open(fname, 'wb') as f:
-            f.write(d)
-            untrimmed_audio = AudioSegment.from_mp3(fname) if suffix == 'mp3' \
-                            else AudioSegment.from_ogg(fname) if suffix == 'ogg' \
-                            else AudioSegment.from_file(fname)
-        trimmed_aud = trim_my_audio(untrimmed_audio, trim_level)
-        if sounds is None:
-            sounds = trimmed_aud
-        else:
-            sounds += trimmed_aud
-    if sounds is not None:
-        for fname in filenames.strip(' ').split(' '):
-            assert(fname[0] == '/')
-            os.unlink(fname)
-    return sounds
+    untrimmed_audio = [decode_audio_data(d, suffix) for d in data]
+    if untrimmed_audio == []:
+        return None
+    if silences is None:
+        silences = [None] * len(untrimmed_audio)
+    return concatenate_audio(untrimmed_audio, [trim_span(a, trim_level, s) for a, s in zip(untrimmed_audio, silences)],
+                             gap_ms=gap_ms, the_format=the_format)
+
+
+def measure_silences(audio:AudioSegment) -> dict:
+    """Measure the silence at either end of this audio, at each of the silence thresholds.
+
+    Returns:
+        dict: {'lazy': (leading, trailing), 'default': ..., 'snippy': ...}, in
+            ms, ready for my.tools.cache.trims.record_trim_offsets().
+
+    """
+    return {name: detect_silence_at_both_ends(audio, silence_threshold=threshold) for name, threshold in SILENCE_THRESHOLDS.items()}
+
 
+def trim_span(untrimmed_audio:AudioSegment, trim_level:int, silence:tuple=None) -> tuple:
+    """Work out which part of the supplied audio trim_my_audio() would keep.
 
-def trim_my_audio(untrimmed_audio:AudioSegment, trim_level:int) -> AudioSegment:
+    Args:
+        untrimmed_audio: The untrimmed audio data.
+        trim_level: How much trimming should we do?
+            0=nearly none; 1=normal; 2=aggressive.
+        silence (optional): Its (leading, trailing) silence at this trim
+            level, if we know it already. If we do, I needn't look.
+
+    Returns:
+        tuple: (start, end), in milliseconds.
+
+    """
+    if silence is None:
+        silence = detect_silence_at_both_ends(untrimmed_audio, silence_threshold=SILENCE_THRESHOLDS[silence_threshold_name(trim_level)])
+    start_trim, end_trim = silence
+    return (start_trim, len(untrimmed_audio) - end_trim)
+
+
+def trim_my_audio(untrimmed_audio:AudioSegment, trim_level:int, silence:tuple=None) -> AudioSegment:
     """Trim the suppiled audio.
 
     If there's silence at the start and/or end of the sound sample, trim it off.
@@ -108,6 +274,7 @@ def trim_my_audio(untrimmed_audio:AudioSegment, trim_level:int) -> AudioSegment:
         untrimmed_audio: The untrimmed audio data.
         trim_level: How much trimming should we do?
             0=nearly none; 1=normal; 2=aggressive.
+        silence (optional): See trim_span().
 
     Returns:
         AudioSegment: Trimmed audio.
@@ -116,21 +283,16 @@ def trim_my_audio(untrimmed_audio:AudioSegment, trim_level:int) -> AudioSegment:
         Unknown.
 
     """
-
-    silence_threshold = SNIPPY_SILENCE_THRESHOLD if trim_level > 1 else DEFAULT_SILENCE_THRESHOLD if trim_level == 0 else LAZY_SILENCE_THRESHOLD
-    start_trim = detect_leading_silence(untrimmed_audio, silence_threshold=silence_threshold)
-    end_trim = detect_leading_silence(untrimmed_audio.reverse(), silence_threshold=silence_threshold)
-    duration = len(untrimmed_audio)
-    trimmed_aud = untrimmed_audio[start_trim:duration - end_trim]
-    return trimmed_aud
+    start, end = trim_span(untrimmed_audio, trim_level, silence)
+    return untrimmed_audio[start:end]
 
 
 def convert_audio_recordings_list_into_an_mp3_file(data, exportfile:str, trim_level:int=0):
     """Convert a list of audio data into an MP3 file.
 
-    Write the supplied list of data (probably MP3 to individual files.
-    Use the pydub library to combine them into a single MP3. Save it
-    to the specified pathname.
+    Decode the supplied list of data (probably MP3) in memory. Use the
+    pydub library to combine them into a single MP3. Save it to the
+    specified pathname.
 
     Args:
         data: The list of MP3 data. I say 'list' because
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""my.tools.synthesis
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+This package contains tools for getting speech out of ElevenLabs in bulk,
+e.g. when regen_cache_for_voice.py fills a voice's cache.
+
+Modules:
+    scheduler   many synthesis requests in flight at once, rate-limited, with retries
+    planner     work out exactly what needs synthesizing, and what it'll cost, first
+    quota       a character budget, per run and per month, and what to spend it on first
+    batch       many short phrases in one request, cut apart at their timestamps
+    worker      one long-lived process, on a Python that ElevenLabs likes, for older Pythons
+    progress    rates, latencies, queue depth and ETA, as the run goes; and a JSON summary at the end
+
+.. _Style Guide:
+   https://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html
+
+"""
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Synthesize many short phrases in one request, then cut the audio apart.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Most of the cache is short phrases -- "eleven", "fifty-three?", "o'clock" --
+and, for those, most of each request is overhead: the round trip, the
+queueing, the model warming up. A BatchSynthesizer joins up to
+BATCH_MAX_PHRASES short phrases (of the same voice and settings) into one
+text, separated by BATCH_SEPARATOR, and asks ElevenLabs' with-timestamps
+endpoint for it. That endpoint says when each character starts and ends.
+So, each phrase's audio runs from its first character's start to its last
+character's end; and the cut between two phrases goes at the quietest
+moment of the gap between them (see cut_points()), so that no phrase loses
+the tail of its last syllable.
+
+The batch's audio comes back as raw PCM (BATCH_OUTPUT_FORMAT), which needs
+no decoding; each cut is encoded as an mp3 and written into the usual
+place in the cache, whence on_done (see my.tools.synthesis.scheduler) does
+the rest. A batch that ElevenLabs refuses, or whose alignment doesn't add
+up, is synthesized again, one phrase at a time; so is any phrase whose cut
+can't be encoded. ElevenLabs charges for every character of a batch,
+separators and all; on_overhead hears of whatever on_done doesn't.
+
+Note:
+    A phrase said in a batch is said between other phrases, not on its
+    own; BATCH_SEPARATOR is a paragraph break, so that each phrase keeps its
+    own intonation. Long phrases (see BATCHABLE_LENGTH) are never batched.
+
+Example:
+    $ python3
+    >>> from my.tools.synthesis.batch import BatchSynthesizer
+    >>> BatchSynthesizer(api_key=open('/home/m/.eleven_api_key').read().strip()).run(jobs)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import base64
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from pydub.audio_segment import AudioSegment
+from pydub.exceptions import CouldntEncodeError
+
+from my.classes.exceptions import ElevenLabsAPIError, ElevenLabsDownError
+from my.tools.synthesis.scheduler import RETRYABLE_HTTP_STATUSES, SynthesisScheduler
+
+BATCH_OUTPUT_FORMAT = 'pcm_44100'  # signed 16-bit little-endian mono, at this rate
+BATCH_FRAME_RATE = 44100
+BATCH_SEPARATOR = '\n\n'
+BATCH_MAX_PHRASES = 16
+BATCH_MAX_CHARACTERS = 400
+BATCHABLE_LENGTH = 40  # characters. Longer phrases are synthesized on their own.
+CUT_CHUNK_MS = 5
+CUT_MARGIN_MS = 40  # how far beyond the gap that the alignment reports a cut may go
+
+
+def batches_of(jobs:list, max_phrases:int=BATCH_MAX_PHRASES, max_characters:int=BATCH_MAX_CHARACTERS,
+               batchable_length:int=BATCHABLE_LENGTH) -> list:
+    """Group these jobs into batches: [[job, ...], ...]. Only jobs with the same voice and settings share a batch; long ones are alone."""
+    batches, open_batches = [], {}
+    for job in jobs:
+        if len(job.text) > batchable_length:
+            batches.append([job])
+            continue
+        key = (job.voice_id, json.dumps(job.settings, sort_keys=True))
+        batch = open_batches.get(key)
+        if batch is None or len(batch) >= max_phrases \
+        or sum(len(j.text) + len(BATCH_SEPARATOR) for j in batch) + len(job.text) > max_characters:
+            batch = open_batches[key] = []
+            batches.append(batch)
+        batch.append(job)
+    return batches
+
+
+def joined_text(texts:list) -> tuple:
+    """(these texts joined by BATCH_SEPARATOR, [(where each starts, where it ends), ...] in that text)"""
+    spans, pos = [], 0
+    for text in texts:
+        spans.append((pos, pos + len(text)))
+        pos += len(text) + len(BATCH_SEPARATOR)
+    return (BATCH_SEPARATOR.join(texts), spans)
+
+
+def phrase_times(alignment:dict, text:str, spans:list) -> list:
+    """[(start, end), ...] in milliseconds, of each span of text, according to the endpoint's character alignment.
+
+    Raises:
+        ValueError: The alignment isn't of this text.
+
+    """
+    characters = alignment.get('characters') or []
+    starts, ends = alignment.get('character_start_times_seconds') or [], alignment.get('character_end_times_seconds') or []
+    if ''.join(characters) != text or len(starts) != len(characters) or len(ends) != len(characters):
+        raise ValueError("The alignment is of >>>%s<<<, not of >>>%s<<<" % (''.join(characters), text))
+    times = [(int(round(starts[first] * 1000)), int(round(ends[last - 1] * 1000))) for first, last in spans]
+    if any(start > end for start, end in times) or any(times[i][1] > times[i + 1][0] for i in range(len(times) - 1)):
+        raise ValueError("The alignment of >>>%s<<< goes backwards" % text)
+    return times
+
+
+def quietest_moment(audio:AudioSegment, start:int, end:int, chunk_ms:int=CUT_CHUNK_MS) -> int:
+    """The middle of the quietest chunk of this audio between these times (in milliseconds)."""
+    if end - start < chunk_ms:
+        return (start + end) // 2
+    best, best_dbfs = (start + end) // 2, None
+    for t in range(start, end - chunk_ms + 1, chunk_ms):
+        dbfs = audio[t:t + chunk_ms].dBFS
+        if best_dbfs is None or dbfs < best_dbfs:
+            best, best_dbfs = t + chunk_ms // 2, dbfs
+    return best
+
+
+def cut_points(audio:AudioSegment, times:list, margin_ms:int=CUT_MARGIN_MS) -> list:
+    """Where to cut this audio, in milliseconds -- [0, ..., len(audio)] -- so that each phrase (see phrase_times()) gets a piece."""
+    cuts = [0]
+    for (_, end), (start, _) in zip(times[:-1], times[1:]):
+        lo, hi = max(cuts[-1], end - margin_ms), min(len(audio), start + margin_ms)
+        cuts.append(quietest_moment(audio, lo, hi) if lo < hi else (end + start) // 2)
+    return cuts + [len(audio)]
+
+
+def split_batch(audio:AudioSegment, alignment:dict, texts:list) -> list:
+    """Cut a batch's audio into one AudioSegment per text.
+
+    Raises:
+        ValueError: The alignment doesn't fit.
+
+    """
+    text, spans = joined_text(texts)
+    cuts = cut_points(audio, phrase_times(alignment, text, spans))
+    return [audio[cuts[i]:cuts[i + 1]] for i in range(len(texts))]
+
+
+class BatchSynthesizer(SynthesisScheduler):
+    """A SynthesisScheduler that sends short phrases in batches. See SynthesisScheduler for the other args.
+
+    Args:
+        on_overhead (optional): Called, as on_overhead(n), after each batch
+            that ElevenLabs said, with how many of the characters sent are
+            not in a phrase that on_done heard of: the separators; and, if
+            the batch was done again one phrase at a time, the whole of it
+            (or of the phrases that were). e.g. CharacterBudget.spend
+
+    """
+
+    def __init__(self, *args, on_overhead=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_overhead = on_overhead
+
+    def generate_batch(self, jobs:list) -> tuple:
+        """Make one request for these jobs' audio, with timestamps.
+
+        Returns:
+            tuple: (the audio, the character alignment)
+
+        Raises:
+            ElevenLabsDownError: As SynthesisScheduler.generate().
+            ElevenLabsAPIError: As SynthesisScheduler.generate().
+
+        """
+        text, _ = joined_text([job.text for job in jobs])
+        body = dict(jobs[0].request_body(), text=text)
+        url = '%s/v1/text-to-speech/%s/with-timestamps' % (self.base_url, jobs[0].voice_id)
+        try:
+            response = self.post(url, accept='application/json', params={'output_format': BATCH_OUTPUT_FORMAT}, json=body)
+        except requests.RequestException as e:
+            raise ElevenLabsDownError("Unable to access the ElevenLabs engine. Check your Internet connection.") from e
+        if response.status_code in RETRYABLE_HTTP_STATUSES:
+            raise ElevenLabsDownError("ElevenLabs said %d when asked for a batch of %d phrases" % (response.status_code, len(jobs)))
+        try:
+            result = response.json()
+            data = base64.b64decode(result['audio_base64'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ElevenLabsAPIError("Unable to retrieve a batch of %d phrases from the ElevenLabs engine (%d). Did you pay your subscription?"
+                                     % (len(jobs), response.status_code)) from e
+        if response.status_code != 200 or len(data) == 0:
+            raise ElevenLabsAPIError("Unable to retrieve a batch of %d phrases from the ElevenLabs engine (%d). Did you pay your subscription?"
+                                     % (len(jobs), response.status_code))
+        audio = AudioSegment(data=data[:len(data) // 2 * 2], sample_width=2, frame_rate=BATCH_FRAME_RATE, channels=1)
+        return (audio, result.get('alignment') or {})
+
+    def encode(self, audio:AudioSegment) -> bytes:
+        """One phrase's cut, as the mp3 that goes in the cache."""
+        buf = io.BytesIO()
+        audio.export(buf, format='mp3', bitrate='128k')
+        return buf.getvalue()
+
+    def synthesize_batch(self, jobs:list) -> list:
+        """Do these jobs in one request, if they'll go; else, one at a time. Never raises."""
+        if len(jobs) == 1:
+            return [self.synthesize(jobs[0])]
+        result = self.attempt(jobs, lambda: self.generate_batch(jobs), give_up_on=(ElevenLabsAPIError,))
+        if result is None and not isinstance(jobs[0].error, ElevenLabsAPIError):
+            return jobs  # ElevenLabs is down. One at a time would fare no better.
+        text, _ = joined_text([job.text for job in jobs])
+        pieces = [None] * len(jobs)
+        try:
+            if result is None:
+                raise ValueError(str(jobs[0].error))  # e.g. the endpoint, or the batch, was refused
+            pieces = split_batch(result[0], result[1], [job.text for job in jobs])
+        except ValueError as e:
+            print("Unable to synthesize a batch of %d phrases (%s). I'll do them one at a time." % (len(jobs), str(e)))
+        charged = 0  # ...by on_done, of what was sent in the batch
+        for job, piece in zip(jobs, pieces):
+            data = None
+            if piece is not None:
+                try:
+                    data = self.encode(piece)
+                except (CouldntEncodeError, OSError) as e:
+                    print("Unable to encode >>>%s<<< from its batch (%s). I'll synthesize it on its own." % (job.text, str(e)))
+            if data is None:
+                job.attempts = 0
+                self.synthesize(job)
+            else:
+                self.finish(job, data)
+                charged += len(job.text)
+        if result is not None and self.on_overhead is not None:
+            self.on_overhead(len(text) - charged)
+        return jobs
+
+    def run(self, jobs:list) -> list:
+        """Do all these jobs, in batches, several batches at once; and return them (in the same order) when they're all finished or have failed."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(self.synthesize_batch, batches_of(jobs)))
+        return jobs
+
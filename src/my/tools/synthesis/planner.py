@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Work out exactly what needs synthesizing, before synthesizing anything.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+regen_cache_for_voice.py used to walk every smart sentence -- every hello
+template, at each of six times of day, with each of four endings -- and ask,
+of each phrase in each one, "is this cached?" 'Good morning' was asked about
+dozens of times per voice. Now, the sentences are expanded into a
+deduplicated list of atomic phrases once (see atomic_phrases()); each voice's
+cache is checked against that list once (see plan_synthesis()); and the
+resulting SynthesisPlan says exactly what will be sent to ElevenLabs, and
+how many characters (i.e. how much of the quota) it will cost, before any of
+it is.
+
+Example:
+    $ python3
+    >>> from my.tools.synthesis.planner import atomic_phrases, plan_synthesis
+    >>> phrases = atomic_phrases(['Good morning, Charlie', 'Good morning'], split=lambda s: [s])
+    >>> plan = plan_synthesis('Freya', phrases, is_cached=lambda p: p == 'good morning')
+    >>> plan.report()
+    Freya: 1 of 2 phrases to synthesize (21 characters)
+        good morning, charlie (21)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+
+class SynthesisPlan:
+    """What one voice needs synthesized.
+
+    Attributes:
+        voice (str): e.g. Freya
+        wanted (list[str]): Every phrase that the voice should have.
+        missing (list[str]): Those that aren't cached.
+        stale (list[str]): Those that are cached, but were synthesized with
+            other settings than today's (see my.tools.cache.store).
+        settings (dict): The settings to synthesize them with.
+        deferred (list[str]): Those missing or stale phrases that won't be
+            synthesized this time, for want of budget (see defer_beyond()).
+
+    """
+
+    def __init__(self, voice:str, wanted:list, missing:list, stale:list, settings:dict=None):
+        self.voice = voice
+        self.wanted = wanted
+        self.missing = missing
+        self.stale = stale
+        self.settings = settings
+        self.deferred = []
+        self._key = None
+
+    def __len__(self) -> int:
+        return len(self.missing) + len(self.stale)
+
+    @property
+    def work(self) -> list:
+        """The phrases to synthesize, missing and stale, sorted (by priority, if prioritize() was called)."""
+        return sorted(self.missing + self.stale, key=self._key)
+
+    def prioritize(self, key):
+        """Do the work in this order, e.g. my.tools.synthesis.quota.priority_key()."""
+        self._key = key
+
+    def defer_beyond(self, characters:int) -> list:
+        """Keep as much of the work, in order, as costs no more than this many characters; defer the rest.
+
+        Returns:
+            list[str]: The phrases deferred.
+
+        """
+        kept, spent = set(), 0
+        for phrase in self.work:
+            if spent + len(phrase) > characters:
+                break
+            kept.add(phrase)
+            spent += len(phrase)
+        deferred = [p for p in self.work if p not in kept]
+        self.missing = [p for p in self.missing if p in kept]
+        self.stale = [p for p in self.stale if p in kept]
+        self.deferred += deferred
+        return deferred
+
+    @property
+    def characters(self) -> int:
+        """How many characters of text the work will send to ElevenLabs."""
+        return sum(len(p) for p in self.work)
+
+    def report(self, verbose:bool=True):
+        """Print the plan: a summary and (if verbose) every phrase, with its length."""
+        print("{voice}: {n} of {total} phrases to synthesize ({chars} characters){stale}".format(
+            voice=self.voice, n=len(self), total=len(self.wanted), chars=self.characters,
+            stale='' if self.stale == [] else '; %d of them stale' % len(self.stale)))
+        if self.deferred != []:
+            print("    ...and {n} more ({chars} characters) deferred, for want of budget".format(
+                n=len(self.deferred), chars=sum(len(p) for p in self.deferred)))
+        if verbose:
+            for phrase in self.work:
+                print("    %s (%d)%s" % (phrase, len(phrase), ' [stale]' if phrase in self.stale else ''))
+
+
+def atomic_phrases(sentences:list, split) -> list:
+    """Expand these sentences into the phrases (i.e. the cached clips) that they're made of: lowercased, deduplicated and sorted.
+
+    Args:
+        sentences: e.g. smart sentences with ${owner} filled in.
+        split: e.g. my.text2speech.list_phrases_to_handle
+
+    """
+    return sorted(set(p.lower() for s in sentences for p in split(s)))
+
+
+def plan_synthesis(voice:str, phrases:list, is_cached, is_stale=None, settings:dict=None) -> SynthesisPlan:
+    """Check each phrase against the cache, once, and say what needs synthesizing.
+
+    Args:
+        voice: e.g. Freya
+        phrases: e.g. from atomic_phrases()
+        is_cached: is_cached(phrase) is True if the voice has it, in full.
+        is_stale (optional): is_stale(phrase) is True if a cached phrase
+            needs making again.
+        settings (optional): Kept with the plan, for whoever executes it.
+
+    """
+    missing, stale = [], []
+    for phrase in phrases:
+        if not is_cached(phrase):
+            missing.append(phrase)
+        elif is_stale is not None and is_stale(phrase):
+            stale.append(phrase)
+    return SynthesisPlan(voice, list(phrases), missing, stale, settings)
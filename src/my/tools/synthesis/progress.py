@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Say how fast a regeneration run is going, and, at the end, how it went.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+regen_cache_for_voice.py says a great deal about each phrase, and nothing
+about the run: how many phrases a second it's doing, how long ElevenLabs
+takes to answer, whether the mp3-to-ogg conversions are keeping up, or when
+it will be done. A RegenProgress keeps count, per voice, of:
+    phrases and characters done (and so, per second), and bytes written
+    each request's latency (and so, its 50th, 90th and 99th percentiles)
+    how many clips are being converted at this moment (the transcode queue)
+    how many phrases failed
+and prints one line -- every PROGRESS_INTERVAL seconds, at most -- such as:
+    [Freya] 120/800 phrases (15%), 3.2 phrases/s, 41 chars/s, latency p50/p90/p99 0.81/1.40/2.10s,
+    transcode queue 2 (3.1/s), 3.4 MB written, ETA 3m32s
+At the end of the run, summary() says the same of every voice, and of the
+run as a whole, as JSON (see write_summary()): sounds/cache/.regen.summary.json,
+unless regen is told otherwise. Keep a few, and compare them.
+
+Example:
+    $ python3
+    >>> from my.tools.synthesis.progress import RegenProgress
+    >>> progress = RegenProgress()
+    >>> progress.start_voice('Freya', phrases=800, characters=9600)
+    >>> progress.request_done('Freya', 0.81)
+    >>> progress.phrase_done('Freya', characters=12, nbytes=4100)
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from os.path import join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_PATH
+from my.tools.sound.pcm import pcm_pathname
+
+SUMMARY_FILENAME = '.regen.summary.json'
+PROGRESS_INTERVAL = 5.0  # seconds between progress lines, at least
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def pathname_of_summary(root:str=SOUNDS_CACHE_PATH) -> str:
+    """Where the last run's summary goes, unless regen is told otherwise."""
+    return join(root, SUMMARY_FILENAME)
+
+
+def percentile(values:list, pct:float) -> float:
+    """The pct'th percentile (nearest rank) of these values; or None, if there are none."""
+    if values == []:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+
+
+def clip_bytes(mp3fname:str) -> int:
+    """How many bytes this clip takes up in the cache: its mp3, ogg and pcm, whichever exist."""
+    total = 0
+    for fname in (mp3fname, mp3fname[:-4] + '.ogg', pcm_pathname(mp3fname)):
+        try:
+            total += os.path.getsize(fname)
+        except OSError:
+            pass
+    return total
+
+
+def duration_str(seconds:float) -> str:
+    """e.g. '3m32s'"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return '%dh%02dm' % (seconds // 3600, seconds % 3600 // 60)
+    if seconds >= 60:
+        return '%dm%02ds' % (seconds // 60, seconds % 60)
+    return '%ds' % seconds
+
+
+class VoiceProgress:
+    """How far along one voice is. See RegenProgress, which does the locking."""
+
+    def __init__(self, voice:str, phrases:int, characters:int, started:float):
+        self.voice = voice
+        self.phrases = phrases
+        self.characters = characters
+        self.started = started
+        self.finished = None
+        self.phrases_done = 0
+        self.characters_done = 0
+        self.bytes_written = 0
+        self.failures = 0
+        self.latencies = []
+        self.transcoding = 0
+        self.transcodes = 0
+        self.transcode_seconds = 0.0
+
+    def elapsed(self, now:float) -> float:
+        return max(1e-9, (self.finished if self.finished is not None else now) - self.started)
+
+    def eta(self, now:float) -> float:
+        """Seconds until the rest of this voice's characters are done, at the rate so far; or None, if there's no rate yet."""
+        if self.characters_done == 0:
+            return None
+        return max(0, self.characters - self.characters_done) * self.elapsed(now) / self.characters_done
+
+    def summary(self, now:float) -> dict:
+        elapsed = self.elapsed(now)
+        return {'voice': self.voice, 'phrases': self.phrases, 'characters': self.characters,
+                'phrases_done': self.phrases_done, 'characters_done': self.characters_done, 'failures': self.failures,
+                'bytes_written': self.bytes_written, 'seconds': round(elapsed, 3),
+                'phrases_per_second': round(self.phrases_done / elapsed, 3),
+                'characters_per_second': round(self.characters_done / elapsed, 3),
+                'requests': len(self.latencies),
+                'latency': {'p%d' % p: percentile(self.latencies, p) for p in LATENCY_PERCENTILES},
+                'transcodes': self.transcodes,
+                'transcodes_per_second': round(self.transcodes / elapsed, 3),
+                'transcode_seconds': round(self.transcode_seconds, 3)}
+
+    def line(self, now:float) -> str:
+        """One line of progress, as printed every PROGRESS_INTERVAL seconds."""
+        elapsed, eta = self.elapsed(now), self.eta(now)
+        latencies = [percentile(self.latencies, p) for p in LATENCY_PERCENTILES]
+        return ("[{voice}] {done}/{total} phrases ({pct}%), {pps:.1f} phrases/s, {cps:.0f} chars/s, "
+                "latency p50/p90/p99 {lat}, transcode queue {queue} ({tps:.1f}/s), {mb:.1f} MB written, ETA {eta}").format(
+            voice=self.voice, done=self.phrases_done, total=self.phrases,
+            pct=100 * self.phrases_done // self.phrases if self.phrases else 100,
+            pps=self.phrases_done / elapsed, cps=self.characters_done / elapsed,
+            lat='-' if latencies[0] is None else '/'.join('%1.2f' % s for s in latencies) + 's',
+            queue=self.transcoding, tps=self.transcodes / elapsed, mb=self.bytes_written / 1e6,
+            eta='done' if self.finished is not None else '?' if eta is None else duration_str(eta))
+
+
+class RegenProgress:
+    """The progress of one regeneration run, voice by voice. Thread-safe: the scheduler's worker threads report to it.
+
+    Args:
+        params (optional): What the run is for (see RegenJournal), to be
+            repeated in the summary.
+        interval: Print a progress line no more often than this, per voice.
+        clock: Where the time comes from. Tests replace it.
+        out: Where the lines go.
+
+    """
+
+    def __init__(self, params:dict=None, interval:float=PROGRESS_INTERVAL, clock=time.monotonic, out=print):
+        self.params = params
+        self.interval = interval
+        self.clock = clock
+        self.out = out
+        self.started = clock()
+        self.started_at = time.time()
+        self.voices = {}
+        self._last_line = {}
+        self._lock = Lock()
+
+    def start_voice(self, voice:str, phrases:int, characters:int):
+        """This voice has this many phrases, of so many characters in all, to do."""
+        with self._lock:
+            self.voices[voice] = VoiceProgress(voice, phrases, characters, self.clock())
+            self._last_line[voice] = self.clock()
+
+    def _voice(self, voice:str) -> VoiceProgress:
+        if voice not in self.voices:
+            self.voices[voice] = VoiceProgress(voice, 0, 0, self.clock())
+            self._last_line[voice] = self.clock()
+        return self.voices[voice]
+
+    def request_done(self, voice:str, seconds:float):
+        """One request to ElevenLabs, for this voice, took this long (whether or not it worked)."""
+        with self._lock:
+            self._voice(voice).latencies.append(seconds)
+
+    def phrase_done(self, voice:str, characters:int, nbytes:int):
+        """One phrase, of so many characters, has been cached, in files of so many bytes."""
+        with self._lock:
+            progress = self._voice(voice)
+            progress.phrases_done += 1
+            progress.characters_done += characters
+            progress.bytes_written += nbytes
+        self.report(voice)
+
+    def failed(self, voice:str, n:int=1):
+        """n of this voice's phrases couldn't be synthesized."""
+        with self._lock:
+            self._voice(voice).failures += n
+
+    @contextmanager
+    def transcoding(self, voice:str):
+        """While in here, one of this voice's clips is being converted (i.e. is in the transcode queue)."""
+        with self._lock:
+            self._voice(voice).transcoding += 1
+        start = self.clock()
+        try:
+            yield
+        finally:
+            with self._lock:
+                progress = self._voice(voice)
+                progress.transcoding -= 1
+                progress.transcodes += 1
+                progress.transcode_seconds += self.clock() - start
+
+    def finish_voice(self, voice:str):
+        """This voice is as done as it's going to get, this run. Print its last line."""
+        with self._lock:
+            self._voice(voice).finished = self.clock()
+        self.report(voice, force=True)
+
+    def report(self, voice:str, force:bool=False):
+        """Print this voice's progress line, if it's been PROGRESS_INTERVAL seconds since the last one (or if force)."""
+        with self._lock:
+            now = self.clock()
+            if not force and now - self._last_line.get(voice, now) < self.interval:
+                return
+            self._last_line[voice] = now
+            line = self._voice(voice).line(now)
+        self.out(line)
+
+    def summary(self) -> dict:
+        """The whole run, and each voice, as a dict that json.dumps() will take."""
+        with self._lock:
+            now = self.clock()
+            voices = [v.summary(now) for v in self.voices.values()]
+            latencies = [s for v in self.voices.values() for s in v.latencies]
+            elapsed = max(1e-9, now - self.started)
+        totals = {k: sum(v[k] for v in voices) for k in ('phrases', 'characters', 'phrases_done', 'characters_done', 'failures',
+                                                         'bytes_written', 'requests', 'transcodes')}
+        totals.update({'seconds': round(elapsed, 3),
+                       'phrases_per_second': round(totals['phrases_done'] / elapsed, 3),
+                       'characters_per_second': round(totals['characters_done'] / elapsed, 3),
+                       'latency': {'p%d' % p: percentile(latencies, p) for p in LATENCY_PERCENTILES}})
+        return {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)), 'params': self.params,
+                'totals': totals, 'voices': voices}
+
+    def write_summary(self, fname:str=None) -> str:
+        """Write summary() as JSON to this file (default: pathname_of_summary()), atomically. Returns the pathname."""
+        fname = pathname_of_summary() if fname is None else fname
+        os.makedirs(os.path.dirname(fname) or '.', exist_ok=True)
+        tmpfname = fname + '.tmp'
+        with open(tmpfname, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+        os.replace(tmpfname, fname)
+        return fname
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Spend no more of the ElevenLabs quota than we mean to, and spend it on what matters most.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+ElevenLabs bills by the character. A SynthesisPlan (see
+my.tools.synthesis.planner) knows how many characters it will cost; a
+CharacterBudget knows how many we may spend: SYNTHESIS_CHARACTERS_PER_RUN in
+this run, and SYNTHESIS_CHARACTERS_PER_MONTH in this calendar month, less
+what has been spent already. What has been spent is kept, month by month, in
+sounds/cache/.synthesis_usage.json.
+
+When the budget won't stretch to a whole plan, the plan is cut short (see
+SynthesisPlan.defer_beyond()) in priority order (see priority_key()): the
+vocabulary that the clock can't do without -- hours, minutes, greetings --
+first; then whatever has been played most; then the rest. So, a run that
+stops at its budget still leaves a clock that can tell the time.
+
+Example:
+    $ python3
+    >>> from my.tools.synthesis.quota import CharacterBudget
+    >>> budget = CharacterBudget(per_run=5000, per_month=30000)
+    >>> budget.remaining()
+    5000
+    >>> budget.spend(120)
+    >>> budget.remaining()
+    4880
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import json
+import os
+import time
+from os.path import join
+from threading import Lock
+
+from my.globals import SOUNDS_CACHE_PATH, SYNTHESIS_CHARACTERS_PER_MONTH, SYNTHESIS_CHARACTERS_PER_RUN
+
+USAGE_FILENAME = '.synthesis_usage.json'
+_usage_lock = Lock()
+
+
+def pathname_of_usage(root:str=SOUNDS_CACHE_PATH) -> str:
+    """Where the characters spent, month by month, are kept."""
+    return join(root, USAGE_FILENAME)
+
+
+def month_of(when:float=None) -> str:
+    """e.g. '2026-10'"""
+    return time.strftime('%Y-%m', time.localtime(time.time() if when is None else when))
+
+
+def _load_usage(root:str) -> dict:
+    try:
+        with open(pathname_of_usage(root), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def characters_used(month:str=None, root:str=SOUNDS_CACHE_PATH) -> int:
+    """How many characters were sent to ElevenLabs in this month (default: this one)."""
+    with _usage_lock:
+        return _load_usage(root).get(month_of() if month is None else month, 0)
+
+
+def record_characters(n:int, root:str=SOUNDS_CACHE_PATH, when:float=None):
+    """n characters were just sent to ElevenLabs."""
+    with _usage_lock:
+        usage = _load_usage(root)
+        usage[month_of(when)] = usage.get(month_of(when), 0) + n
+        os.makedirs(root, exist_ok=True)
+        tmpfname = pathname_of_usage(root) + '.tmp'
+        with open(tmpfname, 'w', encoding='utf-8') as f:
+            json.dump(usage, f, sort_keys=True)
+        os.replace(tmpfname, pathname_of_usage(root))
+
+
+class CharacterBudget:
+    """How many characters this run may still send to ElevenLabs. Thread-safe.
+
+    Args:
+        per_run (optional): The most that this run may send. None means no limit.
+        per_month (optional): The most that may be sent this calendar month,
+            by this run and every other. None means no limit.
+        root: The cache root, whose usage file keeps the monthly totals.
+
+    """
+
+    def __init__(self, per_run:int=SYNTHESIS_CHARACTERS_PER_RUN, per_month:int=SYNTHESIS_CHARACTERS_PER_MONTH, root:str=SOUNDS_CACHE_PATH):
+        self.per_run = per_run
+        self.per_month = per_month
+        self.root = root
+        self.spent = 0
+        self._lock = Lock()
+
+    def remaining(self) -> int:
+        """How many characters may still be sent; or None, if there's no limit."""
+        limits = []
+        with self._lock:
+            if self.per_run is not None:
+                limits.append(self.per_run - self.spent)
+        if self.per_month is not None:
+            limits.append(self.per_month - characters_used(root=self.root))
+        return None if limits == [] else max(0, min(limits))
+
+    def spend(self, n:int):
+        """n characters have just been sent."""
+        with self._lock:
+            self.spent += n
+        record_characters(n, root=self.root)
+
+    def describe(self) -> str:
+        """e.g. '4880 characters left (per run: 5000; per month: 30000, of which 120 used)'"""
+        remaining = self.remaining()
+        if remaining is None:
+            return "no character budget"
+        return "{remaining} characters left (per run: {run}; per month: {month})".format(
+            remaining=remaining, run='no limit' if self.per_run is None else self.per_run,
+            month='no limit' if self.per_month is None else '%d, of which %d used' % (self.per_month, characters_used(root=self.root)))
+
+
+def priority_key(essentials:set=frozenset(), plays:dict=None, normalize=None):
+    """A sort key for phrases: the essentials first; then the most played (plays: {phrase: how many times}); then alphabetically.
+
+    Args:
+        essentials: The phrases that come first, as normalize() gives them.
+        plays (optional): {phrase: how many times it has been played}
+        normalize (optional): What a phrase is looked up in essentials as,
+            e.g. its bare stem, so that 'seven?' counts as 'seven'.
+            Default: the phrase itself.
+
+    """
+    plays = {} if plays is None else plays
+    normalize = (lambda phrase: phrase) if normalize is None else normalize
+    return lambda phrase: (normalize(phrase) not in essentials, -plays.get(phrase, 0), phrase)
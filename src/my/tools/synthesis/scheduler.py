@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Synthesize many phrases at once, politely.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Filling a voice's cache used to mean asking ElevenLabs for one phrase,
+waiting, writing it, converting it, and only then asking for the next. Most
+of that time was spent waiting on the network. A SynthesisScheduler keeps
+several requests in flight at once (SYNTHESIS_CONCURRENCY), starts no more
+than SYNTHESIS_RATE_LIMIT of them per second, and retries, with exponential
+backoff, any that fail with ElevenLabsDownError (i.e. ElevenLabs was
+unreachable, or said one of RETRYABLE_HTTP_STATUSES). A job that fails with
+ElevenLabsAPIError (a bad key, no credit left, etc.) is not retried.
+
+Each job's mp3 is written atomically -- to a temporary file, then renamed --
+so that a crash never leaves half a clip in the cache. Whatever else has to
+happen to a finished clip (cataloging, converting to ogg, etc.) is up to the
+on_done callback, which runs on the same worker thread.
+
+The scheduler talks to ElevenLabs' REST API directly, not through the
+elevenlabs module, whose client is one voice at a time (see
+my.classes.text2speechclass). So, it can be tested against a local stub
+server: see base_url. Its requests go through my.tools.webclient, whose
+pool keeps the connections to ElevenLabs alive from one job to the next.
+
+Example:
+    $ python3
+    >>> from my.tools.synthesis.scheduler import SynthesisJob, SynthesisScheduler
+    >>> job = SynthesisJob(voice='Freya', voice_id='jsCqWAovK2LkecY7zXl4', text='good morning',
+    ...                    settings=None, outfile='sounds/cache/Freya/good_morning.mp3')
+    >>> SynthesisScheduler(api_key=open('/home/m/.eleven_api_key').read().strip()).run([job])
+    [<SynthesisJob Freya: 'good morning' => sounds/cache/Freya/good_morning.mp3 (done)>]
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname
+from threading import Lock
+
+import requests
+
+from my.classes.exceptions import ElevenLabsAPIError, ElevenLabsDownError
+from my.globals import ELEVENLABS_API_URL, ELEVENLABS_DEFAULT_MODEL, SYNTHESIS_CONCURRENCY, SYNTHESIS_RATE_LIMIT
+from my.tools import webclient
+
+SYNTHESIS_OUTPUT_FORMAT = 'mp3_44100_128'  # ...which is what the elevenlabs module asks for
+RETRYABLE_HTTP_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class SynthesisJob:
+    """One phrase, to be spoken by one voice, into one file.
+
+    Attributes:
+        voice (str): The name of the voice, e.g. Freya
+        voice_id (str): ElevenLabs' ID of that voice.
+        text (str): What it says.
+        settings (dict): The model and voice settings (see
+            _Text2SpeechClass.synthesis_settings). If they're all None (or
+            settings is None), ElevenLabs uses the voice's own.
+        outfile (str): Where the mp3 goes.
+        attempts (int): How many requests it took.
+        error (Exception): Why it failed, if it did; else None.
+
+    """
+
+    def __init__(self, voice:str, voice_id:str, text:str, settings:dict, outfile:str):
+        self.voice = voice
+        self.voice_id = voice_id
+        self.text = text
+        self.settings = settings
+        self.outfile = outfile
+        self.attempts = 0
+        self.error = None
+        self.done = False
+
+    def __repr__(self):
+        return "<SynthesisJob %s: %r => %s (%s)>" % (self.voice, self.text, self.outfile,
+                                                     'done' if self.done else 'failed' if self.error is not None else 'pending')
+
+    def request_body(self) -> dict:
+        """The JSON body of this job's request to the text-to-speech endpoint."""
+        settings = self.settings or {}
+        body = {'text': self.text, 'model_id': settings.get('model') or ELEVENLABS_DEFAULT_MODEL}
+        if settings.get('stability') is not None:
+            body['voice_settings'] = {'stability': settings['stability'], 'similarity_boost': settings['similarity'],
+                                      'style': settings['style'], 'use_speaker_boost': settings['boost']}
+        return body
+
+
+class RateLimiter:
+    """Let callers through no more often than so many times per second (spaced evenly). Thread-safe."""
+
+    def __init__(self, per_second:float):
+        self._interval = 0.0 if not per_second else 1.0 / per_second
+        self._next = 0.0
+        self._lock = Lock()
+
+    def wait(self):
+        """Block until it's my turn."""
+        with self._lock:
+            now = time.monotonic()
+            my_turn = max(now, self._next)
+            self._next = my_turn + self._interval
+        if my_turn > now:
+            time.sleep(my_turn - now)
+
+
+def write_atomically(fname:str, data:bytes):
+    """Write this file so that it's never seen half-written: to a temporary file first, then renamed into place."""
+    os.makedirs(dirname(fname) or '.', exist_ok=True)
+    tmpfname = '%s.%d.tmp' % (fname, os.getpid())
+    with open(tmpfname, 'wb') as f:
+        f.write(data)
+    os.replace(tmpfname, fname)
+
+
+class SynthesisScheduler:
+    """Run synthesis jobs on a pool of threads, with a cap on requests in flight and per second.
+
+    Args:
+        api_key: The ElevenLabs API key.
+        base_url: Where the API is. Tests point this at a stub server.
+        concurrency: How many requests may be in flight at once.
+        rate_limit: How many requests may start per second. 0 means no limit.
+        attempts: How many times to try each job before giving up on it.
+        backoff: The first retry waits this many seconds (and a bit); each
+            one after that waits twice as long as the one before.
+        timeout: How many seconds to wait for each response.
+        on_done (optional): Called, as on_done(job), on the worker thread,
+            after each job's mp3 is written.
+        on_latency (optional): Called, as on_latency(seconds), after each
+            request, whether or not it worked (see
+            my.tools.synthesis.progress).
+
+    """
+
+    def __init__(self, api_key:str, base_url:str=ELEVENLABS_API_URL, concurrency:int=SYNTHESIS_CONCURRENCY,
+                 rate_limit:float=SYNTHESIS_RATE_LIMIT, attempts:int=5, backoff:float=1.0, timeout:float=60.0, on_done=None,
+                 on_latency=None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1, not %s" % str(concurrency))
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.attempts = attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.on_done = on_done
+        self.on_latency = on_latency
+        self._limiter = RateLimiter(rate_limit)
+
+    def post(self, url:str, accept:str='audio/mpeg', **kwargs) -> requests.Response:
+        """POST to the API, on the project's shared, kept-alive connections (see my.tools.webclient)."""
+        return webclient.request('POST', url, timeout=self.timeout, headers={'xi-api-key': self.api_key, 'accept': accept}, **kwargs)
+
+    def generate(self, job:SynthesisJob) -> bytes:
+        """Make one request for this job's audio.
+
+        Raises:
+            ElevenLabsDownError: ElevenLabs is unreachable, overloaded or
+                rate-limiting us. Worth retrying.
+            ElevenLabsAPIError: ElevenLabs refused the request.
+
+        """
+        url = '%s/v1/text-to-speech/%s' % (self.base_url, job.voice_id)
+        try:
+            response = self.post(url, params={'output_format': SYNTHESIS_OUTPUT_FORMAT}, json=job.request_body())
+        except requests.RequestException as e:
+            raise ElevenLabsDownError("Unable to access the ElevenLabs engine. Check your Internet connection.") from e
+        if response.status_code in RETRYABLE_HTTP_STATUSES:
+            raise ElevenLabsDownError("ElevenLabs said %d when asked for >>>%s<<<" % (response.status_code, job.text))
+        if response.status_code != 200 or len(response.content) == 0:
+            raise ElevenLabsAPIError("Unable to retrieve audio of >>>%s<<< from the ElevenLabs engine (%d). Did you pay your subscription?"
+                                     % (job.text, response.status_code))
+        return response.content
+
+    def attempt(self, jobs:list, request, give_up_on:tuple=()):
+        """Call request() -- which asks ElevenLabs for these jobs' audio -- until it works, or until they run out of attempts.
+
+        Args:
+            jobs: The jobs whose audio request() asks for.
+            request: Makes one request.
+            give_up_on (optional): Errors that are not worth retrying, i.e.
+                that end the attempts at once.
+
+        Returns:
+            Whatever request() returned; or None, if it never worked, in
+            which case each job's error says why.
+
+        """
+        while jobs[0].attempts < self.attempts:
+            for job in jobs:
+                job.attempts += 1
+            self._limiter.wait()
+            started = time.monotonic()
+            try:
+                result = request()
+            except (ElevenLabsAPIError, ElevenLabsDownError) as e:
+                if self.on_latency is not None:
+                    self.on_latency(time.monotonic() - started)
+                for job in jobs:
+                    job.error = e
+                if isinstance(e, give_up_on):
+                    return None
+                if jobs[0].attempts < self.attempts:
+                    delay = self.backoff * 2 ** (jobs[0].attempts - 1) * (1.0 + random.random() / 2)
+                    print(">>>%s<<< audio acquisition failed (%s). Retrying in %1.1fs..." % (' | '.join(job.text for job in jobs), str(e), delay))
+                    time.sleep(delay)
+                continue
+            if self.on_latency is not None:
+                self.on_latency(time.monotonic() - started)
+            for job in jobs:
+                job.error = None
+            return result
+        return None
+
+    def finish(self, job:SynthesisJob, data:bytes) -> SynthesisJob:
+        """Write this job's mp3, mark it done, and call on_done."""
+        write_atomically(job.outfile, data)
+        job.done = True
+        if self.on_done is not None:
+            try:
+                self.on_done(job)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                job.error = e
+                job.done = False
+        return job
+
+    def synthesize(self, job:SynthesisJob) -> SynthesisJob:
+        """Do this job, retrying as need be. Never raises: a job that fails for good says why in job.error."""
+        data = self.attempt([job], lambda: self.generate(job), give_up_on=(ElevenLabsAPIError,))
+        return job if data is None else self.finish(job, data)
+
+    def run(self, jobs:list) -> list:
+        """Do all these jobs, several at once, and return them (in the same order) when they're all finished or have failed."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(self.synthesize, jobs))
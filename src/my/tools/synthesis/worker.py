@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Synthesize speech in one long-lived process on a Python that ElevenLabs' module likes.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+The elevenlabs module wants Python 3.11 or later. On anything older,
+phrase_audio() used to run ./_cachespeech.sh for every missing phrase: a new
+interpreter, which imported elevenlabs, pinged the website, built a
+Text2SpeechSingleton (two more API calls) and, finally, synthesized one
+phrase. Now, a SynthesisWorker starts that interpreter once and keeps it;
+each phrase is a job sent down its stdin, and the audio comes back up its
+stdout.
+
+The protocol is frames: a 4-byte big-endian length, then that many bytes.
+    request:  one frame of JSON, {"voice": ..., "text": ...}
+    reply:    one frame of JSON, {"ok": true, "settings": {...}}, then one
+              frame of audio (mp3); or {"ok": false, "error": ..., "kind":
+              the name of the exception, e.g. "ElevenLabsDownError"}
+A zero-length request frame asks the worker to exit.
+
+The worker only synthesizes. Writing the mp3, cataloging it, converting
+it, etc. happen in the parent, exactly as when it synthesizes for itself
+(see my.text2speech.phrase_audio()).
+
+Example:
+    $ python3.8
+    >>> from my.tools.synthesis.worker import synthesize_in_worker
+    >>> data, settings = synthesize_in_worker('Freya', 'good morning')
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import atexit
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+from threading import Lock
+
+from my.classes import exceptions
+from my.classes.exceptions import SynthesisWorkerError
+
+FRAME_HEADER_FMT = '>I'
+FRAME_HEADER_LEN = struct.calcsize(FRAME_HEADER_FMT)
+COMPATIBLE_PYTHONS = ['python3.%d' % v for v in range(15, 7, -1)]  # ...in the order in which _cachespeech.sh tries them
+_worker = None
+_worker_lock = Lock()
+
+
+def write_frame(stream, payload:bytes):
+    stream.write(struct.pack(FRAME_HEADER_FMT, len(payload)) + payload)
+    stream.flush()
+
+
+def read_frame(stream) -> bytes:
+    """The next frame's payload; or None, if the stream has ended."""
+    header = stream.read(FRAME_HEADER_LEN)
+    if len(header) < FRAME_HEADER_LEN:
+        return None
+    n = struct.unpack(FRAME_HEADER_FMT, header)[0]
+    payload = stream.read(n)
+    if len(payload) < n:
+        return None
+    return payload
+
+
+def serve(instream, outstream, synthesize):
+    """Answer jobs until told to stop, or until instream ends. synthesize(voice, text) returns (audio, settings)."""
+    while True:
+        request = read_frame(instream)
+        if not request:
+            return
+        job = json.loads(request)
+        try:
+            data, settings = synthesize(job['voice'], job['text'])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            write_frame(outstream, json.dumps({'ok': False, 'error': str(e), 'kind': type(e).__name__}).encode('utf-8'))
+        else:
+            write_frame(outstream, json.dumps({'ok': True, 'settings': settings}).encode('utf-8'))
+            write_frame(outstream, data)
+
+
+def serve_stdio(synthesize):
+    """Serve on stdin and stdout. Anything else that would be printed to stdout -- e.g. by my.text2speech, on import -- goes to stderr instead."""
+    outstream = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    serve(sys.stdin.buffer, outstream, synthesize)
+
+
+def compatible_interpreter() -> str:
+    """The first of COMPATIBLE_PYTHONS that's installed.
+
+    Raises:
+        SynthesisWorkerError: None of them is.
+
+    """
+    for python in COMPATIBLE_PYTHONS:
+        if shutil.which(python) is not None:
+            return python
+    raise SynthesisWorkerError("I could not find a compatible python3 interpreter for the synthesis worker")
+
+
+class SynthesisWorker:
+    """A worker process, started on first use, and restarted (once per job) if it dies. Thread-safe: one job at a time.
+
+    Args:
+        command (optional): How to start it. Default: run this module on
+            compatible_interpreter().
+
+    """
+
+    def __init__(self, command:list=None):
+        self.command = command
+        self._process = None
+        self._lock = Lock()
+
+    def _start(self):
+        command = self.command or [compatible_interpreter(), '-m', 'my.tools.synthesis.worker']
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)  # pylint: disable=consider-using-with
+        except OSError as e:
+            raise SynthesisWorkerError("Unable to start the synthesis worker (%s)" % ' '.join(command)) from e
+
+    def _ask(self, request:bytes) -> tuple:
+        write_frame(self._process.stdin, request)
+        reply = read_frame(self._process.stdout)
+        if reply is None:
+            raise BrokenPipeError("The synthesis worker hung up")
+        reply = json.loads(reply)
+        if not reply['ok']:
+            kind = getattr(exceptions, reply.get('kind', ''), None)  # ...e.g. ElevenLabsDownError, so that callers can tell
+            raise (kind if isinstance(kind, type) and issubclass(kind, exceptions.Error) else SynthesisWorkerError)(reply['error'])
+        data = read_frame(self._process.stdout)
+        if data is None:
+            raise BrokenPipeError("The synthesis worker hung up")
+        return (data, reply['settings'])
+
+    def synthesize(self, voice:str, text:str) -> tuple:
+        """Have the worker synthesize this text in this voice.
+
+        Returns:
+            tuple: (the mp3, the settings that it was synthesized with)
+
+        Raises:
+            SynthesisWorkerError: The worker couldn't be started, or died twice.
+            ElevenLabsAPIError, ElevenLabsDownError, etc.: As the worker raised them.
+
+        """
+        request = json.dumps({'voice': voice, 'text': text}).encode('utf-8')
+        with self._lock:
+            for attempt in (1, 2):
+                if self._process is None or self._process.poll() is not None:
+                    self._start()
+                try:
+                    return self._ask(request)
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    self._stop()
+                    if attempt == 2:
+                        raise SynthesisWorkerError("The synthesis worker died while saying >>>%s<<<" % text) from e
+        raise SystemError("You should never get here.")
+
+    def _stop(self):
+        if self._process is not None:
+            try:
+                write_frame(self._process.stdin, b'')
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+            for stream in (self._process.stdin, self._process.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            self._process = None
+
+    def close(self):
+        """Tell the worker to exit, and wait for it."""
+        with self._lock:
+            self._stop()
+
+
+def synthesize_in_worker(voice:str, text:str) -> tuple:
+    """Synthesize this text with the shared worker, starting it if need be. See SynthesisWorker.synthesize()."""
+    global _worker  # pylint: disable=global-statement
+    with _worker_lock:
+        if _worker is None:
+            _worker = SynthesisWorker()
+            atexit.register(_worker.close)
+    return _worker.synthesize(voice, text)
+
+
+def _synthesize_with_elevenlabs(voice:str, text:str) -> tuple:
+    from my.text2speech import Text2SpeechSingleton  # pylint: disable=import-outside-toplevel
+    if Text2SpeechSingleton is None:
+        raise exceptions.ElevenLabsMissingKeyError("The synthesis worker can't reach ElevenLabs: no key, or we're offline")
+    Text2SpeechSingleton.voice = voice
+    return (Text2SpeechSingleton.audio(text), Text2SpeechSingleton.synthesis_settings)
+
+
+if __name__ == '__main__':
+    serve_stdio(_synthesize_with_elevenlabs)
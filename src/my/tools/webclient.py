@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""One HTTP transport for the whole project: pooled, kept alive, and polite to each host.
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+Every refresh of the ZenQuotes quote used to open (and close) a new
+connection, and so did every phrase that regen synthesized: a DNS lookup, a
+TCP handshake and a TLS handshake, per request. Now, everything that talks
+HTTP goes through here:
+    request()              ...the shared requests.Session, whose pool keeps
+                           up to HTTP_POOL_SIZE connections to each host
+                           alive between requests; used by
+                           my.stringutils.get_random_zenquote() and by
+                           my.tools.synthesis.scheduler.
+    shared_httpx_client()  ...the shared httpx.Client, which the elevenlabs
+                           module's client is built on (see
+                           my.classes.text2speechclass). It speaks HTTP/2,
+                           if the h2 module is installed; else, HTTP/1.1
+                           with keep-alive.
+
+Each host may have no more than so many requests in flight at once, across
+every thread: HTTP_HOST_CONCURRENCY[host], else
+HTTP_DEFAULT_HOST_CONCURRENCY. A request that would exceed that waits its
+turn. Each request that doesn't say otherwise times out after
+HTTP_CONNECT_TIMEOUT seconds (connecting) and HTTP_READ_TIMEOUT seconds
+(waiting for each read).
+
+Note:
+    requests can't do HTTP/2, and the scheduler needs nothing but requests;
+    so, only the elevenlabs module's client gets it.
+
+Example:
+    $ python3
+    >>> from my.tools.webclient import request
+    >>> request('GET', 'https://zenquotes.io/api/random').json()[0]['q']
+    'Be the change that you wish to see in the world.'
+
+.. _Google Python Style Guide:
+   http://google.github.io/styleguide/pyguide.html
+
+"""
+
+import importlib.util
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from my.globals import (ELEVENLABS_API_URL, HTTP_CONNECT_TIMEOUT, HTTP_DEFAULT_HOST_CONCURRENCY, HTTP_HOST_CONCURRENCY,
+                        HTTP_POOL_SIZE, HTTP_READ_TIMEOUT)
+
+_session = None
+_session_lock = Lock()
+_httpx_client = None
+_httpx_client_lock = Lock()
+_host_limits = {}
+_host_limits_lock = Lock()
+
+
+def default_timeout() -> tuple:
+    """(connect, read) timeouts, in seconds, for requests that don't name their own."""
+    return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+def host_concurrency(host:str) -> int:
+    """How many requests this host may have in flight at once."""
+    return HTTP_HOST_CONCURRENCY.get(host, HTTP_DEFAULT_HOST_CONCURRENCY)
+
+
+def host_limit(host:str) -> BoundedSemaphore:
+    """The semaphore that each request to this host holds while it's in flight."""
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = BoundedSemaphore(host_concurrency(host))
+        return _host_limits[host]
+
+
+def shared_session() -> requests.Session:
+    """The requests.Session that everyone shares. Its connection pools are thread-safe; its headers are nobody's (pass them per request)."""
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=len(HTTP_HOST_CONCURRENCY) + 4, pool_maxsize=HTTP_POOL_SIZE)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def request(method:str, url:str, timeout=None, **kwargs) -> requests.Response:
+    """Make this request on the shared session, waiting for the host's turn if need be.
+
+    Args:
+        method: e.g. 'GET'
+        url: e.g. 'https://zenquotes.io/api/random'
+        timeout (optional): As requests takes it. Default: default_timeout().
+        kwargs: Anything else that requests.Session.request() takes, e.g.
+            params, json, headers.
+
+    Returns:
+        requests.Response: The response, whose content has been read (so
+            that its connection is back in the pool).
+
+    Raises:
+        requests.RequestException: As requests raises it.
+
+    """
+    with host_limit(urlsplit(url).hostname):
+        response = shared_session().request(method, url, timeout=default_timeout() if timeout is None else timeout, **kwargs)
+        _ = response.content
+    return response
+
+
+def http2_available() -> bool:
+    """True iff httpx can speak HTTP/2 here, i.e. iff the h2 module is installed."""
+    return importlib.util.find_spec('h2') is not None
+
+
+def shared_httpx_client():
+    """The httpx.Client that everyone shares, for the elevenlabs module's client.
+
+    Its pool may hold as many connections as ELEVENLABS_API_URL's host may
+    have requests in flight (see host_concurrency()), since that's the only
+    host that it talks to.
+
+    Raises:
+        ImportError: httpx isn't installed. (The elevenlabs module needs it,
+            so this won't happen wherever the elevenlabs module works.)
+
+    """
+    global _httpx_client  # pylint: disable=global-statement
+    import httpx  # pylint: disable=import-outside-toplevel
+    with _httpx_client_lock:
+        if _httpx_client is None:
+            max_connections = host_concurrency(urlsplit(ELEVENLABS_API_URL).hostname)
+            _httpx_client = httpx.Client(http2=http2_available(),
+                                         timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                                         limits=httpx.Limits(max_connections=max_connections,
+                                                             max_keepalive_connections=min(max_connections, HTTP_POOL_SIZE)))
+        return _httpx_client
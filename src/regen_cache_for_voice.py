@@ -12,6 +12,68 @@ apologies, hours, minutes, days, etc.
 
 The audio files are saved in ./sounds/cache/{voice name}/
 
+Usage:
+    python3 regen_cache_for_voice.py [--pcm] [--budget=BYTES] [--jobs=N] [--characters=N] [--batch] [--full] [--prune] [--summary=PATH] [voice name]
+    python3 regen_cache_for_voice.py --missing [voice name]
+    python3 regen_cache_for_voice.py --plan [--characters=N] [voice name]
+    python3 regen_cache_for_voice.py --status
+
+With --pcm, each ogg file is also pre-decoded into a .pcm file (see
+my.tools.sound.pcm), so that playback need not decode anything. With
+--missing, nothing is generated: the cache catalog (see
+my.tools.cache.catalog) is asked which phrases each voice still lacks.
+
+Before anything else, the alarm and fart sounds are converted and trimmed, on
+every core; any whose outputs are already up to date are skipped (see
+my.tools.sound.transcode), so that, on a re-run, this takes next to no time.
+
+Then, every smart sentence -- every template, time of day and ending -- is
+expanded into one deduplicated list of phrases, and each voice's cache is
+checked against it, once (see my.tools.synthesis.planner). The resulting
+plan -- every phrase to be synthesized, and its length in characters -- is
+printed. With --plan, that's all. Otherwise, the phrases are synthesized N
+at a time (see my.tools.synthesis.scheduler): --jobs=N, or else
+SYNTHESIS_CONCURRENCY. With --batch, short phrases are sent to ElevenLabs
+several to a request, and the audio is cut apart at the boundaries that it
+reports (see my.tools.synthesis.batch).
+
+No more than --characters=N (or SYNTHESIS_CHARACTERS_PER_RUN) characters are
+sent to ElevenLabs per run, nor more than SYNTHESIS_CHARACTERS_PER_MONTH per
+month (see my.tools.synthesis.quota). The most-played voices go first; within
+each, the clock's essentials -- hours, minutes, greetings -- then the
+most-played phrases. When the budget runs out, the rest is deferred to the
+next run, and the clock can still tell the time. Voices in
+REGEN_SKIPPED_VOICES are skipped unless named.
+
+Only what changed is made again. After each voice is done, a fingerprint of
+the template lists in my.consts, and of OWNER_NAME, is kept, along with the
+phrases that they came to (see my.tools.cache.fingerprint). Next time, only
+the phrases that have been added since, those whose clips have gone missing
+(e.g. evicted or deleted), and those whose clips were made with other
+synthesis settings than today's (every phrase is checked for both), are
+synthesized; with --prune, those that have been removed are forgotten. With
+--full, every phrase is checked against the cache, as if there were no
+fingerprint.
+
+Each run keeps a journal of what it has done (see my.tools.cache.journal).
+If a run dies part-way, the next one -- with the same arguments -- carries on
+where it stopped: finished voices are skipped, and so are finished phrases.
+With --status, nothing is done: the journal says how far along each voice
+is. ElevenLabs is not asked anything.
+
+While each voice is being synthesized, a line every few seconds says how
+it's going: phrases and characters per second, ElevenLabs' latency (50th,
+90th and 99th percentiles), how many clips are being converted, bytes
+written, and when it'll be done (see my.tools.synthesis.progress). At the
+end, the same figures, for each voice and for the run, are written as JSON
+to --summary=PATH, or else to sounds/cache/.regen.summary.json; so, runs
+can be compared.
+
+Afterwards, the cache is trimmed to its budget (see my.tools.cache.budget):
+--budget=BYTES, or else SOUNDS_CACHE_BUDGET. If a voice name was given, that
+voice's essentials are kept; else, the most-played voice's. Nothing that this
+run synthesized is evicted.
+
 Todo:
     * For module TODOs
     * You have to also use ``sphinx.ext.todo`` extension
@@ -21,14 +83,36 @@ Todo:
 
 """
 
+import sys
+if __name__ == '__main__' and '--status' in sys.argv[1:]:  # ...before my.text2speech, which would contact ElevenLabs
+    from my.tools.cache.journal import report_status
+    sys.exit(report_status())
+
+import hashlib
 from my.consts import OWNER_NAME, alarm_messages_lst, postsnooze_alrm_msgs_lst, hours_lst, minutes_lst, hello_owner_lst, \
     wannasnooze_msgs_lst, farting_msgs_lst, motivational_comments_lst
-from my.text2speech import look_for_dupes, deliberately_cache_a_smart_sentence, smart_phrase_audio
+from my.text2speech import deliberately_cache_a_smart_sentence, keep_cache_within_budget, list_phrases_to_handle, smart_phrase_audio, \
+    check_that_files_are_mp3_and_ogg, forget_phrase, plan_synthesis_for_voice, synthesis_priority, synthesize_plan
 from my.text2speech import Text2SpeechSingleton as tts
-from my.globals import SOUNDS_ALARMS_PATH, SOUNDS_FARTS_PATH, TRIMMED_ALARMS_PATH
-from my.tools.sound import mp3_to_ogg_conversions, generate_trimmed_alarm_sounds
-import sys
-from my.stringutils import generate_detokenized_message
+from my.globals import SOUNDS_ALARMS_PATH, SOUNDS_FARTS_PATH, TRIMMED_ALARMS_PATH, SYNTHESIS_CONCURRENCY, REGEN_SKIPPED_VOICES, \
+    SYNTHESIS_CHARACTERS_PER_RUN
+from my.tools.sound import mp3_to_ogg_conversions, generate_trimmed_alarm_sounds, measure_missing_trims
+from my.tools.sound.pcm import ogg_to_pcm_conversions
+from my.tools.cache.catalog import catalog_of_root
+from my.tools.cache.fingerprint import changed_templates, diff_phrases, fingerprint_of_templates, last_run_of_voice, record_run_of_voice
+from my.tools.cache.janitor import sweep_cache
+from my.tools.cache.journal import RegenJournal
+from my.tools.cache.store import collect_garbage, dedupe_directory
+from my.tools.sound.pcm import pcm_pathname
+from my.tools.synthesis.planner import atomic_phrases
+from my.tools.synthesis.progress import RegenProgress, clip_bytes
+from my.tools.synthesis.quota import CharacterBudget
+from my.stringutils import generate_detokenized_message, pathname_of_phrase_audio
+
+TEMPLATE_LISTS = {'alarm_messages_lst': alarm_messages_lst, 'postsnooze_alrm_msgs_lst': postsnooze_alrm_msgs_lst,
+                  'hours_lst': hours_lst, 'minutes_lst': minutes_lst, 'hello_owner_lst': hello_owner_lst,
+                  'wannasnooze_msgs_lst': wannasnooze_msgs_lst, 'farting_msgs_lst': farting_msgs_lst,
+                  'motivational_comments_lst': motivational_comments_lst}  # ...which the fingerprint (see my.tools.cache.fingerprint) is of
 
 
 def cache_and_check_smart_sentence(voice:str, smart_phrase:str, owner:str):
@@ -45,19 +129,18 @@ def cache_and_check_smart_sentence(voice:str, smart_phrase:str, owner:str):
         https://www.python.org/dev/peps/pep-0484/
 
     """
-    look_for_dupes()
     deliberately_cache_a_smart_sentence(voice, smart_phrase.replace('${owner}', owner))
     for suffix in ('mp3', 'ogg'):
-        look_for_dupes()
 #        try:
         _ = smart_phrase_audio(voice=voice, smart_phrase=smart_phrase, owner=owner, suffix=suffix)
         # except CouldntDecodeError as e:
         #     raise CouldntDecodeError("Unable to cache the %s of >>>%s<<<" % (suffix, smart_phrase)) from e
-        look_for_dupes()
 
 
-def cache_and_check_list_of_smart_sentences(voice:str, lst, owner:str, do_punctuation=True):
+def smart_sentences_of_list(lst, owner:str, do_punctuation=True) -> list:
+    """The smart sentences that cache_and_check_list_of_smart_sentences() would cache: with ${owner} filled in, and (if do_punctuation) with each ending."""
     pronounceable_punctuation = '?!,.'
+    sentences = []
     for smart_phrase in lst:
         assert(not smart_phrase.endswith(' '))
         if len(smart_phrase) == 0:
@@ -65,61 +148,200 @@ def cache_and_check_list_of_smart_sentences(voice:str, lst, owner:str, do_punctu
         else:
             smart_phrase = smart_phrase.replace('${owner}', owner)
             if not do_punctuation:
-                cache_and_check_smart_sentence(voice=voice, smart_phrase=smart_phrase, owner=owner)
+                sentences.append(smart_phrase)
             else:
                 if smart_phrase[-1] in pronounceable_punctuation and not smart_phrase.endswith('.m.'):
                     smart_phrase = smart_phrase[:-1]
-                cache_and_check_smart_sentence(voice, smart_phrase, owner)
+                sentences.append(smart_phrase)
                 for extra_char in pronounceable_punctuation:
-                    cache_and_check_smart_sentence(voice, smart_phrase=smart_phrase + extra_char, owner=owner)
+                    sentences.append(smart_phrase + extra_char)
+    return sentences
 
 
-def cache_phrases_for_voice(voice:str, owner:str):
+def cache_and_check_list_of_smart_sentences(voice:str, lst, owner:str, do_punctuation=True):
+    for smart_phrase in smart_sentences_of_list(lst, owner, do_punctuation):
+        cache_and_check_smart_sentence(voice=voice, smart_phrase=smart_phrase, owner=owner)
+
+
+def smart_sentences_for_voice(owner:str) -> list:
+    """Every smart sentence that we cache for each voice, in the order in which we cache them."""
+    sentences = smart_sentences_of_list(motivational_comments_lst, owner, do_punctuation=False) \
+        + smart_sentences_of_list(farting_msgs_lst, owner, do_punctuation=False) \
+        + smart_sentences_of_list(wannasnooze_msgs_lst, owner, do_punctuation=False)
     # Cache the most common "HELLO OWNER" messages
     for time_24h in (0, 4, 8, 12, 16, 20):
-        cache_and_check_list_of_smart_sentences(voice=voice, owner=owner, lst=[
+        sentences += smart_sentences_of_list([
              generate_detokenized_message(owner=owner, time_24h=time_24h, time_minutes=0, message_template=m) for m in hello_owner_lst
-             ])
-    cache_and_check_smart_sentence(voice=voice, smart_phrase=owner, owner=owner)
-    cache_and_check_list_of_smart_sentences(voice, hello_owner_lst, owner, do_punctuation=False)
-    cache_and_check_list_of_smart_sentences(voice, ["Good morning, %s" % owner,
-                                                       "Good afternoon, %s" % owner,
-                                                       "Good evening, %s" % owner,
-                                                       ], owner)
-    cache_and_check_list_of_smart_sentences(voice, ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], owner=owner)
-    cache_and_check_list_of_smart_sentences(voice, ["o'clock", "A.M.", "P.M.",
-                                                       "twelve newn",
-                                                       "twelve newn", "twelve midnight",
-                                                       "12 newn", "12 midnight",
-                                                       "time", 'date',
-                                                       "morning", "afternoon", "evening",
-                                                       "good morning", "good afternoon", "good evening",
-                                                       "midnight", "hours", "minutes", "in the afternoon", "in the morning",
-                                                       "in the evening", ], owner=owner)
-    cache_and_check_list_of_smart_sentences(voice, postsnooze_alrm_msgs_lst, owner=owner, do_punctuation=False)
-    cache_and_check_list_of_smart_sentences(voice, alarm_messages_lst, owner=owner, do_punctuation=False)
-    cache_and_check_list_of_smart_sentences(voice, hours_lst, owner=owner)
-    cache_and_check_list_of_smart_sentences(voice, minutes_lst, owner=owner)
-    cache_and_check_list_of_smart_sentences(voice, farting_msgs_lst, owner, do_punctuation=False)
+             ], owner)
+    sentences.append(owner)
+    sentences += smart_sentences_of_list(hello_owner_lst, owner, do_punctuation=False)
+    sentences += smart_sentences_of_list(["Good morning, %s" % owner,
+                                          "Good afternoon, %s" % owner,
+                                          "Good evening, %s" % owner,
+                                          ], owner)
+    sentences += smart_sentences_of_list(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], owner)
+    sentences += smart_sentences_of_list(["o'clock", "A.M.", "P.M.",
+                                          "twelve newn",
+                                          "twelve newn", "twelve midnight",
+                                          "12 newn", "12 midnight",
+                                          "time", 'date',
+                                          "morning", "afternoon", "evening",
+                                          "good morning", "good afternoon", "good evening",
+                                          "midnight", "hours", "minutes", "in the afternoon", "in the morning",
+                                          "in the evening", ], owner)
+    sentences += smart_sentences_of_list(postsnooze_alrm_msgs_lst, owner, do_punctuation=False)
+    sentences += smart_sentences_of_list(alarm_messages_lst, owner, do_punctuation=False)
+    sentences += smart_sentences_of_list(hours_lst, owner)
+    sentences += smart_sentences_of_list(minutes_lst, owner)
+    return sentences
+
+
+def phrases_for_voice(owner:str) -> list:
+    """Every phrase (i.e. every cached clip) that the smart sentences for each voice are made of."""
+    return atomic_phrases(smart_sentences_for_voice(owner), split=list_phrases_to_handle)
+
+
+def cache_phrases_for_voice(voice:str, owner:str):
+    for smart_phrase in smart_sentences_for_voice(owner):
+        cache_and_check_smart_sentence(voice=voice, smart_phrase=smart_phrase, owner=owner)
 
 
 import os
 from os import listdir
 from os.path import isfile, join
 
+def report_missing_phrases(voices:list, owner:str) -> int:
+    """Say which phrases each of these voices lacks, according to the cache catalog, without generating anything.
+
+    Returns:
+        int: How many phrases are missing, in all.
+
+    """
+    catalog = catalog_of_root()
+    phrases = phrases_for_voice(owner)
+    total = 0
+    for voice in voices:
+        catalog.sync_directory(voice)  # ...in case anything was cached before the catalog was
+        missing = catalog.missing(voice, phrases)
+        print("%s is missing %d of %d phrases%s" % (voice, len(missing), len(phrases), '' if missing == [] else ': ' + ', '.join(missing)))
+        total += len(missing)
+    return total
+
+
+def voices_to_regenerate(args:list) -> list:
+    """The voice named in args; or else every voice but REGEN_SKIPPED_VOICES, the most played first."""
+    if len(args) > 0:
+        return [args[0]]
+    plays = catalog_of_root().plays(by='voice')
+    return sorted([v for v in tts.all_voices if v not in REGEN_SKIPPED_VOICES], key=lambda v: -(plays.get(v) or 0))
+
+
 if __name__ == '__main__':
+    characters = ([int(a.split('=', 1)[1]) for a in sys.argv[1:] if a.startswith('--characters=')] + [SYNTHESIS_CHARACTERS_PER_RUN])[0]
+    if '--missing' in sys.argv[1:]:
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        sys.exit(0 if report_missing_phrases([args[0]] if len(args) > 0 else tts.all_voices, OWNER_NAME) == 0 else 1)
+    if '--plan' in sys.argv[1:]:
+        args = [a for a in sys.argv[1:] if not a.startswith('--')]
+        all_phrases = phrases_for_voice(OWNER_NAME)
+        character_budget = CharacterBudget(per_run=characters)
+        remaining, priority = character_budget.remaining(), synthesis_priority(OWNER_NAME)
+        plans = [plan_synthesis_for_voice(v, all_phrases) for v in voices_to_regenerate(args)]
+        for plan in plans:
+            plan.prioritize(priority)
+            if remaining is not None:
+                plan.defer_beyond(remaining)
+                remaining -= plan.characters
+            plan.report()
+        print("In all: {n} phrases, {chars} characters; {budget}".format(n=sum(len(p) for p in plans), chars=sum(p.characters for p in plans),
+                                                                          budget=character_budget.describe()))
+        sys.exit(0)
     mp3_to_ogg_conversions(SOUNDS_ALARMS_PATH)
     generate_trimmed_alarm_sounds(SOUNDS_ALARMS_PATH, TRIMMED_ALARMS_PATH, trim_level=3)
     mp3_to_ogg_conversions(SOUNDS_FARTS_PATH)
-    the_voices_i_care_about = (sys.argv[1],) if len(sys.argv) > 1 else tts.all_voices  # [:20]
+    do_pcm = '--pcm' in sys.argv[1:]
+    do_full = '--full' in sys.argv[1:]
+    do_prune = '--prune' in sys.argv[1:]
+    do_batch = '--batch' in sys.argv[1:]
+    budget = ([int(a.split('=', 1)[1]) for a in sys.argv[1:] if a.startswith('--budget=')] + [None])[0]
+    concurrency = ([int(a.split('=', 1)[1]) for a in sys.argv[1:] if a.startswith('--jobs=')] + [SYNTHESIS_CONCURRENCY])[0]
+    summary_fname = ([a.split('=', 1)[1] for a in sys.argv[1:] if a.startswith('--summary=')] + [None])[0]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    the_voices_i_care_about = voices_to_regenerate(args)
+    character_budget = CharacterBudget(per_run=characters)
+    print("Character budget:", character_budget.describe())
+    priority = synthesis_priority(OWNER_NAME)
+    sweep_cache(voices=None if len(args) == 0 else list(the_voices_i_care_about))  # Once per run, not once per phrase
+    all_phrases = phrases_for_voice(OWNER_NAME)  # Once per run, not once per voice
+    formats = ['mp3', 'ogg'] + (['pcm'] if do_pcm else [])
+    params = {'owner': OWNER_NAME, 'voices': list(the_voices_i_care_about), 'formats': formats,
+              'phrases': hashlib.sha256('\n'.join(all_phrases).encode('utf-8')).hexdigest()}
+    journal = RegenJournal(params, {v: len(all_phrases) * len(formats) for v in the_voices_i_care_about})
+    progress = RegenProgress(dict(params, concurrency=concurrency, batch=do_batch, characters=characters))
+    if journal.resumed:
+        print("Resuming the last run, which didn't finish")
+    fingerprint = fingerprint_of_templates(TEMPLATE_LISTS, OWNER_NAME)
+    made = {}  # {voice: [phrase, ...]} synthesized by this run, which the cache budget mustn't evict
     for my_voice in the_voices_i_care_about:
-        print("Working on", my_voice)
-        if my_voice == 'Brian':
-            print("Nope. Brian sucks.")
+        if journal.is_voice_done(my_voice):
+            print("Skipping", my_voice, "-- done already")
             continue
-        cache_and_check_list_of_smart_sentences(voice=my_voice, owner=OWNER_NAME, lst=motivational_comments_lst, do_punctuation=False)
-        cache_and_check_list_of_smart_sentences(voice=my_voice, owner=OWNER_NAME, lst=farting_msgs_lst, do_punctuation=False)
-        cache_and_check_list_of_smart_sentences(voice=my_voice, owner=OWNER_NAME, lst=wannasnooze_msgs_lst, do_punctuation=False)
-        cache_phrases_for_voice(my_voice, OWNER_NAME)  # ...which generates mp3 and ogg files
+        print("Working on", my_voice)
+        last_run = None if do_full else last_run_of_voice(my_voice)
+        wanted = all_phrases
+        if last_run is not None:
+            wanted, removed = diff_phrases(last_run['phrases'], all_phrases)
+            unchanged = plan_synthesis_for_voice(my_voice, sorted(set(all_phrases) - set(wanted)))  # ...whose clips may since have gone or gone stale
+            print(("Since {voice}'s last run, {changed} changed: {added} phrases added, {removed} removed, {missing} gone missing, "
+                   "{stale} made with other settings").format(
+                voice=my_voice, changed=', '.join(changed_templates(last_run, fingerprint)) or 'nothing',
+                added=len(wanted), removed=len(removed), missing=len(unchanged.missing), stale=len(unchanged.stale)))
+            wanted = wanted + unchanged.missing + unchanged.stale
+            journal.mark_done(my_voice, sorted(set(all_phrases) - set(wanted)), ('mp3', 'ogg'))  # ...last time
+            if do_prune:
+                for phrase in removed:
+                    forget_phrase(my_voice, phrase)
+        phrases = [p for p in wanted if not journal.is_done(my_voice, p, 'ogg')]
+        plan = plan_synthesis_for_voice(my_voice, phrases)
+        plan.prioritize(priority)
+        if character_budget.remaining() is not None:
+            plan.defer_beyond(character_budget.remaining())
+        plan.report()
+        progress.start_voice(my_voice, len(plan.work), plan.characters)
+        journal.mark_done(my_voice, sorted(set(phrases) - set(plan.work)), ('mp3', 'ogg'))  # ...which were cached already
+        phrase_of_mp3 = {pathname_of_phrase_audio(my_voice, p, suffix='mp3'): p for p in plan.work}
+        made[my_voice] = list(plan.work)
+        synthesize_plan(plan, concurrency=concurrency, budget=character_budget, batch=do_batch, progress=progress,
+                        on_done=lambda job: journal.mark_done(job.voice, [phrase_of_mp3[job.outfile]], ('mp3', 'ogg')))
+        for phrase in plan.work:  # Check what we just made -- and make, one at a time, whatever the above couldn't
+            try:
+                check_that_files_are_mp3_and_ogg(my_voice, phrase)
+            except SystemError:
+                remaining = character_budget.remaining()
+                if remaining is not None and len(phrase) > remaining:
+                    plan.deferred.append(phrase)  # ...and so, not done
+                    continue
+                deliberately_cache_a_smart_sentence(my_voice, phrase)
+                character_budget.spend(len(phrase))
+                progress.phrase_done(my_voice, len(phrase), clip_bytes(pathname_of_phrase_audio(my_voice, phrase, suffix='mp3')))
+            journal.mark_done(my_voice, [phrase], ('mp3', 'ogg'))
+        measure_missing_trims(pathname_of_phrase_audio(my_voice))  # ...for clips cached before we kept track of their silences
+        if do_pcm:
+            print("Pre-decoding", my_voice, "into PCM")
+            ogg_to_pcm_conversions(pathname_of_phrase_audio(my_voice))
+            journal.mark_done(my_voice, [p for p in all_phrases if os.path.exists(pcm_pathname(pathname_of_phrase_audio(my_voice, p, suffix='ogg')))], ('pcm',))
+        interned, freed = dedupe_directory(pathname_of_phrase_audio(my_voice))
+        print("Stored {interned} of {voice}'s clips by their contents, freeing {freed} bytes".format(interned=interned, voice=my_voice, freed=freed))
+        progress.finish_voice(my_voice)
+        if plan.deferred != []:
+            print("Out of character budget: {n} of {voice}'s phrases will have to wait for the next run".format(n=len(plan.deferred), voice=my_voice))
+            continue  # ...so that neither the journal nor the fingerprint says that the voice is done
+        journal.mark_voice_done(my_voice)
+        record_run_of_voice(my_voice, fingerprint, all_phrases)
+    keep_cache_within_budget(args[0] if len(args) > 0 else (the_voices_i_care_about + [None])[0],  # ...else, the most played
+                             OWNER_NAME, budget=budget, made=made, sync=True)
+    print("Collected {freed} bytes of garbage from the store".format(freed=collect_garbage()))
+    journal.finish()
+    print("Summary of this run:", progress.write_summary(summary_fname))
     sys.exit(0)
 
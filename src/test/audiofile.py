@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""test.audiofile
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.globals import SOUNDS_CACHE_PATH
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.tools.sound import audio_file_exists, forget_audio_file
+
+from scratch import ScratchDirectory
+
+
+class TestAudioFileExists(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cwd = os.getcwd()
+        os.chdir(self.root)  # ...since SOUNDS_CACHE_PATH is relative
+        self.fname = os.path.join(SOUNDS_CACHE_PATH, 'Laura', 'good_morning.ogg')
+        os.makedirs(os.path.dirname(self.fname))
+
+    def tearDown(self):
+        phrase_index.forget()
+        os.chdir(self.cwd)
+        super().tearDown()
+
+    def testWrittenElsewhere(self):
+        self.assertFalse(audio_file_exists(self.fname))  # ...and now the index has the listing
+        self.write(self.fname, b'OggS')  # ...by another process, say
+        self.assertTrue(audio_file_exists(self.fname))
+        self.assertTrue(phrase_index.exists(self.fname))
+
+    def testFailedOpen(self):
+        self.write(self.fname, b'OggS')
+        self.assertTrue(audio_file_exists(self.fname))
+        os.unlink(self.fname)  # ...by an eviction in another process, say
+        forget_audio_file(self.fname)
+        self.assertFalse(phrase_index.exists(self.fname))
+        self.assertFalse(audio_file_exists(self.fname))
+
+    def testNotCached(self):
+        fname = self.write('alarms/beep.ogg', b'OggS')
+        self.assertTrue(audio_file_exists(fname))
+        os.unlink(fname)
+        self.assertFalse(audio_file_exists(fname))
+        self.assertNotIn(os.path.normpath(os.path.dirname(fname)), phrase_index.directories)
+
+
+if __name__ == "__main__":
+    unittest.main()
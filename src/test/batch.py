@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""test.batch
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import base64
+import json
+import math
+import os
+import struct
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pydub.exceptions import CouldntEncodeError
+
+from my.tools.synthesis.batch import BATCH_FRAME_RATE, BATCH_SEPARATOR, BatchSynthesizer, batches_of, split_batch
+from my.tools.synthesis.scheduler import SynthesisJob
+
+from scratch import ScratchDirectory
+
+CHARACTER_MS = 40  # how long the fake endpoint takes to say a character
+SEPARATOR_MS = 150  # ...or a separator, which it says as silence
+
+
+def fake_speech(text):
+    """(PCM, alignment) of this text, as the with-timestamps endpoint would return them: a tone per character; silence per separator."""
+    samples, starts, ends, t = [], [], [], 0
+    for c in text:
+        ms = SEPARATOR_MS if c in BATCH_SEPARATOR else CHARACTER_MS
+        n = BATCH_FRAME_RATE * ms // 1000
+        amplitude = 0 if c in BATCH_SEPARATOR else 8000
+        samples += [int(amplitude * math.sin(2 * math.pi * 440 * i / BATCH_FRAME_RATE)) for i in range(n)]
+        starts.append(t / 1000.0)
+        t += ms
+        ends.append(t / 1000.0)
+    return (struct.pack('<%dh' % len(samples), *samples),
+            {'characters': list(text), 'character_start_times_seconds': starts, 'character_end_times_seconds': ends})
+
+
+class FakeElevenLabs(BaseHTTPRequestHandler):
+    """Imitates POST /v1/text-to-speech/{voice_id}[/with-timestamps], offline."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.requests.append((self.path.split('?')[0], body['text']))
+        if self.path.split('?')[0].endswith('/with-timestamps') and self.server.refuse:
+            self.send_response(422)  # ...which is no use retrying
+            data = json.dumps({'detail': {'status': 'invalid_request'}}).encode()
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.path.split('?')[0].endswith('/with-timestamps'):
+            pcm, alignment = fake_speech(body['text'])
+            if self.server.misalign:
+                alignment['characters'] = alignment['characters'][1:]
+            data = json.dumps({'audio_base64': base64.b64encode(pcm).decode('ascii'), 'alignment': alignment}).encode()
+        else:
+            data = b'ID3' + body['text'].encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class RawBatchSynthesizer(BatchSynthesizer):
+    """...which writes each cut as raw PCM, because there's no mp3 encoder here."""
+
+    def encode(self, audio):
+        return audio.raw_data
+
+
+class FussyBatchSynthesizer(RawBatchSynthesizer):
+    """...which can't encode its second cut."""
+
+    encoded = 0
+
+    def encode(self, audio):
+        self.encoded += 1
+        if self.encoded == 2:
+            raise CouldntEncodeError("Encoding failed")
+        return super().encode(audio)
+
+
+class TestBatch(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeElevenLabs)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.misalign = False
+        self.server.refuse = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def jobs(self, texts, settings=None):
+        return [SynthesisJob('Freya', 'abc123', text, settings, os.path.join(self.root, 'Freya', '%s.mp3' % text.replace(' ', '_')))
+                for text in texts]
+
+    def testBatchesOf(self):
+        jobs = self.jobs(['one', 'two', 'a rather longer phrase than we would batch, surely', 'three', 'four', 'five'])
+        jobs[4].settings = {'stability': 0.3}
+        batches = batches_of(jobs, max_phrases=2)
+        self.assertEqual([[j.text for j in b] for b in batches],
+                         [['one', 'two'], ['a rather longer phrase than we would batch, surely'], ['three', 'five'], ['four']])
+
+    def testSplit(self):
+        from pydub.audio_segment import AudioSegment
+        texts = ['eleven', "o'clock", 'fifty-three?']
+        pcm, alignment = fake_speech(BATCH_SEPARATOR.join(texts))
+        audio = AudioSegment(data=pcm, sample_width=2, frame_rate=BATCH_FRAME_RATE, channels=1)
+        pieces = split_batch(audio, alignment, texts)
+        self.assertEqual(sum(len(p) for p in pieces), len(audio))
+        for text, piece in zip(texts, pieces):
+            self.assertGreaterEqual(len(piece), len(text) * CHARACTER_MS)  # ...none of it lost
+            self.assertLessEqual(len(piece), len(text) * CHARACTER_MS + 2 * len(BATCH_SEPARATOR) * SEPARATOR_MS)
+        with self.assertRaises(ValueError):
+            split_batch(audio, alignment, texts[:2])
+
+    def testRun(self):
+        done, overhead = [], []
+        jobs = RawBatchSynthesizer('sekrit', base_url=self.url, concurrency=2, rate_limit=0, on_done=done.append,
+                                   on_overhead=overhead.append).run(self.jobs(['eleven', 'twelve', "o'clock"]))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual(len(done), 3)
+        self.assertEqual(overhead, [2 * len(BATCH_SEPARATOR)])
+        self.assertEqual(self.server.requests, [('/v1/text-to-speech/abc123/with-timestamps', BATCH_SEPARATOR.join(['eleven', 'twelve', "o'clock"]))])
+        for job in jobs:
+            self.assertGreaterEqual(os.path.getsize(job.outfile) // 2, len(job.text) * CHARACTER_MS * BATCH_FRAME_RATE // 1000)
+
+    def testMisaligned(self):
+        self.server.misalign = True
+        overhead = []
+        jobs = RawBatchSynthesizer('sekrit', base_url=self.url, concurrency=1, rate_limit=0, on_overhead=overhead.append).run(
+            self.jobs(['eleven', 'twelve']))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual(overhead, [len('eleven' + BATCH_SEPARATOR + 'twelve')])  # ...all of it wasted
+        self.assertEqual([p for p, _ in self.server.requests],
+                         ['/v1/text-to-speech/abc123/with-timestamps', '/v1/text-to-speech/abc123', '/v1/text-to-speech/abc123'])
+        with open(jobs[0].outfile, 'rb') as f:
+            self.assertEqual(f.read(), b'ID3eleven')
+
+    def testRefused(self):
+        self.server.refuse = True
+        overhead = []
+        jobs = RawBatchSynthesizer('sekrit', base_url=self.url, concurrency=1, rate_limit=0, backoff=0,
+                                   on_overhead=overhead.append).run(self.jobs(['eleven', 'twelve']))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual([p for p, _ in self.server.requests],  # ...at once: not after five tries
+                         ['/v1/text-to-speech/abc123/with-timestamps', '/v1/text-to-speech/abc123', '/v1/text-to-speech/abc123'])
+        self.assertEqual(overhead, [])  # It wasn't said; so, it isn't charged.
+
+    def testUnencodable(self):
+        done, overhead = [], []
+        jobs = FussyBatchSynthesizer('sekrit', base_url=self.url, concurrency=1, rate_limit=0, on_done=done.append,
+                                     on_overhead=overhead.append).run(self.jobs(['eleven', 'twelve', "o'clock"]))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual(len(done), 3)
+        self.assertEqual([p for p, _ in self.server.requests], ['/v1/text-to-speech/abc123/with-timestamps', '/v1/text-to-speech/abc123'])
+        self.assertEqual(self.server.requests[1][1], 'twelve')
+        with open(jobs[1].outfile, 'rb') as f:
+            self.assertEqual(f.read(), b'ID3twelve')
+        self.assertEqual(overhead, [2 * len(BATCH_SEPARATOR) + len('twelve')])
+
+
+if __name__ == "__main__":
+    unittest.main()
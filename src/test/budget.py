@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""test.budget
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache import budget
+from my.tools.cache.budget import bare_stem, enforce_budget, flush_plays, note_played
+from my.tools.cache.catalog import catalog_of_root, forget_catalog
+from my.tools.cache.store import dedupe_directory, pathname_of_store
+
+from scratch import ScratchDirectory
+
+
+class TestBudget(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for voice in ('Freya', 'Brian'):
+            os.mkdir(os.path.join(self.root, voice))
+            for stem in ('seven', 'seven?', 'good_morning', 'wake_up'):
+                for codec in ('mp3', 'ogg'):
+                    self.write(self.fname(voice, stem, codec), b'\x00' * 100)
+        self.catalog = catalog_of_root(self.root)
+        for voice in ('Freya', 'Brian'):
+            self.catalog.sync_directory(voice)
+
+    def tearDown(self):
+        budget._plays.clear()
+        forget_catalog(self.root)
+        super().tearDown()
+
+    def fname(self, voice, stem, codec='ogg'):
+        return os.path.join(self.root, voice, '%s.%s' % (stem, codec))
+
+    def testBareStem(self):
+        self.assertEqual(bare_stem('good_morning,_charlie&.ogg'), 'good_morning,_charlie')
+        self.assertEqual(bare_stem('seven?.mp3'), 'seven')
+
+    def testPlays(self):
+        note_played([self.fname('Freya', 'wake_up'), self.fname('Freya', 'wake_up')])
+        self.assertEqual(self.catalog.clip(self.fname('Freya', 'wake_up'))['plays'], 0)  # ...not yet
+        flush_plays()
+        clip = self.catalog.clip(self.fname('Freya', 'wake_up'))
+        self.assertEqual(clip['plays'], 2)
+        self.assertIsNotNone(clip['last_played'])
+
+    def testEvictOtherVoicesFirst(self):
+        note_played([self.fname('Brian', 'wake_up')])
+        self.assertEqual(enforce_budget(budget=1200, active_voice='Freya', root=self.root, verbose=False), (2, 400))
+        self.assertTrue(os.path.exists(self.fname('Brian', 'wake_up')))  # ...because it was played
+        self.assertTrue(all(os.path.exists(self.fname('Freya', s, c)) for s in ('seven', 'seven?', 'good_morning', 'wake_up') for c in ('mp3', 'ogg')))
+        self.assertEqual(sum(n for n, _ in self.catalog.totals().values()), 12)
+
+    def testPinned(self):
+        enforce_budget(budget=0, active_voice='Freya', pinned={'seven'}, root=self.root, verbose=False)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, 'Freya'))), ['.trims.json', 'seven.mp3', 'seven.ogg', 'seven?.mp3', 'seven?.ogg'])
+        self.assertEqual(os.listdir(os.path.join(self.root, 'Brian')), ['.trims.json'])
+
+    def testExempt(self):
+        enforce_budget(budget=0, active_voice=None, exempt={('Brian', 'seven?'), ('Freya', 'wake_up')}, root=self.root, verbose=False)
+        self.assertTrue(all(os.path.exists(self.fname(v, s, c)) for v, s in (('Brian', 'seven?'), ('Freya', 'wake_up')) for c in ('mp3', 'ogg')))
+        self.assertEqual(sum(n for n, _ in self.catalog.totals().values()), 4)
+
+    def testDeduped(self):
+        for voice in ('Freya', 'Brian'):
+            dedupe_directory(os.path.join(self.root, voice), self.root)  # Every clip has the same contents: one blob per codec.
+        self.assertEqual(enforce_budget(budget=200, active_voice='Freya', root=self.root, verbose=False), (0, 0))
+        self.assertEqual(enforce_budget(budget=50, active_voice='Freya', pinned={'seven'}, root=self.root, verbose=False), (6, 0))
+        blobs = [f for d in os.listdir(pathname_of_store(self.root)) for f in os.listdir(os.path.join(pathname_of_store(self.root), d))]
+        self.assertEqual(len(blobs), 2)  # ...which the pinned clips still share
+        self.assertEqual(enforce_budget(budget=50, active_voice='Brian', root=self.root, verbose=False), (2, 200))
+        self.assertEqual([f for d in os.listdir(pathname_of_store(self.root)) for f in os.listdir(os.path.join(pathname_of_store(self.root), d))], [])
+
+    def testCatalogOnly(self):
+        stray = self.write(self.fname('Brian', 'stray'), b'\x00' * 100)  # ...which the catalog hasn't been told of
+        enforce_budget(budget=0, active_voice='Freya', root=self.root, verbose=False)
+        self.assertTrue(os.path.exists(stray))
+        enforce_budget(budget=0, active_voice='Freya', root=self.root, verbose=False, sync=True)
+        self.assertFalse(os.path.exists(stray))
+
+    def testDryRun(self):
+        self.assertEqual(enforce_budget(budget=0, active_voice='Freya', root=self.root, dry_run=True, verbose=False), (8, 1600))
+        self.assertEqual(len(os.listdir(os.path.join(self.root, 'Brian'))), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""test.bundle
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache.bundle import build_bundle, bundle_of_directory, drop_bundle, pathname_of_bundle, PhraseBundle
+
+from scratch import ScratchDirectory
+
+
+class TestBundle(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.contents = {'good_morning.ogg': b'OggS' + b'\x00' * 60, 'charlie.mp3': b'ID3' + b'\x01' * 30, 'notes.txt': b'ignore me'}
+        for fname, data in self.contents.items():
+            self.write(fname, data)
+
+    def tearDown(self):
+        try:
+            os.unlink(pathname_of_bundle(self.root))
+        except FileNotFoundError:
+            pass
+        super().tearDown()
+
+    def testNoBundle(self):
+        self.assertIsNone(bundle_of_directory(self.root))
+
+    def testGoofy(self):
+        self.write(pathname_of_bundle(self.root), b'Not a bundle at all')
+        self.assertRaises(ValueError, PhraseBundle, pathname_of_bundle(self.root))
+        self.assertIsNone(bundle_of_directory(self.root))  # i.e. use the loose files
+
+    def testEmptyBundle(self):
+        self.write(pathname_of_bundle(self.root))
+        self.assertIsNone(bundle_of_directory(self.root))
+
+    def touch(self):
+        """Move the directory's mtime on, as a write into it would, in case the clock is coarse."""
+        then = os.stat(self.root).st_mtime_ns + 10 ** 9
+        os.utime(self.root, ns=(then, then))
+
+    def testOtherWrites(self):
+        build_bundle(self.root, with_durations=False)
+        self.write('hello.ogg', b'OggS' + b'\x02' * 40)  # ...not in the bundle: served loose
+        self.write('good_morning.pcm', b'PCM1')
+        self.write('.trims.json', b'{}')
+        self.touch()
+        self.assertIn('good_morning.ogg', bundle_of_directory(self.root))
+
+    def testStaleBundle(self):
+        build_bundle(self.root, with_durations=False)
+        self.assertIsNotNone(bundle_of_directory(self.root))
+        fname = self.write('good_morning.ogg', b'OggS' + b'\x02' * 40)
+        then = os.stat(fname).st_mtime_ns + 10 ** 9
+        os.utime(fname, ns=(then, then))
+        self.touch()
+        self.assertIsNone(bundle_of_directory(self.root))
+        build_bundle(self.root, with_durations=False)
+        self.assertEqual(bundle_of_directory(self.root).read('good_morning.ogg'), b'OggS' + b'\x02' * 40)
+        os.unlink(os.path.join(self.root, 'charlie.mp3'))
+        self.touch()
+        self.assertIsNone(bundle_of_directory(self.root))
+
+    def testRoundTrip(self):
+        build_bundle(self.root, with_durations=False)
+        b = bundle_of_directory(self.root)
+        self.assertEqual(b.filenames(), {'good_morning.ogg', 'charlie.mp3'})
+        for fname in b.filenames():
+            self.assertEqual(b.read(fname), self.contents[fname])
+            self.assertEqual(bytes(b.view(fname)), self.contents[fname])
+            self.assertEqual(b.entry(fname)[2], fname.split('.')[-1])
+        self.assertNotIn('notes.txt', b)
+
+    def testDropBundle(self):
+        build_bundle(self.root, with_durations=False)
+        self.assertIsNotNone(bundle_of_directory(self.root))
+        self.assertTrue(drop_bundle(self.root))
+        self.assertFalse(os.path.exists(pathname_of_bundle(self.root)))
+        self.assertIsNone(bundle_of_directory(self.root))
+        self.assertFalse(drop_bundle(self.root))
+
+
+if __name__ == "__main__":
+    # import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""test.catalog
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache.catalog import CacheCatalog, phrase_of_filename
+
+from scratch import ScratchDirectory
+
+
+class FakeAudio:
+
+    frame_rate = 44100
+    dBFS = -20.5
+
+    def __len__(self):
+        return 1500
+
+
+class TestCatalog(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.root, 'Freya'))
+        self.catalog = CacheCatalog(self.root)
+
+    def tearDown(self):
+        self.catalog.close()
+        super().tearDown()
+
+    def testPhraseOfFilename(self):
+        self.assertEqual(phrase_of_filename('good_morning^.ogg'), 'good morning.')
+        self.assertEqual(phrase_of_filename('wake_up&.mp3'), 'wake up!')
+
+    def testRecord(self):
+        fname = self.write(os.path.join('Freya', 'good_morning.mp3'), b'ID3' + b'\x00' * 40)
+        self.catalog.record(fname, phrase='good morning', settings={'model': 'eleven_multilingual_v2', 'stability': 0.3})
+        self.catalog.record(fname, audio=FakeAudio(), silences={'lazy': (0, 30)})
+        clip = self.catalog.clip(fname)
+        self.assertEqual(clip['phrase'], 'good morning')
+        self.assertEqual(clip['model'], 'eleven_multilingual_v2')
+        self.assertEqual(clip['duration'], 1.5)
+        self.assertEqual((clip['lead_lazy'], clip['trail_lazy']), (0, 30))
+        self.assertEqual(self.catalog.lookup('Freya', 'Good Morning', 'mp3'), fname)
+        self.write(os.path.join('Freya', 'good_morning.mp3'), b'ID3' + b'\x01' * 50)
+        self.catalog.record(fname)
+        self.assertIsNone(self.catalog.duration(fname))  # new contents, so the old duration no longer applies
+        self.assertEqual(self.catalog.clip(fname)['model'], 'eleven_multilingual_v2')
+
+    def testStale(self):
+        fname = self.write(os.path.join('Freya', 'good_morning.mp3'), b'ID3' + b'\x00' * 40)
+        self.catalog.record(fname, phrase='good morning')
+        self.assertFalse(self.catalog.is_stale(fname, 'abc'))  # ...because we don't know
+        self.catalog.record(fname, synthesis_key='abc')
+        self.assertFalse(self.catalog.is_stale(fname, 'abc'))
+        self.assertTrue(self.catalog.is_stale(fname, 'def'))
+
+    def testPlays(self):
+        for filename in ('hello.mp3', 'hello.ogg', 'bye.ogg'):
+            self.catalog.record(self.write(os.path.join('Freya', filename), b'OggS'), phrase=filename.split('.')[0])
+        self.catalog.record_plays({os.path.join(self.root, 'Freya', 'hello.mp3'): (2, 100.0),
+                                   os.path.join(self.root, 'Freya', 'hello.ogg'): (3, 200.0)})
+        self.assertEqual(self.catalog.plays(), {'hello': 5, 'bye': 0})
+        self.assertEqual(self.catalog.plays(by='voice'), {'Freya': 5})
+        with self.assertRaises(ValueError):
+            self.catalog.plays(by='filename')
+
+    def testMissing(self):
+        for filename in ('hello.mp3', 'hello.ogg', 'bye.mp3'):
+            self.write(os.path.join('Freya', filename), b'OggS')
+        self.assertEqual(self.catalog.sync_directory('Freya'), (3, 0))
+        self.assertEqual(self.catalog.missing('Freya', ['Hello', 'bye', 'what']), ['bye', 'what'])
+        self.assertEqual(self.catalog.missing('Freya', ['Hello', 'bye'], codecs=('mp3',)), [])
+        os.unlink(os.path.join(self.root, 'Freya', 'hello.ogg'))
+        self.assertEqual(self.catalog.sync_directory('Freya'), (0, 1))
+        self.catalog.rename(os.path.join(self.root, 'Freya', 'bye.mp3'), os.path.join(self.root, 'Freya', 'bye.ogg'))
+        self.assertEqual(self.catalog.missing('Freya', ['hello', 'bye'], codecs=('ogg',)), ['hello'])
+        self.assertEqual(self.catalog.totals(), {'Freya': (2, 8)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""test.completion
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import threading
+import time
+import unittest
+
+from my.tools.sound.completion import playback_stopped, wait_for_playback
+
+
+class FakeChannel:
+    """Busy for so many seconds after it's played; counts how often it's asked."""
+
+    def __init__(self, seconds):
+        self.ends = time.monotonic() + seconds
+        self.asked = 0
+
+    def get_busy(self):
+        self.asked += 1
+        return time.monotonic() < self.ends
+
+
+class TestCompletion(unittest.TestCase):
+
+    def testWaits(self):
+        chan = FakeChannel(0.3)
+        t, cpu = time.monotonic(), time.process_time()
+        self.assertTrue(wait_for_playback(chan.get_busy))
+        self.assertGreaterEqual(time.monotonic() - t, 0.3)
+        self.assertLess(time.process_time() - cpu, 0.1)  # ...asleep, not spinning
+        self.assertLess(chan.asked, 30)
+
+    def testLength(self):
+        chan = FakeChannel(0.25)
+        self.assertTrue(wait_for_playback(chan.get_busy, length=0.2))
+        self.assertLessEqual(chan.asked, 5)  # ...not until the sound should have ended
+
+    def testStopped(self):
+        chan = FakeChannel(10.0)
+        threading.Timer(0.1, playback_stopped).start()
+        t = time.monotonic()
+        self.assertFalse(wait_for_playback(chan.get_busy, length=5.0))
+        self.assertLess(time.monotonic() - t, 1.0)
+        self.assertTrue(wait_for_playback(FakeChannel(0.05).get_busy))  # ...and the next sound is waited for as usual
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""test.fingerprint
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import unittest
+
+from my.tools.cache.fingerprint import changed_templates, diff_phrases, fingerprint_of_templates, last_run_of_voice, record_run_of_voice
+
+from scratch import ScratchDirectory
+
+
+class TestFingerprint(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.templates = {'hello_owner_lst': ['Hello, ${owner}', 'Hi'], 'hours_lst': ['one', 'two']}
+
+    def testChanged(self):
+        old = fingerprint_of_templates(self.templates, 'Charlie')
+        self.assertEqual(changed_templates(old, fingerprint_of_templates(self.templates, 'Charlie')), [])
+        self.assertEqual(changed_templates(old, fingerprint_of_templates(dict(self.templates, hours_lst=['one']), 'Charlie')), ['hours_lst'])
+        self.assertEqual(changed_templates(old, fingerprint_of_templates(self.templates, 'Liam')), ['OWNER_NAME'])
+        self.assertEqual(changed_templates(None, old), ['hello_owner_lst', 'hours_lst', 'OWNER_NAME'])
+
+    def testDiff(self):
+        self.assertEqual(diff_phrases(['hello', 'one', 'two'], ['hello', 'one', 'three']), (['three'], ['two']))
+
+    def testRoundTrip(self):
+        self.assertIsNone(last_run_of_voice('Freya', root=self.root))
+        fingerprint = fingerprint_of_templates(self.templates, 'Charlie')
+        record_run_of_voice('Freya', fingerprint, ['two', 'one'], root=self.root)
+        record_run_of_voice('Liam', fingerprint, ['one'], root=self.root)
+        last_run = last_run_of_voice('Freya', root=self.root)
+        self.assertEqual(last_run['phrases'], ['one', 'two'])
+        self.assertEqual(changed_templates(last_run, fingerprint), [])
+        self.assertEqual(last_run_of_voice('Liam', root=self.root)['phrases'], ['one'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""test.journal
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import unittest
+
+from my.tools.cache.journal import RegenJournal, journal_status, pathname_of_journal, report_status
+
+from scratch import ScratchDirectory
+
+
+class TestJournal(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.params = {'owner': 'Charlie', 'voices': ['Freya', 'Liam'], 'formats': ['mp3', 'ogg'], 'phrases': 'abc'}
+        self.totals = {'Freya': 6, 'Liam': 6}
+
+    def journal(self, params=None):
+        return RegenJournal(self.params if params is None else params, self.totals, root=self.root)
+
+    def testResume(self):
+        journal = self.journal()
+        self.assertFalse(journal.resumed)
+        journal.mark_done('Freya', ['hello', 'seven'], ('mp3', 'ogg'))
+        journal.mark_voice_done('Liam')
+        del journal  # ...as if killed
+        journal = self.journal()
+        self.assertTrue(journal.resumed)
+        self.assertTrue(journal.is_done('Freya', 'seven', 'ogg'))
+        self.assertFalse(journal.is_done('Freya', 'eight', 'ogg'))
+        self.assertTrue(journal.is_voice_done('Liam'))
+        self.assertEqual(journal.progress('Freya'), (4, 6))
+        self.assertEqual(journal.progress('Liam'), (6, 6))
+
+    def testTornLine(self):
+        journal = self.journal()
+        journal.mark_done('Freya', ['hello'], ('mp3',))
+        with open(pathname_of_journal(self.root), 'a', encoding='utf-8') as f:
+            f.write('{"voice": "Freya", "phr')  # ...as if killed mid-write
+        journal = self.journal()
+        self.assertTrue(journal.resumed)
+        journal.mark_done('Freya', ['seven'], ('mp3',))
+        journal = self.journal()
+        self.assertTrue(journal.is_done('Freya', 'hello', 'mp3'))
+        self.assertTrue(journal.is_done('Freya', 'seven', 'mp3'))
+
+    def testNewRun(self):
+        journal = self.journal()
+        journal.mark_done('Freya', ['hello'], ('mp3', 'ogg'))
+        self.assertFalse(self.journal(dict(self.params, formats=['mp3', 'ogg', 'pcm'])).resumed)
+        journal = self.journal()
+        self.assertFalse(journal.resumed)  # ...because the pcm run replaced it
+        journal.finish()
+        self.assertFalse(self.journal().resumed)
+
+    def testStatus(self):
+        self.assertIsNone(journal_status(self.root))
+        journal = self.journal()
+        journal.mark_done('Freya', ['hello'], ('mp3', 'ogg'))
+        journal.mark_done('Freya', ['hello'], ('mp3',))  # ...again, which counts once
+        status = journal_status(self.root)
+        self.assertIsNone(status['finished'])
+        self.assertEqual(status['voices'], {'Freya': (2, 6), 'Liam': (0, 6)})
+        self.assertEqual(report_status(self.root), 1)
+        journal.finish()
+        self.assertEqual(report_status(self.root), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
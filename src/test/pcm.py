@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""test.pcm
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from pydub.generators import Sine
+
+from my.tools.sound.pcm import is_pcm_stale, pcm_buffer, pcm_pathname, write_pcm_file
+
+from scratch import ScratchDirectory
+
+THE_FORMAT = (22050, -16, 1)
+
+
+class TestPcm(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.oggfname = self.write('good_morning.ogg', b'OggS' + b'\x00' * 60)  # ...which nothing here decodes
+        self.audio = Sine(440).to_audio_segment(duration=100).set_frame_rate(22050).set_channels(1).set_sample_width(2)
+
+    def testRoundTrip(self):
+        self.assertIsNone(pcm_buffer(self.oggfname, THE_FORMAT))
+        write_pcm_file(self.audio, pcm_pathname(self.oggfname), THE_FORMAT)
+        self.assertEqual(bytes(pcm_buffer(self.oggfname, THE_FORMAT)), self.audio.raw_data)
+        self.assertIsNone(pcm_buffer(self.oggfname, (44100, -16, 2)))  # ...decoded for another mixer format
+        self.assertRaises(ValueError, write_pcm_file, self.audio, pcm_pathname(self.oggfname), (22050, 8, 1))
+
+    def testStale(self):
+        pcmfname = pcm_pathname(self.oggfname)
+        write_pcm_file(self.audio, pcmfname, THE_FORMAT)
+        self.assertFalse(is_pcm_stale(pcmfname))
+        then = os.path.getmtime(pcmfname)
+        os.utime(self.oggfname, (then + 1, then + 1))  # The ogg has been rewritten since.
+        self.assertTrue(is_pcm_stale(pcmfname))
+        self.assertIsNone(pcm_buffer(self.oggfname, THE_FORMAT))
+        write_pcm_file(self.audio, pcmfname, THE_FORMAT)
+        os.utime(pcmfname, (then + 2, then + 2))
+        self.assertIsNotNone(pcm_buffer(self.oggfname, THE_FORMAT))
+
+
+if __name__ == "__main__":
+    unittest.main()
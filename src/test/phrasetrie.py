@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""test.phrasetrie
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.classes.phrasetrie import PhraseTrie
+from my.phraseindex import PhraseIndexSingleton as phrase_index
+from my.stringutils import phrase_audio_stem, span_of_time_words
+
+from scratch import ScratchDirectory
+
+
+class TestPhraseTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = PhraseTrie([('good', 'morning'), ('good',), ('morning', 'charlie'), ('charlie',), ('it\'s',)])
+
+    def tearDown(self):
+        del self.trie
+
+    def testGoofy(self):
+        self.assertRaises(ValueError, self.trie.add, ())
+        self.assertEqual(self.trie.segment([]), [])
+
+    def testContains(self):
+        self.assertIn(('good', 'morning'), self.trie)
+        self.assertNotIn(('morning',), self.trie)
+        self.assertEqual(len(self.trie), 5)
+        self.trie.add(('good',))
+        self.assertEqual(len(self.trie), 5)
+
+    def testDiscard(self):
+        self.trie.discard(('good', 'morning'))
+        self.assertNotIn(('good', 'morning'), self.trie)
+        self.assertIn(('good',), self.trie)
+        self.trie.discard(('no', 'such', 'phrase'))
+        self.assertEqual(len(self.trie), 4)
+
+    def testMatches(self):
+        words = ['good', 'morning', 'charlie']
+        self.assertEqual(self.trie.matches(words, 0), [1, 2])
+        self.assertEqual(self.trie.matches(words, 1), [3])
+        self.assertEqual(self.trie.matches(words, 2), [3])
+
+    def testGreedy(self):
+        self.assertEqual(self.trie.segment(['good', 'morning', 'charlie']),
+                         [(0, 2, True), (2, 3, True)])
+        self.assertEqual(self.trie.segment(['hey', 'good', 'morning']),
+                         [(0, 1, False), (1, 3, True)])
+
+    def testFewestClips(self):
+        trie = PhraseTrie([('a', 'b'), ('a',), ('b', 'c', 'd'), ('c',), ('d',)])
+        words = ['a', 'b', 'c', 'd']
+        self.assertEqual(len(trie.segment(words)), 3)
+        self.assertEqual(trie.segment(words, fewest_clips=True), [(0, 1, True), (1, 4, True)])
+
+    def testSpanOfUnmatched(self):
+        words = ['it\'s', '7:45', 'a.m.', 'charlie']
+        pieces = self.trie.segment(words, span_of_unmatched=lambda w, i: i + 2 if ':' in w[i] else i + 1)
+        self.assertEqual(pieces, [(0, 1, True), (1, 3, False), (3, 4, True)])
+
+    def testTimeOfStems(self):
+        # The trie holds filename stems ('a^m^'), but a time's A.M./P.M. is recognized by the words as spoken ('a.m.').
+        words = "it's 7:45 a.m.".split(' ')
+        stems = [phrase_audio_stem(w) for w in words]
+        trie = PhraseTrie([(phrase_audio_stem("it's"),)])
+        for fewest_clips in (False, True):
+            pieces = trie.segment(words, fewest_clips=fewest_clips, span_of_unmatched=span_of_time_words, keys=stems)
+            self.assertEqual(pieces, [(0, 1, True), (1, 3, False)])
+
+
+class TestPhraseIndex(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for fname in ('good_morning.ogg', 'good.ogg', 'good.mp3'):
+            self.write(fname, b'OggS')
+
+    def tearDown(self):
+        phrase_index.forget(self.root)
+        super().tearDown()
+
+    def testExists(self):
+        self.assertTrue(phrase_index.exists(os.path.join(self.root, 'good.ogg')))
+        self.assertFalse(phrase_index.exists(os.path.join(self.root, 'bad.ogg')))
+
+    def testAddAndDiscard(self):
+        trie = phrase_index.trie(self.root, 'ogg')
+        self.assertIn(('good', 'morning'), trie)
+        phrase_index.add(os.path.join(self.root, 'charlie.ogg'))
+        self.assertTrue(phrase_index.exists(os.path.join(self.root, 'charlie.ogg')))
+        self.assertIn(('charlie',), trie)
+        phrase_index.discard(os.path.join(self.root, 'good_morning.ogg'))
+        self.assertNotIn(('good', 'morning'), trie)
+        self.assertNotIn(('good', 'morning'), phrase_index.trie(self.root, 'mp3'))
+
+
+if __name__ == "__main__":
+    # import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
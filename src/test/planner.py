@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""test.planner
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import unittest
+
+from my.tools.synthesis.planner import atomic_phrases, plan_synthesis
+from my.tools.synthesis.quota import priority_key
+
+
+class TestPlanner(unittest.TestCase):
+
+    def testAtomicPhrases(self):
+        sentences = ['Good morning, Charlie. Time to wake up', 'Good morning', 'good morning, charlie. Wakey wakey']
+        self.assertEqual(atomic_phrases(sentences, split=lambda s: [p.strip() for p in s.split('.')]),
+                         ['good morning', 'good morning, charlie', 'time to wake up', 'wakey wakey'])
+
+    def testPlan(self):
+        cached = {'good morning', 'wakey wakey', 'time to wake up'}
+        plan = plan_synthesis('Freya', ['good morning', 'good morning, charlie', 'time to wake up', 'wakey wakey'],
+                              is_cached=lambda p: p in cached, is_stale=lambda p: p == 'wakey wakey')
+        self.assertEqual(plan.missing, ['good morning, charlie'])
+        self.assertEqual(plan.stale, ['wakey wakey'])
+        self.assertEqual(plan.work, ['good morning, charlie', 'wakey wakey'])
+        self.assertEqual(len(plan), 2)
+        self.assertEqual(plan.characters, 32)
+
+    def testNothingToDo(self):
+        plan = plan_synthesis('Freya', ['good morning'], is_cached=lambda p: True)
+        self.assertEqual((len(plan), plan.characters, plan.work), (0, 0, []))
+
+    def testDeferBeyond(self):
+        plan = plan_synthesis('Freya', ['seven', 'good morning', 'wakey wakey', 'eight'], is_cached=lambda p: False)
+        plan.prioritize(priority_key(essentials={'seven', 'eight'}, plays={'wakey wakey': 3}))
+        self.assertEqual(plan.work, ['eight', 'seven', 'wakey wakey', 'good morning'])
+        self.assertEqual(plan.defer_beyond(21), ['good morning'])
+        self.assertEqual(plan.work, ['eight', 'seven', 'wakey wakey'])
+        self.assertEqual(plan.characters, 21)
+        self.assertEqual(plan.defer_beyond(0), ['eight', 'seven', 'wakey wakey'])
+        self.assertEqual((len(plan), len(plan.deferred)), (0, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""test.progress
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import json
+import os
+import unittest
+
+from my.tools.synthesis.progress import RegenProgress, clip_bytes, duration_str, percentile
+
+from scratch import ScratchDirectory
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProgress(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.lines = []
+        self.progress = RegenProgress({'owner': 'Charlie'}, interval=5.0, clock=self.clock, out=self.lines.append)
+
+    def testPercentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([0.3, 0.1, 0.2], 50), 0.2)
+        self.assertEqual(percentile(list(range(1, 101)), 90), 90)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile([0.5], 99), 0.5)
+        self.assertEqual(duration_str(212), '3m32s')
+        self.assertEqual(duration_str(3700), '1h01m')
+
+    def testLines(self):
+        self.progress.start_voice('Freya', phrases=10, characters=100)
+        for i in range(4):
+            self.clock.now += 2.0
+            self.progress.request_done('Freya', 0.5 + i / 10.0)
+            with self.progress.transcoding('Freya'):
+                self.clock.now += 0.5
+            self.progress.phrase_done('Freya', characters=10, nbytes=1000)
+        self.assertEqual(len(self.lines), 2)  # ...every 5 seconds, not every phrase
+        self.assertIn('[Freya] 2/10 phrases (20%), 0.4 phrases/s, 4 chars/s', self.lines[0])
+        self.assertIn('latency p50/p90/p99 0.50/0.60/0.60s', self.lines[0])
+        self.assertIn('transcode queue 0 (0.4/s)', self.lines[0])
+        self.assertIn('ETA 20s', self.lines[0])  # 80 characters to go, at 20 per 5s
+        self.progress.finish_voice('Freya')
+        self.assertIn('4/10 phrases', self.lines[-1])
+        self.assertTrue(self.lines[-1].endswith('ETA done'))
+
+    def testSummary(self):
+        self.progress.start_voice('Freya', phrases=2, characters=20)
+        self.progress.start_voice('Liam', phrases=1, characters=5)
+        self.clock.now += 4.0
+        self.progress.request_done('Freya', 1.0)
+        self.progress.request_done('Liam', 3.0)
+        self.progress.phrase_done('Freya', characters=12, nbytes=4000)
+        self.progress.phrase_done('Liam', characters=5, nbytes=2000)
+        self.progress.failed('Freya')
+        fname = self.progress.write_summary(os.path.join(self.root, 'runs', 'summary.json'))
+        with open(fname, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual(summary['params'], {'owner': 'Charlie'})
+        self.assertEqual(summary['totals']['phrases_done'], 2)
+        self.assertEqual(summary['totals']['failures'], 1)
+        self.assertEqual(summary['totals']['bytes_written'], 6000)
+        self.assertEqual(summary['totals']['latency']['p99'], 3.0)
+        self.assertEqual(summary['totals']['characters_per_second'], 17 / 4.0)
+        self.assertEqual([v['voice'] for v in summary['voices']], ['Freya', 'Liam'])
+        self.assertEqual(summary['voices'][0]['phrases_per_second'], 0.25)
+
+    def testClipBytes(self):
+        mp3 = os.path.join(self.root, 'hello.mp3')
+        for suffix, n in (('.mp3', 300), ('.ogg', 200), ('.pcm', 1000)):
+            self.write(mp3[:-4] + suffix, b'x' * n)
+        self.assertEqual(clip_bytes(mp3), 1500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""test.quota
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import time
+import unittest
+
+from my.stringutils import phrase_audio_stem
+from my.tools.cache.budget import bare_stem
+from my.tools.synthesis.quota import CharacterBudget, characters_used, month_of, priority_key, record_characters
+
+from scratch import ScratchDirectory
+
+
+class TestQuota(ScratchDirectory, unittest.TestCase):
+
+    def testUsage(self):
+        self.assertEqual(characters_used(root=self.root), 0)
+        record_characters(100, root=self.root)
+        record_characters(20, root=self.root)
+        record_characters(5, root=self.root, when=time.time() - 62 * 24 * 3600)  # ...a couple of months ago
+        self.assertEqual(characters_used(root=self.root), 120)
+        self.assertEqual(characters_used(month_of(time.time() - 62 * 24 * 3600), root=self.root), 5)
+
+    def testUnlimited(self):
+        budget = CharacterBudget(per_run=None, per_month=None, root=self.root)
+        self.assertIsNone(budget.remaining())
+        budget.spend(1000)
+        self.assertIsNone(budget.remaining())
+        self.assertEqual(characters_used(root=self.root), 1000)
+
+    def testLimits(self):
+        record_characters(900, root=self.root)  # ...by an earlier run
+        budget = CharacterBudget(per_run=500, per_month=1000, root=self.root)
+        self.assertEqual(budget.remaining(), 100)
+        budget = CharacterBudget(per_run=50, per_month=1000, root=self.root)
+        budget.spend(30)
+        self.assertEqual(budget.remaining(), 20)
+        budget.spend(30)
+        self.assertEqual(budget.remaining(), 0)
+
+    def testPriorityOfPunctuatedPhrases(self):
+        def stem(phrase):
+            return bare_stem(phrase_audio_stem(phrase))
+        key = priority_key({stem(p) for p in ('seven', 'forty-five', 'a.m.')}, {'zebra': 9}, normalize=stem)
+        phrases = ['apple', 'zebra', 'seven?', 'forty-five?', 'a.m,', 'p.m,']
+        self.assertEqual(sorted(phrases, key=key), ['a.m,', 'forty-five?', 'seven?', 'zebra', 'apple', 'p.m,'])
+
+
+if __name__ == "__main__":
+    unittest.main()
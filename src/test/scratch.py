@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""test.scratch
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+
+A scratch directory for each test, shared by the test modules that write
+files. Run a test module as a script (python test/bundle.py), whence this
+module is importable as plain 'scratch'.
+"""
+import os
+import shutil
+import tempfile
+
+
+class ScratchDirectory:
+    """Mixin for a unittest.TestCase: self.root, a fresh directory for each test, deleted afterwards.
+
+    Put it before unittest.TestCase in the bases; and, if the TestCase has
+    its own setUp() or tearDown(), have them call super()'s.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        super().tearDown()
+
+    def write(self, fname:str, data:bytes=b'') -> str:
+        """Write these bytes to this file (relative to self.root, unless absolute), making its directory if need be. Returns its pathname."""
+        fname = os.path.join(self.root, fname)
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        with open(fname, 'wb') as f:
+            f.write(data)
+        return fname
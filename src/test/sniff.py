@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""test.sniff
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache.sniff import sniff_audio_bytes, sniff_audio_format, verify_directory
+
+from scratch import ScratchDirectory
+
+
+class TestSniff(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.contents = {'hello.ogg': b'OggS\x00\x02', 'hello.mp3': b'ID3\x04\x00',
+                         'bye.mp3': b'OggS\x00\x02', 'nothing.ogg': b''}
+        for fname, data in self.contents.items():
+            self.write(fname, data)
+
+    def testBytes(self):
+        self.assertEqual(sniff_audio_bytes(b''), 'empty')
+        self.assertEqual(sniff_audio_bytes(b'OggS'), 'ogg')
+        self.assertEqual(sniff_audio_bytes(b'ID3\x03'), 'mp3')
+        self.assertEqual(sniff_audio_bytes(b'\xff\xfb\x90\x00'), 'mp3')
+        self.assertEqual(sniff_audio_bytes(b'PCM1'), 'pcm')
+        self.assertIsNone(sniff_audio_bytes(b'<html>'))
+
+    def testFiles(self):
+        self.assertEqual(sniff_audio_format(os.path.join(self.root, 'bye.mp3')), 'ogg')
+        self.assertIsNone(sniff_audio_format(os.path.join(self.root, 'nonexistent.mp3')))
+
+    def testVerify(self):
+        report = verify_directory(self.root)
+        self.assertEqual(report['checked'], 4)
+        self.assertEqual(report['ok'], 2)
+        self.assertEqual(report['empty'], [os.path.join(self.root, 'nothing.ogg')])
+        self.assertEqual(report['mismatched'], [(os.path.join(self.root, 'bye.mp3'), 'ogg')])
+        self.assertEqual(report['missing_ogg'], [os.path.join(self.root, 'bye.mp3')])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""test.store
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache.store import collect_garbage, dedupe_directory, intern_file, normalized_text, pathname_of_blob, synthesis_key
+
+from scratch import ScratchDirectory
+
+
+class TestStore(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.root, 'Freya'))
+
+    def testSynthesisKey(self):
+        self.assertEqual(normalized_text('  Good   MORNING, "Tom" '), "good morning, 'tom'")
+        settings = {'model': 'eleven_multilingual_v2', 'stability': 0.3}
+        key = synthesis_key('Freya', 'Good morning', settings)
+        self.assertEqual(key, synthesis_key('Freya', 'good  morning', dict(settings)))
+        self.assertNotEqual(key, synthesis_key('Freya', 'Good morning', dict(settings, stability=0.5)))
+        self.assertNotEqual(key, synthesis_key('Brian', 'Good morning', settings))
+
+    def testIntern(self):
+        first = self.write(os.path.join('Freya', 'good_morning.ogg'), b'OggS' + b'\x00' * 60)
+        second = self.write(os.path.join('Freya', 'good_morning^.ogg'), b'OggS' + b'\x00' * 60)
+        other = self.write(os.path.join('Freya', 'wake_up.ogg'), b'OggS' + b'\x01' * 60)
+        sha256 = intern_file(first, self.root)
+        self.assertTrue(os.path.exists(pathname_of_blob(sha256, 'ogg', self.root)))
+        self.assertEqual(dedupe_directory(os.path.join(self.root, 'Freya'), self.root), (2, 64))
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertFalse(os.path.samefile(first, other))
+        with open(second, 'rb') as f:
+            self.assertEqual(f.read(), b'OggS' + b'\x00' * 60)
+        self.assertEqual(dedupe_directory(os.path.join(self.root, 'Freya'), self.root), (0, 0))  # ...nothing left to do
+
+    def testCollectGarbage(self):
+        fname = self.write(os.path.join('Freya', 'good_morning.ogg'), b'OggS' + b'\x00' * 60)
+        sha256 = intern_file(fname, self.root)
+        self.assertEqual(collect_garbage(self.root), 0)
+        os.unlink(fname)
+        self.assertEqual(collect_garbage(self.root), 64)
+        self.assertFalse(os.path.exists(pathname_of_blob(sha256, 'ogg', self.root)))
+
+
+if __name__ == "__main__":
+    unittest.main()
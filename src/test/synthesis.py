@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""test.synthesis
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from my.classes.exceptions import ElevenLabsAPIError
+from my.tools.synthesis.scheduler import RateLimiter, SynthesisJob, SynthesisScheduler
+
+from scratch import ScratchDirectory
+
+
+class StubElevenLabs(BaseHTTPRequestHandler):
+    """Imitates POST /v1/text-to-speech/{voice_id}: the 'audio' is ID3 + voice_id + text."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests.append((self.path, body))
+            fail = server.failures.get(body['text'], 0)
+            if fail > 0:
+                server.failures[body['text']] = fail - 1
+        time.sleep(0.05)
+        if self.headers['xi-api-key'] != 'sekrit':
+            status, data = 401, b'{"detail": "invalid key"}'
+        elif fail > 0:
+            status, data = 503, b'{"detail": "busy"}'
+        else:
+            status, data = 200, b'ID3' + self.path.split('?')[0].rsplit('/', 1)[-1].encode() + b':' + body['text'].encode()
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'audio/mpeg' if status == 200 else 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSynthesis(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubElevenLabs)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = 0
+        self.server.requests = []
+        self.server.failures = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def jobs(self, n):
+        return [SynthesisJob('Freya', 'abc123', 'phrase %d' % i, None, os.path.join(self.root, 'Freya', 'phrase_%d.mp3' % i)) for i in range(n)]
+
+    def testConcurrency(self):
+        done = []
+        scheduler = SynthesisScheduler('sekrit', base_url=self.url, concurrency=3, rate_limit=0, on_done=done.append)
+        jobs = scheduler.run(self.jobs(12))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual(len(done), 12)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertGreater(self.server.max_in_flight, 1)
+        with open(jobs[5].outfile, 'rb') as f:
+            self.assertEqual(f.read(), b'ID3abc123:phrase 5')
+        self.assertEqual([f for f in os.listdir(os.path.join(self.root, 'Freya')) if f.endswith('.tmp')], [])
+        path, body = self.server.requests[0]
+        self.assertTrue(path.startswith('/v1/text-to-speech/abc123?output_format='))
+        self.assertNotIn('voice_settings', body)
+
+    def testSettings(self):
+        job = SynthesisJob('Freya', 'abc123', 'hi', {'model': 'eleven_turbo_v2', 'stability': 0.3, 'similarity': 0.01, 'style': 0.5, 'boost': True}, None)
+        self.assertEqual(job.request_body(), {'text': 'hi', 'model_id': 'eleven_turbo_v2', 'voice_settings': {
+            'stability': 0.3, 'similarity_boost': 0.01, 'style': 0.5, 'use_speaker_boost': True}})
+
+    def testRetry(self):
+        self.server.failures = {'phrase 1': 2}
+        latencies = []
+        jobs = SynthesisScheduler('sekrit', base_url=self.url, concurrency=2, rate_limit=0, backoff=0.01,
+                                  on_latency=latencies.append).run(self.jobs(3))
+        self.assertTrue(all(job.done for job in jobs))
+        self.assertEqual([job.attempts for job in jobs], [1, 3, 1])
+        self.assertEqual(len(latencies), 5)  # ...failed requests too
+
+    def testGiveUp(self):
+        jobs = SynthesisScheduler('wrong', base_url=self.url, attempts=3, rate_limit=0, backoff=0.01).run(self.jobs(1))
+        self.assertFalse(jobs[0].done)
+        self.assertEqual(jobs[0].attempts, 1)  # ...since a 401 won't come right by itself
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIsInstance(jobs[0].error, ElevenLabsAPIError)
+        self.assertFalse(os.path.exists(jobs[0].outfile))
+
+    def testRateLimit(self):
+        limiter = RateLimiter(20.0)
+        t = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - t, 0.19)
+
+
+if __name__ == "__main__":
+    unittest.main()
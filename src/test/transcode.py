@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""test.transcode
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import time
+import unittest
+
+from pydub.exceptions import CouldntDecodeError
+
+from my.tools.sound import transcode
+from my.tools.sound.transcode import MANIFEST_FILENAME, _record_transcoding, is_up_to_date, run_batch, save_manifest
+
+from scratch import ScratchDirectory
+
+
+def copy_upper(srcfname, dstfname):
+    """A stand-in for a transcoder: picklable, and needs no ffmpeg."""
+    if srcfname.endswith('.bad'):
+        raise CouldntDecodeError("not audio")
+    with open(srcfname, 'rb') as f:
+        data = f.read()
+    with open(dstfname, 'wb') as f:
+        f.write(data.upper())
+    return {'pid': os.getpid(), 'size': len(data)}
+
+
+class TestTranscode(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.src = self.write('alarm.mp3', b'beep beep')
+        self.dst = os.path.join(self.root, 'alarm.ogg')
+
+    def tearDown(self):
+        transcode._manifests.clear()
+        super().tearDown()
+
+    def backdate(self, fname, seconds=100):
+        when = time.time() - seconds
+        os.utime(fname, (when, when))
+
+    def testUpToDate(self):
+        self.assertFalse(is_up_to_date(self.src, self.dst, {'trim_level': 1}))
+        copy_upper(self.src, self.dst)
+        self.backdate(self.src)
+        self.assertTrue(is_up_to_date(self.src, self.dst, {'trim_level': 1}))  # ...by mtime alone
+
+    def testParamsChanged(self):
+        copy_upper(self.src, self.dst)
+        self.backdate(self.src)
+        _record_transcoding(self.dst, 'whatever', {'trim_level': 1})
+        self.assertFalse(is_up_to_date(self.src, self.dst, {'trim_level': 3}))
+
+    def testTouchedButUnchanged(self):
+        from my.tools.cache.catalog import sha256_of_file
+        copy_upper(self.src, self.dst)
+        self.backdate(self.dst)
+        _record_transcoding(self.dst, sha256_of_file(self.src), {'trim_level': 1})
+        self.assertTrue(is_up_to_date(self.src, self.dst, {'trim_level': 1}))
+        self.assertGreaterEqual(os.path.getmtime(self.dst), os.path.getmtime(self.src))  # ...so, quick next time
+        with open(self.src, 'ab') as f:
+            f.write(b' beep')
+        self.backdate(self.dst)
+        self.assertFalse(is_up_to_date(self.src, self.dst, {'trim_level': 1}))
+
+    def testManifestRoundTrip(self):
+        _record_transcoding(self.dst, 'abc', {'trim_level': 2})
+        save_manifest(self.root)
+        self.assertTrue(os.path.exists(os.path.join(self.root, MANIFEST_FILENAME)))
+        transcode._manifests.clear()  # ...so that it's read back from the file
+        copy_upper(self.src, self.dst)
+        self.backdate(self.src)
+        self.assertFalse(is_up_to_date(self.src, self.dst, {'trim_level': 1}))
+        self.assertTrue(is_up_to_date(self.src, self.dst, {'trim_level': 2}))
+
+    def _tasks(self, n):
+        tasks = []
+        for i in range(n):
+            src = self.write('clip%d.%s' % (i, 'bad' if i == 0 else 'mp3'), b'clip %d' % i)
+            tasks.append((src, src + '.ogg'))
+        return tasks
+
+    def _check_batch(self, workers):
+        tasks = self._tasks(5)
+        results, errors = {}, []
+        report = run_batch(copy_upper, tasks, on_result=lambda task, result: results.update({task[0]: result}),
+                           on_error=lambda task, e: errors.append(task[0]), workers=workers, skipped=7, verbose=False)
+        self.assertEqual(report['done'], 4)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['skipped'], 7)
+        self.assertEqual(errors, [tasks[0][0]])
+        for src, dst in tasks[1:]:
+            with open(dst, 'rb') as f:
+                self.assertTrue(f.read().startswith(b'CLIP'))
+        return results
+
+    def testInline(self):
+        results = self._check_batch(workers=1)
+        self.assertEqual({r['pid'] for r in results.values()}, {os.getpid()})
+
+    def testPool(self):
+        results = self._check_batch(workers=2)
+        self.assertNotIn(os.getpid(), {r['pid'] for r in results.values()})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""test.trim
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import unittest
+
+from pydub.audio_segment import AudioSegment
+from pydub.generators import Sine
+
+from my.globals import DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD, LAZY_SILENCE_THRESHOLD
+from my.tools.sound.trim import concatenate_audio, detect_leading_silence, detect_silence_at_both_ends, trim_my_audio, trim_span
+
+
+class TestTrim(unittest.TestCase):
+
+    def setUp(self):
+        self.clips = [AudioSegment.silent(lead, frame_rate=rate)
+                      + Sine(440, sample_rate=rate).to_audio_segment(ms, volume=-10.0)
+                      + Sine(440, sample_rate=rate).to_audio_segment(75, volume=-55.0)
+                      + AudioSegment.silent(trail, frame_rate=rate)
+                      for (lead, ms, trail, rate) in ((0, 100, 0, 8000), (123, 1000, 456, 44100), (2000, 5, 1, 22050))]
+        self.clips.append(self.clips[1].set_channels(2).set_sample_width(4)[3:-7])
+
+    def testSameAsBefore(self):
+        for clip in self.clips + [AudioSegment.silent(95), AudioSegment.empty()]:
+            for threshold in (LAZY_SILENCE_THRESHOLD, DEFAULT_SILENCE_THRESHOLD, SNIPPY_SILENCE_THRESHOLD):
+                for chunk_size in (1, 10, 7):
+                    self.assertEqual(detect_silence_at_both_ends(clip, threshold, chunk_size),
+                                     (detect_leading_silence(clip, threshold, chunk_size),
+                                      detect_leading_silence(clip.reverse(), threshold, chunk_size)))
+
+    def testTrim(self):
+        self.assertAlmostEqual(len(trim_my_audio(self.clips[1], 2)), 1000, delta=10)
+        self.assertAlmostEqual(len(trim_my_audio(self.clips[1], 1)), 1075, delta=10)  # the quiet tail stays
+
+    def testConcatenate(self):
+        clips = self.clips[:3]
+        the_old_way = trim_my_audio(clips[0], 1) + trim_my_audio(clips[1], 1) + trim_my_audio(clips[2], 1)
+        the_new_way = concatenate_audio(clips, [trim_span(c, 1) for c in clips])
+        self.assertEqual(the_old_way.raw_data, bytes(the_new_way.raw_data))
+        self.assertEqual(the_old_way.frame_rate, the_new_way.frame_rate)
+        with_gaps = concatenate_audio(clips, gap_ms=250, the_format=(8000, 2, 1))
+        self.assertEqual(len(with_gaps), sum(len(c) for c in clips) + 500)
+        self.assertEqual(with_gaps[len(clips[0]):len(clips[0]) + 250].rms, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""test.trims
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import os
+import unittest
+
+from my.tools.cache import trims
+from my.tools.cache.trims import forget_trim_offsets, pathname_of_trims, record_trim_offsets, silence_threshold_name, trim_offsets
+
+from scratch import ScratchDirectory
+
+
+class TestTrims(ScratchDirectory, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fname = self.write('good_morning.ogg', b'OggS' + b'\x00' * 60)
+        self.silences = {'lazy': (0, 30), 'default': (10, 40), 'snippy': (120, 200)}
+
+    def tearDown(self):
+        trims._trims.clear()
+        super().tearDown()
+
+    def testLevels(self):
+        self.assertEqual(silence_threshold_name(0), 'default')
+        self.assertEqual(silence_threshold_name(1), 'lazy')
+        self.assertEqual(silence_threshold_name(3), 'snippy')
+
+    def testRoundTrip(self):
+        self.assertIsNone(trim_offsets(self.fname, 1))
+        record_trim_offsets(self.fname, self.silences)
+        self.assertTrue(os.path.exists(pathname_of_trims(self.root)))
+        trims._trims.clear()  # ...so that it's read back from the file
+        self.assertEqual(trim_offsets(self.fname, 1), (0, 30))
+        self.assertEqual(trim_offsets(self.fname, 2), (120, 200))
+        forget_trim_offsets(self.fname)
+        trims._trims.clear()
+        self.assertIsNone(trim_offsets(self.fname, 0))
+
+    def testStale(self):
+        record_trim_offsets(self.fname, self.silences)
+        with open(self.fname, 'ab') as f:
+            f.write(b'more')
+        self.assertIsNone(trim_offsets(self.fname, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
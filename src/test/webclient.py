@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""test.webclient
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from my.tools import webclient
+
+
+class SlowServer(BaseHTTPRequestHandler):
+    """Answers every GET after a little while, keeping the connection alive; and counts connections, and requests in flight."""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.most_in_flight = max(self.server.most_in_flight, self.server.in_flight)
+        time.sleep(0.05)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        data = b'[{"q": "Be here now.", "a": "Ram Dass"}]'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWebClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowServer)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.in_flight = self.server.most_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/api/random' % self.server.server_address[1]
+
+    def tearDown(self):
+        webclient.HTTP_HOST_CONCURRENCY.pop('127.0.0.1', None)
+        webclient._host_limits.pop('127.0.0.1', None)  # pylint: disable=protected-access
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testKeepAlive(self):
+        for _ in range(5):
+            self.assertEqual(webclient.request('GET', self.url).json()[0]['a'], 'Ram Dass')
+        self.assertEqual(self.server.connections, 1)
+
+    def testHostConcurrency(self):
+        webclient.HTTP_HOST_CONCURRENCY['127.0.0.1'] = 2
+        webclient._host_limits.pop('127.0.0.1', None)  # pylint: disable=protected-access
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(lambda _: webclient.request('GET', self.url), range(12)))
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertEqual(self.server.most_in_flight, 2)
+        self.assertLessEqual(self.server.connections, 2)
+
+    def testTimeout(self):
+        self.assertEqual(webclient.default_timeout(), (webclient.HTTP_CONNECT_TIMEOUT, webclient.HTTP_READ_TIMEOUT))
+        with self.assertRaises(webclient.requests.Timeout):
+            webclient.request('GET', self.url, timeout=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
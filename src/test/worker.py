@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""test.worker
+
+Created on Oct 18, 2026
+
+@author: Tom Blackshaw
+"""
+import io
+import json
+import sys
+import unittest
+
+from my.classes.exceptions import ElevenLabsDownError, SynthesisWorkerError
+from my.tools.synthesis.worker import SynthesisWorker, read_frame, serve, write_frame
+
+FAKE_WORKER = '''
+import os
+from my.classes.exceptions import ElevenLabsDownError
+from my.tools.synthesis.worker import serve_stdio
+
+def synthesize(voice, text):
+    print("Yay. Online? Check.")  # ...as my.text2speech would, on import; which mustn't get mixed up with the replies
+    if text == 'busy':
+        raise ElevenLabsDownError("ElevenLabs said 503")
+    if text == 'die' and not os.path.exists(%(flag)r):
+        open(%(flag)r, 'w').close()
+        os._exit(1)
+    return (('ID3%%d:%%s:%%s' %% (os.getpid(), voice, text)).encode(), {'model': 'fake'})
+
+serve_stdio(synthesize)
+'''
+
+
+class TestWorker(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.flag = tempfile.mktemp()
+        self.worker = SynthesisWorker(command=[sys.executable, '-c', FAKE_WORKER % {'flag': self.flag}])
+
+    def tearDown(self):
+        import os
+        self.worker.close()
+        if os.path.exists(self.flag):
+            os.unlink(self.flag)
+
+    def testFrames(self):
+        requests = io.BytesIO()
+        for text in ('hello', 'bye'):
+            write_frame(requests, json.dumps({'voice': 'Freya', 'text': text}).encode())
+        write_frame(requests, b'')
+        requests.seek(0)
+        replies = io.BytesIO()
+        serve(requests, replies, lambda voice, text: (text.upper().encode(), None))
+        replies.seek(0)
+        self.assertEqual(json.loads(read_frame(replies)), {'ok': True, 'settings': None})
+        self.assertEqual(read_frame(replies), b'HELLO')
+        read_frame(replies)
+        self.assertEqual(read_frame(replies), b'BYE')
+        self.assertIsNone(read_frame(replies))
+
+    def testOneProcess(self):
+        data1, settings = self.worker.synthesize('Freya', 'good morning')
+        data2, _ = self.worker.synthesize('Liam', "o'clock")
+        self.assertEqual(settings, {'model': 'fake'})
+        self.assertTrue(data1.endswith(b':Freya:good morning'))
+        self.assertTrue(data2.endswith(b":Liam:o'clock"))
+        self.assertEqual(data1.split(b':')[0], data2.split(b':')[0])  # ...the same pid
+
+    def testErrors(self):
+        with self.assertRaises(ElevenLabsDownError):
+            self.worker.synthesize('Freya', 'busy')
+        self.assertTrue(self.worker.synthesize('Freya', 'hello')[0].endswith(b':hello'))  # ...and it's still there
+
+    def testRestart(self):
+        first, _ = self.worker.synthesize('Freya', 'hello')
+        again, _ = self.worker.synthesize('Freya', 'die')  # ...which kills the first worker, once
+        self.assertNotEqual(first.split(b':')[0], again.split(b':')[0])
+        self.worker.command = [sys.executable, '-c', 'import sys; sys.exit(1)']
+        self.worker.close()
+        with self.assertRaises(SynthesisWorkerError):
+            self.worker.synthesize('Freya', 'hello')
+
+
+if __name__ == "__main__":
+    unittest.main()